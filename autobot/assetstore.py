@@ -0,0 +1,176 @@
+"""Content-addressed store for rendered images, shared across leads."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+
+from rich.console import Console
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from .config import PROJECT_ROOT
+from .db import AssetBlob, ImageAsset, session_scope
+from .fsutil import atomic_write
+
+console = Console()
+
+# Bump when drawing code changes so old renders are not reused.
+RENDER_VERSION = 2
+
+
+def render_key(kind: str, inputs: Dict[str, Any]) -> str:
+    """Hash of everything that determines the rendered bytes."""
+    payload = json.dumps({"kind": kind, "version": RENDER_VERSION, **inputs}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AssetStore:
+    """Files live at ``<root>/<aa>/<kind>-<sha256>.<suffix>``; identical inputs share one file."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def path_for(self, key: str, kind: str, suffix: str = ".webp") -> Path:
+        return self.root / key[:2] / f"{kind}-{key}{suffix}"
+
+    @staticmethod
+    def put(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+
+
+def relative_path(path: Path) -> str:
+    return str(path.relative_to(PROJECT_ROOT))
+
+
+def register_blobs(entries: Iterable[Tuple[str, str, Path, int, int]]) -> None:
+    """Record stored files given as ``(key, kind, path, width, height)``; known blobs are left untouched."""
+    entries = {entry[0]: entry for entry in entries}
+    if not entries:
+        return
+    with session_scope() as session:
+        known = set(session.exec(select(AssetBlob.hash).where(AssetBlob.hash.in_(list(entries)))).all())
+        for key, kind, path, width, height in entries.values():
+            if key in known:
+                continue
+            session.add(
+                AssetBlob(
+                    hash=key,
+                    kind=kind,
+                    path=relative_path(path),
+                    width=width,
+                    height=height,
+                    size=path.stat().st_size,
+                )
+            )
+        session.commit()
+
+
+def acquire_blob(session: Session, key: str | None) -> None:
+    """Count one more ``ImageAsset`` row pointing at ``key``; commits with the caller's session."""
+    if key:
+        session.exec(update(AssetBlob).where(AssetBlob.hash == key).values(refcount=AssetBlob.refcount + 1))
+
+
+def release_blob(session: Session, key: str | None) -> None:
+    """Count one ``ImageAsset`` row fewer for ``key``; commits with the caller's session."""
+    if key:
+        session.exec(
+            update(AssetBlob)
+            .where(AssetBlob.hash == key, AssetBlob.refcount > 0)
+            .values(refcount=AssetBlob.refcount - 1)
+        )
+
+
+def remove_image_assets(session: Session, assets: Iterable[ImageAsset]) -> None:
+    """Delete ``assets`` and release their blobs, leaving unreferenced files to :func:`prune_unreferenced`."""
+    for asset in assets:
+        release_blob(session, asset.blob_hash)
+        session.delete(asset)
+
+
+def remote_media(key: str | None, site: str) -> AssetBlob | None:
+    """The blob if it has already been uploaded to ``site``."""
+    if not key:
+        return None
+    with session_scope() as session:
+        blob = session.exec(select(AssetBlob).where(AssetBlob.hash == key)).first()
+    if blob is None or blob.remote_media_id is None or blob.remote_site != site:
+        return None
+    return blob
+
+
+def record_remote_media(key: str | None, site: str, media_id: int | None, url: str | None) -> None:
+    if not key or media_id is None:
+        return
+    with session_scope() as session:
+        session.exec(
+            update(AssetBlob)
+            .where(AssetBlob.hash == key)
+            .values(remote_site=site, remote_media_id=media_id, remote_url=url)
+        )
+        session.commit()
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Hardlink ``source`` to ``target``, copying when linking is not possible."""
+    if target.exists():
+        try:
+            if os.path.samefile(source, target):
+                return
+        except OSError:
+            pass
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def prune_unreferenced(min_age: timedelta = timedelta(days=1)) -> int:
+    """Delete blobs no ``ImageAsset`` refers to, sparing recent ones a running batch may still use.
+
+    Candidates are recounted against ``ImageAsset`` first, so a row removed
+    without :func:`release_blob` cannot keep a file alive, nor can a drifted
+    count delete a file that is still in use.
+    """
+    cutoff = datetime.utcnow() - min_age
+    with session_scope() as session:
+        candidates = session.exec(select(AssetBlob).where(AssetBlob.created_at < cutoff)).all()
+        counts = dict(
+            session.exec(select(ImageAsset.blob_hash, func.count(ImageAsset.id)).group_by(ImageAsset.blob_hash)).all()
+        ) if candidates else {}
+        blobs = []
+        for blob in candidates:
+            if blob.refcount != counts.get(blob.hash, 0):
+                blob.refcount = counts.get(blob.hash, 0)
+                session.add(blob)
+            if blob.refcount <= 0:
+                blobs.append(blob)
+        for blob in blobs:
+            (PROJECT_ROOT / blob.path).unlink(missing_ok=True)
+            session.delete(blob)
+        session.commit()
+    if blobs:
+        console.log(f"Pruned {len(blobs)} unreferenced image blobs")
+    return len(blobs)
+
+
+__all__ = [
+    "RENDER_VERSION",
+    "render_key",
+    "AssetStore",
+    "register_blobs",
+    "acquire_blob",
+    "release_blob",
+    "remove_image_assets",
+    "remote_media",
+    "record_remote_media",
+    "link_or_copy",
+    "prune_unreferenced",
+]
@@ -0,0 +1,658 @@
+"""Micro-benchmarks for the hot paths of the publishing pipeline."""
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+
+@dataclass(slots=True)
+class BenchResult:
+    name: str
+    seconds: float
+    units: float
+    unit: str
+
+    @property
+    def rate(self) -> float:
+        return self.units / self.seconds if self.seconds else float("inf")
+
+
+def _time(name: str, func: Callable[[], object], units: float, unit: str, repeat: int = 3) -> BenchResult:
+    """Best wall-clock time of ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return BenchResult(name=name, seconds=best, units=units, unit=unit)
+
+
+def report(title: str, results: List[BenchResult]) -> None:
+    table = Table(title=title)
+    table.add_column("Case")
+    table.add_column("Best time (s)", justify="right")
+    table.add_column("Throughput", justify="right")
+    for result in results:
+        table.add_row(result.name, f"{result.seconds:.4f}", f"{result.rate:,.2f} {result.unit}/s")
+    console.print(table)
+
+
+_EN_SENTENCES = [
+    "Earn a 50% bonus when transferring Amex Membership Rewards to Aeroplan.",
+    "The offer ends Nov 30, 2026 for Canada residents!",
+    "Spend $3,000 in the first three months to get 60,000 points.",
+    "U.S. cardholders get 2.5x miles on dining and travel purchases.",
+    "Award space opens 355 days out, so plan ahead?",
+]
+_ZH_SENTENCES = [
+    "加拿大用户可在2026年11月30日前转点，满5000元消费可得2万积分。",
+    "本次促销适用于美国与香港出发的长程商务舱航线！",
+    "兑换比例为1:1，部分伙伴航司额外赠送百分之二十里程。",
+    "建议提前核对燃油附加费与税费，避免出票后产生额外成本？",
+]
+
+
+def build_mixed_corpus(size_mb: float, seed: int = 7) -> str:
+    """Deterministic mixed Chinese/English text of roughly ``size_mb`` megabytes (UTF-8)."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts: List[str] = []
+    size = 0
+    while size < target:
+        sentence = rng.choice(_EN_SENTENCES if rng.random() < 0.5 else _ZH_SENTENCES)
+        separator = "\n" if rng.random() < 0.1 else " "
+        parts.append(sentence + separator)
+        size += len(sentence.encode("utf-8")) + 1
+    return "".join(parts)
+
+
+def bench_research(size_mb: float = 8.0) -> List[BenchResult]:
+    from .research import _split_sentences, iter_evidence
+
+    corpus = build_mixed_corpus(size_mb)
+    megabytes = len(corpus.encode("utf-8")) / (1024 * 1024)
+    results = [
+        _time("split sentences", lambda: _split_sentences(corpus), megabytes, "MB"),
+        _time(
+            "split + extract facts",
+            lambda: sum(1 for _ in iter_evidence(corpus, "https://example.com")),
+            megabytes,
+            "MB",
+        ),
+    ]
+    report(f"Research extraction on {megabytes:.1f} MB mixed zh/en corpus", results)
+    return results
+
+
+def bench_writer(articles: int = 500) -> List[BenchResult]:
+    from .db import Lead
+    from .planner import build_plan
+    from .research import gather_evidence
+    from .rules import apply_rules
+    from .writer import compose_article
+
+    lead = Lead(
+        id=1,
+        source="Bench",
+        title="Aeroplan 50% transfer bonus from Amex Membership Rewards",
+        url="https://example.com/aeroplan-bonus",
+        summary=" ".join(_EN_SENTENCES),
+    )
+    evidence = gather_evidence(lead, " ".join(_EN_SENTENCES + _ZH_SENTENCES))
+    plan = build_plan(lead, evidence)
+
+    def run() -> None:
+        for _ in range(articles):
+            apply_rules(compose_article(lead, plan, evidence), plan, evidence)
+
+    results = [_time("compose + rules", run, articles, "articles")]
+    report(f"Article assembly for {articles} articles", results)
+    return results
+
+
+def bench_links(articles: int = 2000, queries: int = 200) -> List[BenchResult]:
+    """BM25 suggestions against an in-memory index of ``articles`` synthetic posts."""
+    from .linking import LinkIndex, term_counts
+
+    rng = random.Random(11)
+    sentences = _EN_SENTENCES + _ZH_SENTENCES
+    # Each post gets a few topic words of its own so postings are as skewed as a real archive's.
+    topics = [f"topic{idx}" for idx in range(max(articles // 4, 1))]
+    docs = []
+    for idx in range(articles):
+        words = " ".join(rng.choices(topics, k=6))
+        docs.append((f"{words[:30]} #{idx}", " ".join(rng.choices(sentences, k=3)) + " " + words * 3))
+    index = LinkIndex()
+    index._loaded = True
+
+    def build() -> None:
+        for idx, (title, body) in enumerate(docs):
+            index._remember(idx, title, f"https://bench.example/{idx}/", term_counts(title, body))
+
+    def suggest() -> None:
+        for title, body in docs[:queries]:
+            index.suggest(title, body)
+
+    results = [
+        _time("index articles", build, articles, "articles", repeat=1),
+        _time("suggest links", suggest, queries, "queries"),
+    ]
+    report(f"Internal link index over {articles} articles", results)
+    return results
+
+
+def bench_charts(charts: int = 200) -> List[BenchResult]:
+    from .imaging import INFOGRAPHIC_MAX_BYTES, INFOGRAPHIC_SIZE, RenderSpec, _draw_infographic, encode_webp
+    from .planner import COST_VS_CASH_ROWS
+
+    rng = random.Random(7)
+    specs = []
+    for idx in range(charts):
+        kind = ("bar", "line", "table")[idx % 3]
+        rows = COST_VS_CASH_ROWS if kind == "table" else [
+            (f"F{row} · {rng.randint(5, 90)}k points", float(rng.randint(5_000, 90_000))) for row in range(1, 6)
+        ]
+        specs.append(
+            RenderSpec(
+                kind="infographic",
+                key=str(idx),
+                path="",
+                title=f"Chart {idx}",
+                width=INFOGRAPHIC_SIZE[0],
+                height=INFOGRAPHIC_SIZE[1],
+                max_bytes=INFOGRAPHIC_MAX_BYTES,
+                rows=tuple(rows),
+                unit="%" if kind == "table" else "积分",
+                chart=kind,
+                lossless=True,
+            )
+        )
+    results = [
+        _time("layout + rasterize", lambda: [_draw_infographic(spec) for spec in specs], charts, "charts"),
+        _time(
+            "layout + rasterize + encode",
+            lambda: [encode_webp(_draw_infographic(spec), spec.max_bytes, lossless=True) for spec in specs],
+            charts,
+            "charts",
+        ),
+    ]
+    report(f"Rendering {charts} infographics (bar/line/table)", results)
+    return results
+
+
+def bench_llm(requests: int = 16, delay: float = 0.02, concurrency: int = 8) -> List[BenchResult]:
+    """Generation against the local stub server, which sleeps ``delay`` seconds per streamed chunk."""
+    from .llm import LLMGenerator, LLMRequest, OpenAICompatibleBackend, StubLLMServer
+
+    facts = "\n".join(f"[F{idx}] {sentence}" for idx, sentence in enumerate(_EN_SENTENCES + _ZH_SENTENCES, start=1))
+    batch = [
+        LLMRequest(template="writer_zh.txt", prompt=f"标题：Bench {idx}\n{facts}")
+        for idx in range(requests)
+    ]
+    server = StubLLMServer(delay=delay).start()
+    try:
+        backend = OpenAICompatibleBackend(server.base_url, "stub")
+        results = [
+            _time(
+                f"concurrency {limit}",
+                lambda limit=limit: LLMGenerator(backend, concurrency=limit).generate_many(batch),
+                requests,
+                "completions",
+                repeat=1,
+            )
+            for limit in sorted({1, concurrency})
+        ]
+    finally:
+        server.stop()
+    report(f"Streaming {requests} completions from the stub server ({delay * 1000:.0f} ms/chunk)", results)
+    return results
+
+
+class StubWordPressServer:
+    """Local stand-in for the WordPress REST endpoints the publisher calls.
+
+    Every new connection sleeps ``handshake`` seconds (the TCP + TLS setup a
+    remote site costs) and every request ``latency`` seconds, so connection
+    reuse shows up in the timings the way it does against a real host.
+    """
+
+    def __init__(self, handshake: float = 0.03, latency: float = 0.005, tags: int = 250) -> None:
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+
+        server = self
+        self.handshake = handshake
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.received = 0
+        self.terms = {
+            "categories": [{"id": idx, "name": name} for idx, name in enumerate(["Travel", "Airline", "Points"], 1)],
+            "tags": [{"id": 100 + idx, "name": f"tag-{idx}"} for idx in range(tags)],
+        }
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; Nagle would stall keep-alive replies.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: object) -> None:
+                return
+
+            def setup(self) -> None:
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server.handshake)
+                super().setup()
+
+            def _body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().strip() or b"0", 16)
+                        chunk = self.rfile.read(size + 2)[:size]
+                        if not size:
+                            return b"".join(chunks)
+                        chunks.append(chunk)
+                        server.received += size
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                server.received += len(body)
+                return body
+
+            def _reply(self, status: int, payload: object, headers: dict | None = None) -> None:
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                if parts.path.endswith("/posts"):
+                    # Slug lookups made before re-sending a post: nothing was created yet.
+                    self._reply(200, [])
+                    return
+                terms = server.terms.get(parts.path.rsplit("/", 1)[-1])
+                if terms is None:
+                    self._reply(404, {"code": "rest_no_route"})
+                    return
+                terms = sorted(terms, key=lambda term: term["id"], reverse=query.get("order") == "desc")
+                per_page, page = int(query.get("per_page", 10)), int(query.get("page", 1))
+                pages = max(1, -(-len(terms) // per_page))
+                self._reply(200, terms[(page - 1) * per_page : page * per_page], {"X-WP-TotalPages": str(pages)})
+
+            def do_POST(self) -> None:
+                body = self._body()
+                path = urlsplit(self.path).path
+                with server._lock:
+                    next_id = 10_000 + server.connections * 1000 + len(body) % 1000
+                if path.endswith("/media"):
+                    self._reply(201, {"id": next_id, "source_url": f"{server.base_url}/uploads/{next_id}.webp"})
+                elif path.endswith("/posts"):
+                    self._reply(201, {"id": next_id, "link": f"{server.base_url}/?p={next_id}"})
+                elif path.rsplit("/", 1)[-1].isdigit() and "/posts/" in path:
+                    post_id = int(path.rsplit("/", 1)[-1])
+                    self._reply(200, {"id": post_id, "link": f"{server.base_url}/?p={post_id}"})
+                elif path.endswith("/batch/v1"):
+                    requests = json.loads(body or b"{}").get("requests", [])
+                    responses = []
+                    for offset, request in enumerate(requests):
+                        taxonomy = request["path"].rsplit("/", 1)[-1]
+                        term = {"id": next_id + offset, "name": request["body"]["name"]}
+                        with server._lock:
+                            server.terms[taxonomy].append(term)
+                        responses.append({"status": 201, "body": term})
+                    self._reply(207, {"responses": responses})
+                else:
+                    self._reply(404, {"code": "rest_no_route"})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubWordPressServer":
+        import threading
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="stub-wordpress", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+
+def _publish_fixtures(posts: int, scratch: str):
+    """Articles, a cover file and SEO packages shaped like the pipeline's output."""
+    from pathlib import Path
+
+    from PIL import Image
+
+    from .db import Article, ImageAsset, Lead
+
+    items = []
+    for idx in range(posts):
+        cover_path = Path(scratch) / f"cover-{idx}.webp"
+        Image.new("RGB", (1200, 630), (30, 90, idx % 256)).save(cover_path, "WEBP", quality=80)
+        cover = ImageAsset(lead_id=idx, path=str(cover_path), alt_text="bench", width=1200, height=630)
+        article = Article(lead_id=idx, slug=f"bench-{idx}", title=f"Bench {idx}", html="<p>bench</p>", excerpt="", meta={})
+        seo = {
+            "title": article.title,
+            "slug": article.slug,
+            "meta_description": article.title,
+            "json_ld": "{}",
+            "category": "Travel",
+            "tags": ["tag-1", "tag-2", f"new-tag-{idx % 5}"],
+            "internal_links": [],
+        }
+        lead = Lead(source="Bench", title=article.title, url=f"https://example.com/{idx}")
+        items.append((article, cover, seo, lead))
+    return items
+
+
+def _publish_and_close(publisher, item) -> None:
+    """A fresh connection for every post: the pattern before clients were shared."""
+    publisher.publish_many([item])
+    publisher.close()
+
+
+def bench_publish(posts: int = 30, handshake: float = 0.03, latency: float = 0.005, concurrency: int = 4) -> List[BenchResult]:
+    """Per-post latency against the stand-in server.
+
+    Compares a publish call (and client) per post, one pooled batch published
+    strictly in sequence, and the same batch with uploads, taxonomy sync and
+    post creation overlapped ``concurrency`` requests wide.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from .config import load_settings
+    from .publisher import Publisher, PublishItem
+    from .taxonomy import TaxonomyManager
+
+    server = StubWordPressServer(handshake=handshake, latency=latency).start()
+    cases = (
+        ("client per post", lambda publisher, items: [_publish_and_close(publisher, item) for item in items]),
+        ("pooled, sequential", lambda publisher, items: publisher.publish_many(items, concurrency=1)),
+        (f"pooled, {concurrency} overlapped", lambda publisher, items: publisher.publish_many(items, concurrency)),
+    )
+    results = []
+    try:
+        for name, run in cases:
+            with tempfile.TemporaryDirectory() as scratch:
+                settings = load_settings().model_copy(
+                    update={
+                        "wp_base_url": server.base_url,
+                        "wp_user": "bench",
+                        "wp_app_pass": "bench",
+                        "output_dir": Path(scratch),
+                    }
+                )
+                items = [PublishItem(*fixture) for fixture in _publish_fixtures(posts, scratch)]
+                publisher = Publisher(settings)
+                publisher.taxonomy = TaxonomyManager(settings, Path(scratch) / "taxonomy.json")
+                publisher.taxonomy.resolve(publisher.client, ("bench", "bench"))
+                before = server.connections
+                try:
+                    result = _time(name, lambda: run(publisher, items), posts, "posts", repeat=1)
+                finally:
+                    publisher.close()
+                console.log(
+                    f"{name}: {result.seconds / posts * 1000:.1f} ms/post, {server.connections - before} connections"
+                )
+                results.append(result)
+    finally:
+        server.stop()
+    report(f"Publishing {posts} posts ({handshake * 1000:.0f} ms handshake, {latency * 1000:.0f} ms/request)", results)
+    return results
+
+
+def bench_refresh(posts: int = 200, latency: float = 0.005) -> List[BenchResult]:
+    """Refreshing already published posts: full re-publish versus field-level diff updates.
+
+    Every post gets a new title, the typical lifecycle or A/B change; the
+    diff update sends that one field and keeps the cover, while a re-publish
+    uploads the cover and the whole post again.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from .config import load_settings
+    from .publisher import Publisher, PublishItem
+    from .taxonomy import TaxonomyManager
+
+    server = StubWordPressServer(handshake=0.0, latency=latency).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            settings = load_settings().model_copy(
+                update={
+                    "wp_base_url": server.base_url,
+                    "wp_user": "bench",
+                    "wp_app_pass": "bench",
+                    "output_dir": Path(scratch),
+                }
+            )
+            publisher = Publisher(settings)
+            publisher.taxonomy = TaxonomyManager(settings, Path(scratch) / "taxonomy.json")
+            publisher.taxonomy.resolve(publisher.client, ("bench", "bench"))
+            items = [PublishItem(*fixture) for fixture in _publish_fixtures(posts, scratch)]
+            published = publisher.publish_many(items, fallback=False)
+            for item in items:
+                item.article.title = item.seo_package["title"] = f"{item.article.title}（已结束）"
+            updates = [
+                PublishItem(
+                    item.article,
+                    item.cover,
+                    item.seo_package,
+                    item.lead,
+                    remote_id=result["remote_id"],
+                    state=result["meta"]["state"],
+                )
+                for item, result in zip(items, published)
+            ]
+            cases = (("full re-publish", items), ("diff update", updates))
+            try:
+                for name, batch in cases:
+                    requests, received = server.requests, server.received
+                    result = _time(name, lambda: publisher.publish_many(batch, fallback=False), posts, "posts", repeat=1)
+                    console.log(
+                        f"{name}: {(server.requests - requests) / posts:.1f} requests/post, "
+                        f"{(server.received - received) / posts / 1024:.1f} KB/post"
+                    )
+                    results.append(result)
+            finally:
+                publisher.close()
+    finally:
+        server.stop()
+    report(f"Refreshing {posts} published posts ({latency * 1000:.0f} ms/request)", results)
+    return results
+
+
+def bench_drafts(drafts: int = 2000) -> List[BenchResult]:
+    """Saving ``drafts`` local drafts into sharded directories, and packed into one archive per batch."""
+    import tempfile
+    from pathlib import Path
+
+    from PIL import Image
+
+    from .drafts import DraftStore
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        cover = Path(scratch) / "cover.webp"
+        Image.new("RGB", (1200, 630), (30, 90, 160)).save(cover, "WEBP", quality=80)
+        body = ("<p>" + _EN_SENTENCES[0] + "</p>") * 40
+        for archive in (False, True):
+            store = DraftStore(Path(scratch) / ("packed" if archive else "sharded"), archive=archive)
+
+            def run() -> None:
+                with store.batch() as batch:
+                    for idx in range(drafts):
+                        slug = f"bench-draft-{idx}"
+                        batch.save(
+                            slug,
+                            blobs={f"{slug}.html": body.encode("utf-8"), f"{slug}.json": b'{"title": "bench"}'},
+                            files={f"cover-{idx}.webp": cover},
+                            record={"title": slug},
+                        )
+
+            results.append(_time("packed archive" if archive else "sharded files", run, drafts, "drafts", repeat=1))
+            listed = sum(1 for _ in store.entries())
+            console.log(f"{'packed' if archive else 'sharded'}: {listed} drafts listed from the manifest")
+    report(f"Saving {drafts} local drafts", results)
+    return results
+
+
+def _persist_fixtures(leads: int, offset: int):
+    from .db import Article, ImageAsset, Lead
+
+    runs = []
+    for idx in range(offset, offset + leads):
+        lead = Lead(source="Bench", title=f"Bench lead {idx}", url=f"https://example.com/lead/{idx}", url_key=f"bench-{idx}")
+        article = Article(
+            lead_id=0, slug=f"bench-lead-{idx}", title=lead.title, html=f"<p>{_EN_SENTENCES[idx % len(_EN_SENTENCES)]}</p>", excerpt=""
+        )
+        images = [
+            ImageAsset(lead_id=0, kind=kind, path=f"bench/{kind}-{idx}.webp", alt_text="bench", width=1200, height=630)
+            for kind in ("cover", "infographic")
+        ]
+        runs.append((lead, article, images, {"status": "publish", "url": f"https://bench.example/{article.slug}/", "platform": "wordpress"}))
+    return runs
+
+
+def _persist_per_step(lead, article, images, publish_result) -> None:
+    """The storage pattern before the unit of work: a session and commit per step, plus refreshes."""
+    from .db import Publish, session_scope
+    from .dedup import index_lead_fingerprint
+    from .linking import index_article
+
+    with session_scope() as session:
+        session.add(lead)
+        session.commit()
+        session.refresh(lead)
+    with session_scope() as session:
+        article.lead_id = lead.id or 0
+        session.add(article)
+        for image in images:
+            image.lead_id = lead.id or 0
+            session.add(image)
+        session.commit()
+        session.refresh(article)
+        session.add(Publish(article_id=article.id or 0, platform="wordpress", url=publish_result["url"], status="publish"))
+        session.commit()
+        session.refresh(article)
+    index_lead_fingerprint(lead, article.id, 0.85)
+    index_article(article, publish_result)
+
+
+def bench_persist(leads: int = 300) -> List[BenchResult]:
+    """Leads persisted per second (lead, article, images, publish row, fingerprint, link index).
+
+    Compares the old commit-per-step pattern on SQLite's default rollback
+    journal, the same pattern on WAL with ``synchronous=NORMAL``, and the
+    orchestrator's single-transaction unit of work on WAL.
+    """
+    import tempfile
+
+    from .config import load_bundle
+    from .db import get_engine, reset_engine, unit_of_work
+    from .orchestrator import AutobotOrchestrator
+
+    bundle = load_bundle()
+    orchestrator = AutobotOrchestrator(bundle)
+
+    def unit_of_work_run(runs) -> None:
+        with unit_of_work() as session:
+            session.add_all([lead for lead, *_ in runs])
+        for lead, article, images, publish_result in runs:
+            orchestrator._persist_run(lead, article, images, publish_result)
+
+    cases = (
+        ("commit per step, rollback journal", {"sqlite_wal": False, "sqlite_synchronous": "FULL"}, None),
+        ("commit per step, WAL", {}, None),
+        ("unit of work, WAL", {}, unit_of_work_run),
+    )
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            for offset, (name, overrides, run) in enumerate(cases):
+                settings = bundle.settings.model_copy(
+                    update={"database_url": f"sqlite:///{scratch}/persist-{offset}.sqlite3", **overrides}
+                )
+                reset_engine()
+                get_engine(settings)
+                runs = _persist_fixtures(leads, offset * leads)
+                if run is None:
+                    run = lambda runs: [_persist_per_step(*entry) for entry in runs]  # noqa: E731
+                results.append(_time(name, lambda: run(runs), leads, "leads", repeat=1))
+    finally:
+        orchestrator.close()
+        reset_engine()
+    report(f"Persisting {leads} leads", results)
+    return results
+
+
+def bench_imaging(covers: int = 200, workers: int = 0) -> List[BenchResult]:
+    """Cold renders of ``covers`` distinct covers into a scratch store, serially and on the pool."""
+    import os
+    import tempfile
+    from pathlib import Path
+
+    from .assetstore import AssetStore
+    from .imaging import cover_spec, render_batch
+
+    workers = workers or os.cpu_count() or 1
+    titles = [f"{_EN_SENTENCES[idx % len(_EN_SENTENCES)][:36]} #{idx}" for idx in range(covers)]
+    results = []
+    for limit in sorted({1, workers}):
+        with tempfile.TemporaryDirectory() as scratch:
+            store = AssetStore(Path(scratch))
+            specs = [cover_spec(title, "bench", store) for title in titles]
+            results.append(
+                _time(f"{limit} worker(s)", lambda: render_batch(specs, limit, log=False), covers, "covers", repeat=1)
+            )
+    report(f"Rendering {covers} covers", results)
+    return results
+
+
+__all__ = [
+    "BenchResult",
+    "build_mixed_corpus",
+    "bench_research",
+    "bench_writer",
+    "bench_links",
+    "bench_llm",
+    "bench_imaging",
+    "bench_publish",
+    "bench_refresh",
+    "bench_drafts",
+    "bench_persist",
+    "StubWordPressServer",
+    "bench_charts",
+    "report",
+]
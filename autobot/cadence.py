@@ -0,0 +1,104 @@
+"""Adaptive per-feed polling cadence learned from entry timestamps."""
+from __future__ import annotations
+
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from .db import FeedState
+
+# Only the most recent publish gaps describe a feed's current rhythm.
+RECENT_GAPS = 10
+
+
+@dataclass(slots=True)
+class CadencePolicy:
+    enabled: bool = False
+    tick_minutes: float = 10.0
+    min_interval_minutes: float = 20.0
+    max_interval_hours: float = 24.0
+    backoff_factor: float = 1.5
+    smoothing: float = 0.5
+
+    @classmethod
+    def from_config(cls, data: Dict[str, Any] | None) -> "CadencePolicy":
+        data = data or {}
+        defaults = cls()
+        return cls(
+            enabled=bool(data.get("enabled", defaults.enabled)),
+            tick_minutes=float(data.get("tick_minutes", defaults.tick_minutes)),
+            min_interval_minutes=float(data.get("min_interval_minutes", defaults.min_interval_minutes)),
+            max_interval_hours=float(data.get("max_interval_hours", defaults.max_interval_hours)),
+            backoff_factor=float(data.get("backoff_factor", defaults.backoff_factor)),
+            smoothing=float(data.get("smoothing", defaults.smoothing)),
+        )
+
+    @property
+    def min_seconds(self) -> float:
+        return self.min_interval_minutes * 60
+
+    @property
+    def max_seconds(self) -> float:
+        return self.max_interval_hours * 3600
+
+    def clamp(self, seconds: float) -> float:
+        return min(max(seconds, self.min_seconds), self.max_seconds)
+
+
+def learn_interval(timestamps: Iterable[datetime | None]) -> float | None:
+    """Median gap in seconds between the most recent entry timestamps."""
+    ordered = sorted({ts for ts in timestamps if ts is not None}, reverse=True)[: RECENT_GAPS + 1]
+    if len(ordered) < 2:
+        return None
+    gaps = [(newer - older).total_seconds() for newer, older in zip(ordered, ordered[1:])]
+    return statistics.median(gaps)
+
+
+def record_poll(
+    state: FeedState,
+    policy: CadencePolicy,
+    *,
+    now: datetime,
+    failed: bool = False,
+    new_entries: int = 0,
+    timestamps: Iterable[datetime | None] = (),
+) -> None:
+    """Update ``state`` after a poll and schedule its next one.
+
+    Polling aims at half the learned publish interval so a new post waits on
+    average a quarter of the gap. Each consecutive error doubles the interval
+    up to ``max_interval_hours``, and polls that bring nothing new stretch it
+    by ``backoff_factor``.
+    """
+    current = state.poll_interval or policy.min_seconds
+    if failed:
+        state.failures += 1
+        # ``current`` already carries earlier failures, so doubling it gives base * 2 ** failures.
+        interval = current * 2
+    else:
+        state.failures = 0
+        learned = learn_interval(timestamps)
+        if new_entries and learned is not None:
+            target = learned / 2
+            interval = policy.smoothing * target + (1 - policy.smoothing) * current
+            state.quiet_polls = 0
+        elif new_entries:
+            interval = current
+            state.quiet_polls = 0
+        else:
+            state.quiet_polls += 1
+            interval = current * policy.backoff_factor
+    state.poll_interval = policy.clamp(interval)
+    state.next_poll_at = now + timedelta(seconds=state.poll_interval)
+
+
+def is_due(state: FeedState | None, now: datetime) -> bool:
+    return state is None or state.next_poll_at is None or state.next_poll_at <= now
+
+
+def due_feeds(feeds: List[Dict], states: Dict[str, FeedState], now: datetime) -> List[Dict]:
+    return [feed for feed in feeds if is_due(states.get(feed["url"]), now)]
+
+
+__all__ = ["CadencePolicy", "learn_interval", "record_poll", "is_due", "due_feeds"]
@@ -0,0 +1,157 @@
+"""Infographic charts: NumPy lays out every mark at once, Pillow rasterizes them in one pass."""
+from __future__ import annotations
+
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+Font = ImageFont.FreeTypeFont | ImageFont.ImageFont
+Color = Tuple[int, int, int]
+
+CHART_KINDS = ("bar", "line", "table")
+BACKGROUND = (255, 255, 255)
+INK = (40, 40, 40)
+GRID = (225, 229, 235)
+MARGIN = 40
+VALUE_GUTTER = 170
+
+
+def nice_ticks(peak: float, count: int = 5) -> np.ndarray:
+    """Round axis ticks from 0 up to at least ``peak`` using 1/2/2.5/5 steps."""
+    peak = float(peak) if peak > 0 else 1.0
+    raw = peak / count
+    magnitude = 10 ** np.floor(np.log10(raw))
+    steps = np.array([1.0, 2.0, 2.5, 5.0, 10.0]) * magnitude
+    step = steps[np.argmax(steps >= raw)]
+    return np.arange(0.0, np.ceil(peak / step) * step + step / 2, step)
+
+
+def format_value(value: float, unit: str) -> str:
+    number = f"{value:,.0f}" if value >= 100 or value == int(value) else f"{value:,.1f}"
+    return f"{number}{unit}" if unit == "%" else f"{number} {unit}".strip()
+
+
+def bar_layout(values: np.ndarray, box: Tuple[float, float, float, float], ticks: np.ndarray) -> np.ndarray:
+    """Horizontal bars as an ``(n, 4)`` array of ``x0, y0, x1, y1`` inside ``box``."""
+    left, top, right, bottom = box
+    slot = (bottom - top) / len(values)
+    y0 = top + np.arange(len(values)) * slot + slot * 0.2
+    lengths = np.maximum(values / ticks[-1] * (right - left), 2.0)
+    return np.column_stack([np.full_like(y0, left), y0, left + lengths, y0 + slot * 0.6])
+
+
+def line_layout(values: np.ndarray, box: Tuple[float, float, float, float], ticks: np.ndarray) -> np.ndarray:
+    """Polyline vertices as an ``(n, 2)`` array, evenly spaced across ``box``."""
+    left, top, right, bottom = box
+    xs = np.linspace(left, right, len(values)) if len(values) > 1 else np.array([(left + right) / 2])
+    ys = bottom - values / ticks[-1] * (bottom - top)
+    return np.column_stack([xs, ys])
+
+
+def table_layout(rows: int, widths: Sequence[float], box: Tuple[float, float, float, float]) -> np.ndarray:
+    """Cell boxes as an ``(rows + 1, columns, 4)`` array; row 0 is the header."""
+    left, top, right, bottom = box
+    edges = left + np.concatenate([[0.0], np.cumsum(widths)]) / np.sum(widths) * (right - left)
+    row_edges = np.linspace(top, bottom, rows + 2)
+    x0, y0 = np.meshgrid(edges[:-1], row_edges[:-1])
+    x1, y1 = np.meshgrid(edges[1:], row_edges[1:])
+    return np.stack([x0, y0, x1, y1], axis=-1)
+
+
+def _fit(draw: ImageDraw.ImageDraw, text: str, font: Font, width: float) -> str:
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_chart(
+    title: str,
+    chart: str,
+    labels: Sequence[str],
+    values: Sequence[float],
+    unit: str,
+    size: Tuple[int, int],
+    palette: Sequence[Color],
+    font: Callable[[int], Font],
+    font_size: int = 28,
+) -> Image.Image:
+    """Draw ``chart`` ("bar", "line" or "table") of ``labels``/``values`` on a white canvas."""
+    width, height = size
+    image = Image.new("RGB", size, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    title_font, body = font(font_size + 12), font(font_size)
+    draw.text((MARGIN, MARGIN), title, fill=palette[2 % len(palette)], font=title_font)
+    if not len(values):
+        return image
+    data = np.asarray(values, dtype=np.float64)
+    ticks = nice_ticks(float(data.max()))
+    top = MARGIN * 2 + font_size + 12
+    half = font_size / 2
+
+    if chart == "table":
+        cells = table_layout(len(data), (0.45, 0.2, 0.35), (MARGIN, top, width - MARGIN, height - MARGIN))
+        bars = cells[1:, 2].copy()
+        pad = (bars[:, 3] - bars[:, 1]) * 0.3
+        bars[:, 0] += 8
+        bars[:, 1] += pad
+        bars[:, 3] -= pad
+        bars[:, 2] = bars[:, 0] + np.maximum((cells[1:, 2, 2] - cells[1:, 2, 0] - 16) * data / ticks[-1], 2.0)
+        draw.rectangle(tuple(cells[0, 0, :2]) + tuple(cells[0, -1, 2:]), fill=palette[0])
+        for y in cells[1:, 0, 1]:
+            draw.line([(MARGIN, y), (width - MARGIN, y)], fill=GRID, width=2)
+        headers = ("项目", f"数值（{unit}）" if unit else "数值", "对比")
+        for cell, text in zip(cells[0], headers):
+            draw.text((cell[0] + 12, (cell[1] + cell[3]) / 2 - half), text, fill=BACKGROUND, font=body)
+        for idx, (label, value) in enumerate(zip(labels, data)):
+            row = cells[idx + 1]
+            middle = (row[0, 1] + row[0, 3]) / 2 - half
+            draw.text((row[0, 0] + 12, middle), _fit(draw, label, body, row[0, 2] - row[0, 0] - 24), fill=INK, font=body)
+            draw.text((row[1, 0] + 12, middle), format_value(value, unit), fill=INK, font=body)
+            draw.rectangle(tuple(bars[idx]), fill=palette[(idx + 1) % len(palette)])
+        return image
+
+    label_width = width * 0.3 if chart == "bar" else 0
+    box = (
+        MARGIN + label_width,
+        top + (0 if chart == "bar" else font_size),
+        width - MARGIN - VALUE_GUTTER,
+        height - MARGIN - (font_size if chart == "bar" else font_size * 2),
+    )
+    grid_x = box[0] + ticks / ticks[-1] * (box[2] - box[0])
+    grid_y = box[3] - ticks / ticks[-1] * (box[3] - box[1])
+    if chart == "line":
+        for y, tick in zip(grid_y, ticks):
+            draw.line([(box[0], y), (box[2], y)], fill=GRID, width=2)
+            draw.text((box[2] + 12, y - half), format_value(tick, unit), fill=INK, font=body)
+        points = line_layout(data, (box[0] + MARGIN, box[1], box[2] - MARGIN, box[3]), ticks)
+        draw.line([tuple(point) for point in points], fill=palette[0], width=5, joint="curve")
+        radius = 7
+        for idx, (x, y) in enumerate(points):
+            draw.ellipse([(x - radius, y - radius), (x + radius, y + radius)], fill=palette[1 % len(palette)])
+            text = _fit(draw, labels[idx], body, (box[2] - box[0]) / max(len(points), 1))
+            draw.text((x - draw.textlength(text, font=body) / 2, box[3] + half), text, fill=INK, font=body)
+        return image
+
+    for x in grid_x:
+        draw.line([(x, box[1]), (x, box[3])], fill=GRID, width=2)
+    rects = bar_layout(data, box, ticks)
+    text_y = (rects[:, 1] + rects[:, 3]) / 2 - half
+    for idx, (rect, label, value, y) in enumerate(zip(rects, labels, data, text_y)):
+        draw.rectangle(tuple(rect), fill=palette[idx % len(palette)])
+        draw.text((MARGIN, y), _fit(draw, label, body, label_width - 16), fill=INK, font=body)
+        draw.text((rect[2] + 12, y), format_value(value, unit), fill=INK, font=body)
+    return image
+
+
+__all__ = [
+    "CHART_KINDS",
+    "nice_ticks",
+    "format_value",
+    "bar_layout",
+    "line_layout",
+    "table_layout",
+    "render_chart",
+]
@@ -6,14 +6,19 @@ import signal
 import typer
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from rich.console import Console
 
+from .cadence import CadencePolicy
 from .config import load_bundle
 from .monitor import emit_summary
 from .orchestrator import AutobotOrchestrator
-from .taxonomy import TaxonomyManager
+from .publisher import Publisher
+from .taxonomy import TaxonomySyncError
 
 app = typer.Typer(help="Longbo Cloud autonomous publishing toolkit")
+bench_app = typer.Typer(help="性能基准测试")
+app.add_typer(bench_app, name="bench")
 console = Console()
 
 
@@ -22,28 +27,55 @@ def _create_scheduler(orchestrator: AutobotOrchestrator, times: list[str]) -> Bl
     for time_str in times:
         hour, minute = time_str.split(":")
         scheduler.add_job(orchestrator.run_once, CronTrigger(hour=int(hour), minute=int(minute)))
+    if orchestrator.outbox.enabled:
+        scheduler.add_job(
+            orchestrator.drain_outbox,
+            IntervalTrigger(minutes=orchestrator.outbox.policy.drain_minutes),
+            max_instances=1,
+            coalesce=True,
+        )
+    cadence = CadencePolicy.from_config(orchestrator.bundle.schedule.get("adaptive"))
+    if cadence.enabled:
+        scheduler.add_job(
+            orchestrator.poll_due_feeds,
+            IntervalTrigger(minutes=cadence.tick_minutes),
+            max_instances=1,
+            coalesce=True,
+        )
     return scheduler
 
 
+def _run_scheduler(scheduler: BlockingScheduler, orchestrator: AutobotOrchestrator) -> None:
+    """Block on the scheduler; SIGINT/SIGTERM stop it and close pooled connections."""
+
+    def shutdown(signum, frame):  # pragma: no cover - runtime signal handling
+        console.log("接收到退出信号，停止调度器")
+        scheduler.shutdown()
+        orchestrator.close()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        scheduler.start()
+    finally:
+        orchestrator.close()
+
+
 @app.command()
 def start(now: bool = typer.Option(False, "--now", help="立即执行一次完整流程")) -> None:
     bundle = load_bundle()
     orchestrator = AutobotOrchestrator(bundle)
     if now:
-        results = orchestrator.run_once()
+        try:
+            results = orchestrator.run_once()
+        finally:
+            orchestrator.close()
         emit_summary(results)
         return
     times = bundle.schedule.get("windows", ["08:00", "16:00"])
     scheduler = _create_scheduler(orchestrator, times)
     console.log("启动调度器，按计划运行批处理任务")
-
-    def shutdown(signum, frame):  # pragma: no cover - runtime signal handling
-        console.log("接收到退出信号，停止调度器")
-        scheduler.shutdown()
-
-    signal.signal(signal.SIGINT, shutdown)
-    signal.signal(signal.SIGTERM, shutdown)
-    scheduler.start()
+    _run_scheduler(scheduler, orchestrator)
 
 
 @app.command()
@@ -54,15 +86,177 @@ def schedule() -> None:
     times = bundle.schedule.get("windows", ["08:00", "16:00"])
     scheduler = _create_scheduler(orchestrator, times)
     console.log("计划任务已注册，按设定时间执行。")
-    scheduler.start()
+    _run_scheduler(scheduler, orchestrator)
 
 
 @app.command("sync-taxonomy")
 def sync_taxonomy() -> None:
+    """全量同步 WordPress 分类与标签映射。"""
     bundle = load_bundle()
-    manager = TaxonomyManager(bundle.settings)
-    manager.resolve()
-    console.log("分类和标签映射已更新。")
+    settings = bundle.settings
+    if not (settings.wp_user and settings.wp_app_pass):
+        console.log("未配置 WP_USER / WP_APP_PASS，保留本地分类映射。")
+        return
+    with Publisher(settings) as publisher:
+        try:
+            taxonomy_map = publisher.taxonomy.sync_all(publisher.client, (settings.wp_user, settings.wp_app_pass))
+        except TaxonomySyncError as exc:
+            console.log(f"[red]分类同步失败，保留本地映射：{exc}[/red]")
+            raise typer.Exit(code=1) from exc
+    console.log(f"分类和标签映射已更新：{len(taxonomy_map.categories)} 个分类，{len(taxonomy_map.tags)} 个标签。")
+
+
+@app.command("outbox")
+def outbox(drain: bool = typer.Option(False, "--drain", help="立即重试到期的发布任务")) -> None:
+    """查看发布队列状态，可选立即重试。"""
+    orchestrator = AutobotOrchestrator(load_bundle())
+    try:
+        if drain:
+            if not orchestrator.outbox.enabled:
+                console.log("未配置 WP_USER / WP_APP_PASS，发布队列不可用。")
+            else:
+                emit_summary(orchestrator.drain_outbox())
+        counts = orchestrator.outbox.counts()
+    finally:
+        orchestrator.close()
+    console.log("发布队列：" + ("，".join(f"{status} {count}" for status, count in sorted(counts.items())) or "空"))
+
+
+@app.command("refresh")
+def refresh(
+    article_ids: list[int] = typer.Option(None, "--article", help="只更新指定文章 ID，可重复"),
+) -> None:
+    """按差异更新已发布的 WordPress 文章（过期标记、改标题、常青内容刷新）。"""
+    bundle = load_bundle()
+    if not (bundle.settings.wp_user and bundle.settings.wp_app_pass):
+        console.log("未配置 WP_USER / WP_APP_PASS，无法更新已发布文章。")
+        return
+    orchestrator = AutobotOrchestrator(bundle)
+    try:
+        emit_summary(orchestrator.refresh_posts(article_ids or None))
+    finally:
+        orchestrator.close()
+
+
+@app.command("drafts")
+def drafts(limit: int = typer.Option(20, "--limit", help="显示最近的草稿数量")) -> None:
+    """从批次清单列出本地草稿，无需遍历草稿目录。"""
+    from .drafts import DraftStore
+
+    settings = load_bundle().settings
+    entries = list(DraftStore(settings.output_dir).entries())
+    for entry in entries[-limit:]:
+        console.log(f"{entry.get('saved_at', '')[:19]} {entry.get('title')} -> {entry['files'][0]}")
+    console.log(f"共 {len(entries)} 篇草稿。")
+
+
+@app.command("prune-assets")
+def prune_assets(days: float = typer.Option(1.0, "--days", help="仅清理早于该天数的图片")) -> None:
+    """删除没有任何文章引用的封面图片。"""
+    from datetime import timedelta
+
+    from .assetstore import prune_unreferenced
+
+    removed = prune_unreferenced(timedelta(days=days))
+    console.log(f"已清理 {removed} 个未引用的图片文件。")
+
+
+@bench_app.command("research")
+def bench_research(size_mb: float = typer.Option(8.0, "--size-mb", help="语料大小（MB）")) -> None:
+    """测量分句与事实抽取吞吐量（MB/s）。"""
+    from .benchmarks import bench_research as run
+
+    run(size_mb)
+
+
+@bench_app.command("writer")
+def bench_writer(articles: int = typer.Option(500, "--articles", help="生成文章数量")) -> None:
+    """测量文章拼装与规则处理吞吐量（篇/秒）。"""
+    from .benchmarks import bench_writer as run
+
+    run(articles)
+
+
+@bench_app.command("imaging")
+def bench_imaging(
+    covers: int = typer.Option(200, "--covers", help="封面数量"),
+    workers: int = typer.Option(0, "--workers", help="进程数（0 表示 CPU 核数）"),
+) -> None:
+    """对比单进程与进程池的封面渲染吞吐量（张/秒）。"""
+    from .benchmarks import bench_imaging as run
+
+    run(covers, workers)
+
+
+@bench_app.command("links")
+def bench_links(
+    articles: int = typer.Option(2000, "--articles", help="索引文章数量"),
+    queries: int = typer.Option(200, "--queries", help="查询次数"),
+) -> None:
+    """测量内链倒排索引的建索引与推荐耗时（次/秒）。"""
+    from .benchmarks import bench_links as run
+
+    run(articles, queries)
+
+
+@bench_app.command("publish")
+def bench_publish(
+    posts: int = typer.Option(30, "--posts", help="发布文章数量"),
+    handshake: float = typer.Option(0.03, "--handshake", help="模拟每个新连接的握手耗时（秒）"),
+    latency: float = typer.Option(0.005, "--latency", help="模拟每个请求的服务端耗时（秒）"),
+    concurrency: int = typer.Option(4, "--concurrency", help="并发请求上限"),
+) -> None:
+    """用本地 WordPress 替身服务对比逐篇新建连接、连接池串行与并发重叠发布的耗时。"""
+    from .benchmarks import bench_publish as run
+
+    run(posts, handshake, latency, concurrency)
+
+
+@bench_app.command("refresh")
+def bench_refresh(
+    posts: int = typer.Option(200, "--posts", help="更新文章数量"),
+    latency: float = typer.Option(0.005, "--latency", help="模拟每个请求的服务端耗时（秒）"),
+) -> None:
+    """对比整篇重新发布与按字段差异更新的请求数、上传字节与耗时。"""
+    from .benchmarks import bench_refresh as run
+
+    run(posts, latency)
+
+
+@bench_app.command("drafts")
+def bench_drafts(drafts: int = typer.Option(2000, "--drafts", help="草稿数量")) -> None:
+    """测量本地草稿分片写入与批量打包的吞吐量（篇/秒）。"""
+    from .benchmarks import bench_drafts as run
+
+    run(drafts)
+
+
+@bench_app.command("persist")
+def bench_persist(leads: int = typer.Option(300, "--leads", help="入库线索数量")) -> None:
+    """对比逐步提交与单事务入库的线索写入吞吐量（条/秒）。"""
+    from .benchmarks import bench_persist as run
+
+    run(leads)
+
+
+@bench_app.command("charts")
+def bench_charts(charts: int = typer.Option(200, "--charts", help="信息图数量")) -> None:
+    """测量信息图绘制与编码耗时（张/秒）。"""
+    from .benchmarks import bench_charts as run
+
+    run(charts)
+
+
+@bench_app.command("llm")
+def bench_llm(
+    requests: int = typer.Option(16, "--requests", help="请求数量"),
+    delay: float = typer.Option(0.02, "--delay", help="本地桩服务每个分块的延迟（秒）"),
+    concurrency: int = typer.Option(8, "--concurrency", help="并发上限"),
+) -> None:
+    """用本地桩服务测量流式生成吞吐量（篇/秒）。"""
+    from .benchmarks import bench_llm as run
+
+    run(requests, delay, concurrency)
 
 
 def main() -> None:
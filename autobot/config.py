@@ -21,12 +21,34 @@ class Settings(BaseModel):
     wp_base_url: str = Field("https://longbo.cloud", alias="WP_BASE_URL")
     wp_user: str | None = Field(default=None, alias="WP_USER")
     wp_app_pass: str | None = Field(default=None, alias="WP_APP_PASS")
+    wp_timeout: float = Field(30.0, alias="WP_TIMEOUT")
+    wp_max_connections: int = Field(8, alias="WP_MAX_CONNECTIONS")
+    wp_concurrency: int = Field(4, alias="WP_CONCURRENCY")
+    wp_keepalive_seconds: float = Field(60.0, alias="WP_KEEPALIVE_SECONDS")
+    wp_http2: bool = Field(False, alias="WP_HTTP2")
     openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
+    llm_backend: str = Field("rule", alias="LLM_BACKEND")
+    llm_model: str = Field("gpt-4o-mini", alias="LLM_MODEL")
+    llm_base_url: str = Field("https://api.openai.com/v1", alias="LLM_BASE_URL")
+    llm_concurrency: int = Field(4, alias="LLM_CONCURRENCY")
+    llm_timeout: float = Field(120.0, alias="LLM_TIMEOUT")
+    llm_rewrite: bool = Field(False, alias="LLM_REWRITE")
     image_engine: str = Field("auto", alias="IMAGE_ENGINE")
+    image_workers: int = Field(0, alias="IMAGE_WORKERS")
     database_url: str = Field(default=f"sqlite:///{(PROJECT_ROOT / 'autobot.sqlite3').as_posix()}")
+    db_pool_size: int = Field(8, alias="DB_POOL_SIZE")
+    sqlite_wal: bool = Field(True, alias="SQLITE_WAL")
+    sqlite_synchronous: str = Field("NORMAL", alias="SQLITE_SYNCHRONOUS")
+    sqlite_mmap_mb: int = Field(256, alias="SQLITE_MMAP_MB")
+    sqlite_cache_mb: int = Field(64, alias="SQLITE_CACHE_MB")
     assets_dir: Path = Field(default=PROJECT_ROOT / "autobot" / "assets")
     output_dir: Path = Field(default=PROJECT_ROOT / "output")
+    draft_archive: bool = Field(False, alias="DRAFT_ARCHIVE")
     logs_dir: Path = Field(default=PROJECT_ROOT / "autobot" / "logs")
+    cache_dir: Path = Field(default=PROJECT_ROOT / "autobot" / "cache")
+    page_cache_mb: int = Field(256, alias="PAGE_CACHE_MB")
+    taxonomy_ttl_minutes: float = Field(60.0, alias="TAXONOMY_TTL_MINUTES")
+    taxonomy_full_sync_hours: float = Field(24.0, alias="TAXONOMY_FULL_SYNC_HOURS")
 
     class Config:
         populate_by_name = True
@@ -60,6 +82,7 @@ def load_settings() -> Settings:
     settings.assets_dir.mkdir(parents=True, exist_ok=True)
     settings.output_dir.mkdir(parents=True, exist_ok=True)
     settings.logs_dir.mkdir(parents=True, exist_ok=True)
+    settings.cache_dir.mkdir(parents=True, exist_ok=True)
     return settings
 
 
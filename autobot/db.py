@@ -1,11 +1,12 @@
 """Database layer using SQLModel for persistence."""
 from __future__ import annotations
 
+import threading
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, Generator, Optional
+from typing import Any, Dict, Generator, List, Optional
 
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index, UniqueConstraint, event, inspect, make_url, text
 from sqlmodel import Field, Session, SQLModel, create_engine
 
 from .config import Settings, load_settings
@@ -18,28 +19,91 @@ class Task(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     payload: Dict[str, Any] | None = Field(default=None, sa_column=Column(JSON))
+    attempts: int = 0
+    next_attempt_at: datetime | None = Field(default=None, index=True)
+    last_error: str | None = None
+    # Random token of the drain that claimed the task last.
+    claim_token: str | None = Field(default=None, index=True)
 
 
 class Lead(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     url: str = Field(index=True, unique=True)
+    url_key: str | None = Field(default=None, index=True)
     title: str
     source: str
     summary: str | None = None
     published_at: datetime | None = None
     score: float = 0.0
+    status: str = Field(default="new")
+    related_article_id: int | None = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class Fingerprint(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    lead_id: int = Field(index=True)
+    article_id: int | None = Field(default=None, index=True)
+    simhash: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class FingerprintBand(SQLModel, table=True):
+    __table_args__ = (Index("ix_fingerprintband_band_bucket", "band", "bucket"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fingerprint_id: int = Field(index=True)
+    band: int
+    bucket: int
+
+
+class FeedState(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str = Field(index=True, unique=True)
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    content_length: int = 0
+    entry_ids: List[str] | None = Field(default=None, sa_column=Column(JSON))
+    # Unseen entries that lost the ranking, offered again while the feed is unchanged.
+    pending: List[Dict[str, Any]] | None = Field(default=None, sa_column=Column(JSON))
+    checked_at: datetime = Field(default_factory=datetime.utcnow)
+    changed_at: datetime | None = None
+    poll_interval: float | None = None
+    next_poll_at: datetime | None = Field(default=None, index=True)
+    failures: int = 0
+    quiet_polls: int = 0
+
+
+class PageBlock(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("url", "selector"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str = Field(index=True)
+    selector: str
+    block_hash: str
+    changed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Evidence(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     lead_id: int = Field(index=True)
     fact_id: str
     text: str
     source_url: str
+    facts: Dict[str, List[str]] | None = Field(default=None, sa_column=Column(JSON))
     extracted_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class LLMResponse(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cache_key: str = Field(index=True, unique=True)
+    model: str
+    template: str
+    text: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Article(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     lead_id: int = Field(index=True)
@@ -53,17 +117,49 @@ class Article(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class LinkDocument(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    article_id: int = Field(index=True, unique=True)
+    url: str
+    title: str
+    length: int
+    indexed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LinkPosting(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    term: str = Field(index=True)
+    article_id: int = Field(index=True)
+    tf: int
+
+
 class ImageAsset(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     lead_id: int = Field(index=True)
     kind: str = Field(default="cover")
     path: str
+    blob_hash: str | None = Field(default=None, index=True)
     alt_text: str
     width: int
     height: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class AssetBlob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hash: str = Field(index=True, unique=True)
+    kind: str = Field(default="cover")
+    path: str
+    width: int
+    height: int
+    size: int = 0
+    refcount: int = 0
+    remote_site: str | None = None
+    remote_media_id: int | None = None
+    remote_url: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Publish(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     article_id: int = Field(index=True)
@@ -84,17 +180,106 @@ class Metric(SQLModel, table=True):
 
 
 _engine = None
+_engine_lock = threading.Lock()
+
+
+def _add_missing_columns(engine) -> None:
+    """Additive schema migration: create columns that newer models declare.
+
+    ``create_all`` only creates missing tables, so columns added to an existing
+    model are appended here with their scalar default, if any.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if isinstance(default, bool):
+                    ddl += f" DEFAULT {int(default)}"
+                elif isinstance(default, (int, float)):
+                    ddl += f" DEFAULT {default}"
+                elif isinstance(default, str):
+                    ddl += " DEFAULT '" + default.replace("'", "''") + "'"
+                connection.execute(text(ddl))
+                if column.index or column.unique:
+                    unique = "UNIQUE " if column.unique else ""
+                    connection.execute(
+                        text(
+                            f'CREATE {unique}INDEX IF NOT EXISTS "ix_{table.name}_{column.name}" '
+                            f'ON "{table.name}" ("{column.name}")'
+                        )
+                    )
+
+
+def _sqlite_pragmas(settings: Settings) -> List[str]:
+    return [
+        f"PRAGMA journal_mode={'WAL' if settings.sqlite_wal else 'DELETE'}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_mb * 1024 * 1024}",
+        # Negative sizes are KiB rather than pages.
+        f"PRAGMA cache_size={-settings.sqlite_cache_mb * 1024}",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=30000",
+    ]
+
+
+def create_db_engine(settings: Settings):
+    """Engine for ``settings.database_url``.
+
+    A SQLite file gets a connection pool shared by all threads, and every
+    pooled connection is set up with WAL (readers never wait for the
+    writer), ``synchronous=NORMAL`` (one fsync per checkpoint instead of
+    per commit), a memory-mapped file and a larger page cache.
+    """
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return create_engine(url, echo=False)
+    engine = create_engine(
+        url,
+        echo=False,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_pool_size,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    pragmas = _sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
 
 
 def get_engine(settings: Settings | None = None):
     global _engine
-    if _engine is None:
-        settings = settings or load_settings()
-        _engine = create_engine(settings.database_url, echo=False)
-        SQLModel.metadata.create_all(_engine)
+    with _engine_lock:
+        if _engine is None:
+            engine = create_db_engine(settings or load_settings())
+            SQLModel.metadata.create_all(engine)
+            _add_missing_columns(engine)
+            _engine = engine
     return _engine
 
 
+def reset_engine() -> None:
+    """Close the shared engine's connections; the next :func:`get_engine` builds a new one."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
 @contextmanager
 def session_scope(settings: Settings | None = None) -> Generator[Session, None, None]:
     engine = get_engine(settings)
@@ -102,14 +287,42 @@ def session_scope(settings: Settings | None = None) -> Generator[Session, None,
         yield session
 
 
+@contextmanager
+def unit_of_work(settings: Settings | None = None) -> Generator[Session, None, None]:
+    """One transaction: commits once when the block ends, rolls back if it raises.
+
+    Use ``session.flush()`` where generated ids are needed. Objects are not
+    expired by the commit, so they stay readable after the block.
+    """
+    engine = get_engine(settings)
+    with Session(engine, expire_on_commit=False) as session:
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+
+
 __all__ = [
     "Task",
     "Lead",
+    "Fingerprint",
+    "FingerprintBand",
+    "FeedState",
+    "PageBlock",
     "Evidence",
+    "LLMResponse",
     "Article",
+    "LinkDocument",
+    "LinkPosting",
     "ImageAsset",
+    "AssetBlob",
     "Publish",
     "Metric",
+    "create_db_engine",
     "get_engine",
+    "reset_engine",
     "session_scope",
+    "unit_of_work",
 ]
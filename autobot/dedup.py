@@ -1,31 +1,398 @@
 """Deduplication helpers to avoid reprocessing known leads."""
 from __future__ import annotations
 
-from typing import Iterable, List
+import hashlib
+import math
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Iterable, List, Sequence, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from rich.console import Console
-from sqlmodel import select
+from simhash import Simhash
+from sqlalchemy import and_, delete, func, insert, or_
+from sqlmodel import Session, select
 
-from .db import Article, Lead, session_scope
+from .config import load_settings
+from .db import Fingerprint, FingerprintBand, Lead, session_scope
 
 console = Console()
 
+# Kept under ``settings.cache_dir``; it is rebuilt from the leads table whenever it is missing.
+BLOOM_FILE = "url_bloom.bin"
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+# SQLite caps bound parameters per statement; stay well below it.
+LOOKUP_CHUNK = 500
+
+# Watch leads point at the changed block so each change gets its own lead URL.
+WATCH_FRAGMENT_PREFIX = "longbo-watch-"
+# Only parameters known to be click/campaign trackers; generic names such as
+# ``ref`` select content on some sites and must survive normalization.
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "_hsenc",
+    "_hsmi",
+    "igshid",
+    "ref_src",
+    "cmpid",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for dedup: lower-case scheme/host, no tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+        )
+    )
+    fragment = parts.fragment if parts.fragment.startswith(WATCH_FRAGMENT_PREFIX) else ""
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a BLAKE2b digest."""
+
+    _HEADER = struct.Struct("<4sQIQ")
+    _MAGIC = b"LBF1"
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for idx in range(self.hashes):
+            yield (first + idx * second) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            handle.write(self._HEADER.pack(self._MAGIC, self.size, self.hashes, self.count))
+            handle.write(self.bits)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter | None":
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        if len(data) < cls._HEADER.size:
+            return None
+        magic, size, hashes, count = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC or len(data) - cls._HEADER.size != (size + 7) // 8:
+            return None
+        instance = cls.__new__(cls)
+        instance.size = size
+        instance.hashes = hashes
+        instance.bits = bytearray(data[cls._HEADER.size :])
+        instance.count = count
+        return instance
+
+
+class SeenUrlIndex:
+    """Answers "have we seen this URL?" with a Bloom filter in front of an indexed query.
+
+    The filter's ``count`` mirrors the number of stored leads; when the two
+    disagree (first run, crash between insert and save) it is rebuilt from
+    ``Lead.url_key``, back-filling keys for rows that predate the column.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._bloom: BloomFilter | None = None
+
+    def _ensure_bloom(self) -> BloomFilter:
+        if self._bloom is not None:
+            return self._bloom
+        if self.path is None:
+            self.path = load_settings().cache_dir / BLOOM_FILE
+        bloom = BloomFilter.load(self.path)
+        with session_scope() as session:
+            total = session.exec(select(func.count(Lead.id))).one()
+            if bloom is None or bloom.count != total:
+                bloom = self._rebuild(session)
+                bloom.save(self.path)
+        self._bloom = bloom
+        return bloom
+
+    def _rebuild(self, session) -> BloomFilter:
+        missing = session.exec(select(Lead).where(Lead.url_key == None)).all()  # noqa: E711
+        for lead in missing:
+            lead.url_key = normalize_url(lead.url)
+            session.add(lead)
+        if missing:
+            session.commit()
+        bloom = BloomFilter()
+        for url_key in session.exec(select(Lead.url_key)):
+            bloom.add(url_key)
+        console.log(f"Rebuilt seen-URL Bloom filter from {bloom.count} stored leads")
+        return bloom
+
+    def known(self, url_keys: Sequence[str]) -> Set[str]:
+        """Return the subset of ``url_keys`` already stored as leads."""
+        with self._lock:
+            bloom = self._ensure_bloom()
+            candidates = sorted({key for key in url_keys if key in bloom})
+        if not candidates:
+            return set()
+        found: Set[str] = set()
+        with session_scope() as session:
+            for start in range(0, len(candidates), LOOKUP_CHUNK):
+                chunk = candidates[start : start + LOOKUP_CHUNK]
+                found.update(session.exec(select(Lead.url_key).where(Lead.url_key.in_(chunk))))
+        return found
+
+    def remember(self, url_keys: Iterable[str]) -> None:
+        with self._lock:
+            bloom = self._ensure_bloom()
+            for key in url_keys:
+                bloom.add(key)
+            bloom.save(self.path)
+
+
+_seen_index = SeenUrlIndex()
+
+
+def known_url_keys(url_keys: Sequence[str]) -> Set[str]:
+    return _seen_index.known(url_keys)
+
 
 def filter_new_leads(leads: Iterable[Lead]) -> List[Lead]:
+    leads = list(leads)
     if not leads:
         return []
-    with session_scope() as session:
-        existing_urls = {
-            row[0]
-            for row in session.exec(select(Lead.url))
-        }
+    for lead in leads:
+        lead.url_key = lead.url_key or normalize_url(lead.url)
+    existing = _seen_index.known([lead.url_key for lead in leads])
     new_leads: List[Lead] = []
     for lead in leads:
-        if lead.url in existing_urls:
+        if lead.url_key in existing:
             console.log(f"Skipping duplicate lead: {lead.url}")
             continue
+        existing.add(lead.url_key)
         new_leads.append(lead)
     return new_leads
 
 
-__all__ = ["filter_new_leads"]
+def remember_leads(leads: Iterable[Lead]) -> None:
+    """Record freshly stored leads in the seen-URL filter."""
+    _seen_index.remember(lead.url_key or normalize_url(lead.url) for lead in leads)
+
+
+SIMHASH_BITS = 64
+# Six bands of 10-11 bits: see SimhashIndex for what this trades away.
+DEFAULT_SIMHASH_BANDS = 6
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.'%][a-z0-9]+)*")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+
+def text_features(text: str) -> List[str]:
+    """Latin words plus CJK character bigrams, so Chinese text is not one giant token."""
+    text = _TAG_RE.sub(" ", text).lower()
+    features = _WORD_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            features.append(run)
+        features.extend(run[idx : idx + 2] for idx in range(len(run) - 1))
+    return features
+
+
+def lead_simhash(lead: Lead) -> int:
+    """64-bit SimHash over the lead's title and summary.
+
+    Near-duplicates are filtered before research fetches source pages, so
+    only the feed text is available on both sides of the comparison.
+    """
+    return Simhash(text_features(f"{lead.title}\n{lead.summary or ''}"), f=SIMHASH_BITS).value
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & ((1 << SIMHASH_BITS) - 1)
+
+
+class SimhashIndex:
+    """Banded LSH index over stored fingerprints.
+
+    The 64 bits are cut into ``bands`` buckets; a lookup compares only the
+    fingerprints sharing at least one bucket. A pair ``d`` bits apart is
+    always found when ``d < bands``, and beyond that only when some band
+    escaped every flipped bit. Wider bands load fewer candidates but lose
+    recall. With the default 6 bands of 10-11 bits, a lookup reads roughly
+    0.6% of stored fingerprints. Recall is exact up to 5 bits, about 98% at
+    6, 93% at 7, 86% at 8 and 76% at 9 (the 0.85 threshold). Setting
+    ``simhash_bands`` to ``max_distance + 1`` makes recall exact, but 6-bit
+    bands then load about 15% of the index per lookup. Stored bands are
+    rebuilt once when the band count changes.
+    """
+
+    _layouts: Set[int] = set()
+    _layout_lock = threading.Lock()
+
+    def __init__(self, threshold: float, bands: int | None = None) -> None:
+        self.threshold = threshold
+        self.max_distance = int(SIMHASH_BITS * (1 - threshold))
+        self.bands = max(1, min(int(bands or DEFAULT_SIMHASH_BANDS), SIMHASH_BITS))
+        width, extra = divmod(SIMHASH_BITS, self.bands)
+        self._layout: List[tuple[int, int]] = []
+        offset = 0
+        for band in range(self.bands):
+            band_width = width + (1 if band < extra else 0)
+            self._layout.append((offset, (1 << band_width) - 1))
+            offset += band_width
+
+    def buckets(self, value: int) -> List[tuple[int, int]]:
+        return [(band, (value >> offset) & mask) for band, (offset, mask) in enumerate(self._layout)]
+
+    def _ensure_layout(self) -> None:
+        """Re-bucket stored fingerprints once if they were banded with another band count."""
+        if self.bands in self._layouts:
+            return
+        with self._layout_lock, session_scope() as session:
+            if self.bands in self._layouts:
+                return
+            stored = session.exec(select(func.max(FingerprintBand.band))).one()
+            if stored is not None and stored + 1 != self.bands:
+                session.exec(delete(FingerprintBand))
+                rows = [
+                    {"fingerprint_id": fingerprint_id, "band": band, "bucket": bucket}
+                    for fingerprint_id, simhash in session.exec(select(Fingerprint.id, Fingerprint.simhash))
+                    for band, bucket in self.buckets(_to_unsigned(simhash))
+                ]
+                if rows:
+                    session.exec(insert(FingerprintBand), params=rows)
+                session.commit()
+                console.log(f"Re-banded {len(rows) // self.bands} fingerprints into {self.bands} SimHash bands")
+            self._layouts.clear()
+            self._layouts.add(self.bands)
+
+    def similarity(self, first: int, second: int) -> float:
+        return 1 - (first ^ second).bit_count() / SIMHASH_BITS
+
+    def nearest(self, value: int) -> Fingerprint | None:
+        """Best stored fingerprint at or above the threshold, if any."""
+        self._ensure_layout()
+        conditions = [
+            and_(FingerprintBand.band == band, FingerprintBand.bucket == bucket)
+            for band, bucket in self.buckets(value)
+        ]
+        with session_scope() as session:
+            candidates = session.exec(
+                select(Fingerprint).where(
+                    Fingerprint.id.in_(select(FingerprintBand.fingerprint_id).where(or_(*conditions)))
+                )
+            ).all()
+            best: Fingerprint | None = None
+            best_score = self.threshold
+            for candidate in candidates:
+                score = self.similarity(value, _to_unsigned(candidate.simhash))
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is not None:
+                session.expunge(best)
+        return best
+
+    def add(self, value: int, lead_id: int, article_id: int | None = None, session: Session | None = None) -> None:
+        """Store a fingerprint; inside the caller's ``session`` it commits with the caller's transaction."""
+        self._ensure_layout()
+        if session is None:
+            with session_scope() as own:
+                self.add(value, lead_id, article_id, own)
+                own.commit()
+            return
+        fingerprint = Fingerprint(lead_id=lead_id, article_id=article_id, simhash=_to_signed(value))
+        session.add(fingerprint)
+        session.flush()
+        session.add_all(
+            FingerprintBand(fingerprint_id=fingerprint.id, band=band, bucket=bucket)
+            for band, bucket in self.buckets(value)
+        )
+
+
+def filter_near_duplicates(leads: Iterable[Lead], threshold: float, bands: int | None = None) -> tuple[List[Lead], List[Lead]]:
+    """Split leads into fresh ones and near-duplicates of known stories.
+
+    A near-duplicate of a published article is marked ``status="update"`` with
+    ``related_article_id`` pointing at it; any other match, including a copy of
+    another lead in the same batch, is marked ``status="duplicate"``.
+    """
+    index = SimhashIndex(threshold, bands)
+    fresh: List[Lead] = []
+    flagged: List[Lead] = []
+    batch: List[tuple[int, Lead]] = []
+    for lead in leads:
+        value = lead_simhash(lead)
+        match = index.nearest(value)
+        if match is not None:
+            lead.status = "update" if match.article_id else "duplicate"
+            lead.related_article_id = match.article_id
+            console.log(f"Near-duplicate lead ({lead.status}): {lead.title}")
+            flagged.append(lead)
+            continue
+        if any(index.similarity(value, other) >= threshold for other, _ in batch):
+            lead.status = "duplicate"
+            console.log(f"Near-duplicate lead within batch: {lead.title}")
+            flagged.append(lead)
+            continue
+        batch.append((value, lead))
+        fresh.append(lead)
+    return fresh, flagged
+
+
+def index_lead_fingerprint(
+    lead: Lead, article_id: int | None, threshold: float, bands: int | None = None, session: Session | None = None
+) -> None:
+    SimhashIndex(threshold, bands).add(lead_simhash(lead), lead.id or 0, article_id, session)
+
+
+__all__ = [
+    "WATCH_FRAGMENT_PREFIX",
+    "normalize_url",
+    "BloomFilter",
+    "SeenUrlIndex",
+    "known_url_keys",
+    "filter_new_leads",
+    "remember_leads",
+    "SimhashIndex",
+    "text_features",
+    "lead_simhash",
+    "filter_near_duplicates",
+    "index_lead_fingerprint",
+]
@@ -1,14 +1,23 @@
-"""Lead discovery from RSS/JSON sources."""
+"""Lead discovery from RSS/JSON sources and watched official pages."""
 from __future__ import annotations
 
+import hashlib
+import heapq
+from itertools import chain
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Iterable, List
+from typing import Dict, Iterator, List, Tuple
 
 import feedparser
 from rich.console import Console
+from selectolax.parser import HTMLParser
+from sqlmodel import select
 
+from .cadence import CadencePolicy, due_feeds, record_poll
 from .config import ConfigBundle
-from .db import Lead
+from .db import FeedState, Lead, PageBlock, session_scope
+from .dedup import WATCH_FRAGMENT_PREFIX, known_url_keys, normalize_url
+from .fetcher import FetchLimits, FetchRequest, FetchResult, fetch_many
 
 console = Console()
 
@@ -27,35 +36,441 @@ def _normalize_datetime(entry: Dict) -> datetime | None:
     return None
 
 
-def discover_leads(bundle: ConfigBundle) -> List[Lead]:
-    feeds: Iterable[Dict] = bundle.sources.get("feeds", [])
-    leads: List[Lead] = []
-    for feed_config in feeds:
-        url = feed_config.get("url")
-        if not url:
+MAX_ENTRY_IDS = 200
+MAX_WATCH_SUMMARY = 2000
+# Unseen entries a feed keeps between runs; each run can take only K of them.
+MAX_PENDING_ENTRIES = 50
+MAX_PENDING_SUMMARY = 1000
+
+
+@dataclass(slots=True)
+class DiscoveryStats:
+    fetched: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.fetched} fetched, {self.not_modified} not modified (304), "
+            f"{self.unchanged} unchanged bodies, {self.failed} failed; "
+            f"{self.bytes_downloaded} bytes downloaded, {self.bytes_saved} bytes saved"
+        )
+
+
+def _conditional_headers(state: FeedState | None) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if state is None:
+        return headers
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+    return headers
+
+
+def _entry_id(entry: Dict) -> str:
+    return entry.get("id") or entry.get("link") or entry.get("title", "")
+
+
+def _load_feed_states(urls: List[str]) -> Dict[str, FeedState]:
+    if not urls:
+        return {}
+    with session_scope() as session:
+        states = session.exec(select(FeedState).where(FeedState.url.in_(urls))).all()
+        for state in states:
+            session.expunge(state)
+    return {state.url: state for state in states}
+
+
+def _save_feed_states(states: List[FeedState]) -> None:
+    if not states:
+        return
+    with session_scope() as session:
+        for state in states:
+            session.merge(state)
+        session.commit()
+
+
+def _check_freshness(url: str, result: FetchResult, state: FeedState | None, stats: DiscoveryStats) -> tuple[FeedState, bool]:
+    """Update the validator store for ``url`` and report whether the body needs parsing."""
+    state = state or FeedState(url=url)
+    state.checked_at = datetime.utcnow()
+    if result.status == 304:
+        stats.not_modified += 1
+        stats.bytes_saved += state.content_length
+        return state, False
+    stats.fetched += 1
+    stats.bytes_downloaded += len(result.content)
+    state.etag = result.headers.get("etag") or state.etag
+    state.last_modified = result.headers.get("last-modified") or state.last_modified
+    content_hash = hashlib.sha256(result.content).hexdigest()
+    if content_hash == state.content_hash:
+        stats.unchanged += 1
+        return state, False
+    state.content_hash = content_hash
+    state.content_length = len(result.content)
+    state.changed_at = state.checked_at
+    return state, True
+
+
+Validators = Tuple[str | None, str | None, str | None, int]
+
+
+def _validators(state: FeedState | None) -> Validators:
+    if state is None:
+        return None, None, None, 0
+    return state.etag, state.last_modified, state.content_hash, state.content_length
+
+
+def _rewind(state: FeedState, validators: Validators) -> None:
+    """Restore validators so the next poll downloads and parses the feed again."""
+    state.etag, state.last_modified, state.content_hash, state.content_length = validators
+
+
+def _freshness(published_at: datetime | None, now: datetime, half_life_hours: float) -> float:
+    """Exponential decay of an entry's age; undated entries count as one half-life old."""
+    if published_at is None:
+        return 0.5
+    age_hours = max((now - published_at).total_seconds() / 3600.0, 0.0)
+    return 0.5 ** (age_hours / half_life_hours)
+
+
+def _pending_record(lead: Lead) -> Dict[str, str | None]:
+    return {
+        "url": lead.url,
+        "title": lead.title,
+        "source": lead.source,
+        "summary": (lead.summary or "")[:MAX_PENDING_SUMMARY],
+        "published_at": lead.published_at.isoformat() if lead.published_at else None,
+    }
+
+
+def _pending_lead(record: Dict[str, str | None]) -> Lead:
+    published_at = record.get("published_at")
+    return Lead(
+        url=record["url"],
+        url_key=normalize_url(record["url"]),
+        title=record.get("title") or "Untitled",
+        source=record.get("source") or "Unknown",
+        summary=record.get("summary") or "",
+        published_at=datetime.fromisoformat(published_at) if published_at else None,
+    )
+
+
+def _iter_pending(feed_config: Dict, state: FeedState) -> Iterator[Tuple[Dict, Lead]]:
+    pending = [_pending_lead(record) for record in state.pending or []]
+    known = known_url_keys([lead.url_key for lead in pending])
+    for lead in pending:
+        if lead.url_key not in known:
+            yield feed_config, lead
+
+
+def _iter_candidates(
+    feeds: List[Dict],
+    results: List[FetchResult],
+    states: Dict[str, FeedState],
+    stats: DiscoveryStats,
+    updated_states: List[FeedState],
+    policy: CadencePolicy,
+    now: datetime,
+) -> Iterator[Tuple[Dict, Lead]]:
+    """Yield ``(feed_config, lead)`` for every entry not stored as a lead yet.
+
+    A changed feed yields its parsed entries. An unchanged one (304 or same
+    body) yields the entries that lost the ranking on an earlier run, kept in
+    ``FeedState.pending``, so they compete again without a second download.
+    """
+    for feed_config, result in zip(feeds, results):
+        url = feed_config["url"]
+        if result.error is not None:
+            stats.failed += 1
+            console.log(f"[yellow]Feed fetch failed for {url}: {result.error}[/yellow]")
+            state = states.get(url) or FeedState(url=url)
+            record_poll(state, policy, now=now, failed=True)
+            updated_states.append(state)
             continue
-        parsed = feedparser.parse(url)
-        entries = parsed.get("entries", [])
-        if not entries:
+        state, changed = _check_freshness(url, result, states.get(url), stats)
+        updated_states.append(state)
+        if not changed:
+            record_poll(state, policy, now=now)
+            yield from _iter_pending(feed_config, state)
             continue
-        entry = entries[0]
-        title = entry.get("title", "Untitled")
-        link = entry.get("link", url)
-        summary = entry.get("summary", "")
-        published_at = _normalize_datetime(entry)
-        lead = Lead(
-            url=link,
-            title=title,
-            source=feed_config.get("name", parsed.get("feed", {}).get("title", "Unknown")),
-            summary=summary,
-            published_at=published_at,
-            score=float(feed_config.get("score", 1.0)),
+        parsed = feedparser.parse(result.content, response_headers=result.headers)
+        result.content = b""
+        entries = parsed.get("entries", [])
+        previous_ids = set(state.entry_ids or [])
+        state.entry_ids = [_entry_id(entry) for entry in entries[:MAX_ENTRY_IDS]]
+        record_poll(
+            state,
+            policy,
+            now=now,
+            new_entries=sum(1 for entry_id in state.entry_ids if entry_id not in previous_ids),
+            timestamps=(_normalize_datetime(entry) for entry in entries),
         )
-        leads.append(lead)
-        console.log(f"Discovered lead from {lead.source}: {lead.title}")
-        if len(leads) >= bundle.thresholds.get("max_leads_per_batch", 1):
-            break
+        source = feed_config.get("name", parsed.get("feed", {}).get("title", "Unknown"))
+        links = [entry.get("link", url) for entry in entries]
+        known = known_url_keys([normalize_url(link) for link in links])
+        for entry, link in zip(entries, links):
+            url_key = normalize_url(link)
+            if url_key not in known:
+                yield feed_config, Lead(
+                    url=link,
+                    url_key=url_key,
+                    title=entry.get("title", "Untitled"),
+                    source=source,
+                    summary=entry.get("summary", ""),
+                    published_at=_normalize_datetime(entry),
+                )
+
+
+class _TopK:
+    """Bounded min-heap keeping the K best-ranked leads, one per normalized URL."""
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self._heap: List[Tuple[float, int, Lead]] = []
+        self._ranks: Dict[str, float] = {}
+        self._seq = 0
+
+    def accepts(self, url_key: str, rank: float) -> bool:
+        if rank <= self._ranks.get(url_key, -1.0):
+            return False
+        if url_key in self._ranks:
+            return True
+        return len(self._heap) < self.k or rank > self._heap[0][0]
+
+    def __contains__(self, url_key: str) -> bool:
+        return url_key in self._ranks
+
+    def push(self, rank: float, lead: Lead) -> Lead | None:
+        """Keep ``lead``; returns the lead it pushed out of the top K, if any."""
+        if lead.url_key in self._ranks:
+            # The same story syndicated by a better-ranked source replaces the weaker copy.
+            self._heap = [item for item in self._heap if item[2].url_key != lead.url_key]
+            heapq.heapify(self._heap)
+            del self._ranks[lead.url_key]
+        # Ties keep the earlier candidate: the later sequence number sorts lower.
+        self._seq += 1
+        item = (rank, -self._seq, lead)
+        evicted = None
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        else:
+            evicted = heapq.heapreplace(self._heap, item)[2]
+            del self._ranks[evicted.url_key]
+        self._ranks[lead.url_key] = rank
+        return evicted
+
+    def leads(self) -> List[Lead]:
+        return [lead for _, _, lead in sorted(self._heap, reverse=True)]
+
+
+def _block_text(tree: HTMLParser, selector: str) -> str:
+    return " ".join(node.text(separator=" ", strip=True) for node in tree.css(selector)).strip()
+
+
+def _load_page_blocks(urls: List[str]) -> Dict[Tuple[str, str], PageBlock]:
+    if not urls:
+        return {}
+    with session_scope() as session:
+        blocks = session.exec(select(PageBlock).where(PageBlock.url.in_(urls))).all()
+        for block in blocks:
+            session.expunge(block)
+    return {(block.url, block.selector): block for block in blocks}
+
+
+# Changed blocks whose lead is not stored yet, by the lead's url_key.
+_pending_blocks: Dict[str, PageBlock] = {}
+
+
+def _save_page_blocks(blocks: List[PageBlock]) -> None:
+    if not blocks:
+        return
+    with session_scope() as session:
+        for block in blocks:
+            session.merge(block)
+        session.commit()
+
+
+def record_watch_leads(leads: List[Lead]) -> None:
+    """Save the block hashes behind stored watch leads; called once the leads are in the database."""
+    _save_page_blocks([block for lead in leads if (block := _pending_blocks.pop(lead.url_key or "", None))])
+
+
+def _iter_watch_leads(
+    watches: List[Dict],
+    results: List[FetchResult],
+    states: Dict[str, FeedState],
+    stats: DiscoveryStats,
+    updated_states: List[FeedState],
+    policy: CadencePolicy,
+    now: datetime,
+) -> Iterator[Lead]:
+    """Yield a lead for every configured key block whose text hash changed.
+
+    Only the configured blocks are hashed, so navigation or ad churn elsewhere
+    on the page never produces a lead. A block seen for the first time is
+    recorded as the baseline without emitting anything. A changed block's
+    new hash is saved only by :func:`record_watch_leads` once its lead is
+    stored, and the page keeps its old validators until then, so a lead
+    that loses the ranking is offered again on the next poll.
+    """
+    blocks = _load_page_blocks([watch["url"] for watch in watches])
+    settled: List[PageBlock] = []
+    _pending_blocks.clear()
+    for watch_config, result in zip(watches, results):
+        url = watch_config["url"]
+        if result.error is not None:
+            stats.failed += 1
+            console.log(f"[yellow]Watch fetch failed for {url}: {result.error}[/yellow]")
+            state = states.get(url) or FeedState(url=url)
+            record_poll(state, policy, now=now, failed=True)
+            updated_states.append(state)
+            continue
+        validators = _validators(states.get(url))
+        state, changed = _check_freshness(url, result, states.get(url), stats)
+        updated_states.append(state)
+        if not changed:
+            record_poll(state, policy, now=now)
+            continue
+        tree = HTMLParser(result.content)
+        result.content = b""
+        changed_blocks: List[Tuple[PageBlock, Lead]] = []
+        for selector in watch_config.get("blocks", []):
+            text = _block_text(tree, selector)
+            if not text:
+                continue
+            block_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            block = blocks.get((url, selector))
+            if block is not None and block.block_hash == block_hash:
+                continue
+            if block is None:
+                settled.append(PageBlock(url=url, selector=selector, block_hash=block_hash, changed_at=now))
+                continue
+            block.block_hash = block_hash
+            block.changed_at = now
+            name = watch_config.get("name", url)
+            lead_url = f"{url}#{WATCH_FRAGMENT_PREFIX}{block_hash[:12]}"
+            lead = Lead(
+                url=lead_url,
+                url_key=normalize_url(lead_url),
+                title=f"{name}: {text[:80]}",
+                source=name,
+                summary=text[:MAX_WATCH_SUMMARY],
+                published_at=now,
+                score=float(watch_config.get("score", 1.0)),
+            )
+            changed_blocks.append((block, lead))
+        record_poll(state, policy, now=now, new_entries=len(changed_blocks))
+        # A lead stored by an earlier run that stopped before saving its block needs no second chance.
+        known = known_url_keys([lead.url_key for _, lead in changed_blocks])
+        settled.extend(block for block, lead in changed_blocks if lead.url_key in known)
+        pending = [(block, lead) for block, lead in changed_blocks if lead.url_key not in known]
+        if pending:
+            _rewind(state, validators)
+        for block, lead in pending:
+            _pending_blocks[lead.url_key] = block
+            yield lead
+    _save_page_blocks(settled)
+
+
+def discover_leads(
+    bundle: ConfigBundle,
+    stats: DiscoveryStats | None = None,
+    due_only: bool = False,
+) -> List[Lead]:
+    """Rank every feed entry and watched-page change, returning the top ``max_leads_per_batch``.
+
+    Candidates are streamed through a min-heap of size K, so memory stays
+    bounded however many entries the feeds carry. Rank is the source
+    ``score`` scaled by freshness; candidates ranking below ``score_floor``
+    are dropped. Per feed, up to ``MAX_PENDING_ENTRIES`` unseen entries that
+    lost the ranking are saved with its state and compete again on the next
+    run, even when the feed answers 304. With ``due_only`` only sources whose
+    adaptive poll time has passed are fetched, but every feed's saved entries
+    still compete, so a backed-off feed does not hold them back.
+    """
+    stats = stats if stats is not None else DiscoveryStats()
+    now = datetime.utcnow()
+    policy = CadencePolicy.from_config(bundle.schedule.get("adaptive"))
+    feeds: List[Dict] = [feed for feed in bundle.sources.get("feeds", []) if feed.get("url")]
+    watches: List[Dict] = [watch for watch in bundle.sources.get("watch", []) if watch.get("url")]
+    limits = FetchLimits.from_config(bundle.sources.get("fetch"))
+    states = _load_feed_states([source["url"] for source in feeds + watches])
+    # Ranked-out entries need no fetch, so they compete on every run whatever the feed's cadence.
+    resting: List[Dict] = []
+    if due_only:
+        due = due_feeds(feeds, states, now)
+        resting = [feed for feed in feeds if feed not in due and states[feed["url"]].pending]
+        feeds = due
+        watches = due_feeds(watches, states, now)
+        if not feeds and not watches and not resting:
+            return []
+    requests = [
+        FetchRequest(url=source["url"], headers=_conditional_headers(states.get(source["url"])))
+        for source in feeds + watches
+    ]
+    results = fetch_many(requests, limits)
+    feed_results, watch_results = results[: len(feeds)], results[len(feeds) :]
+
+    k = max(1, int(bundle.thresholds.get("max_leads_per_batch", 1)))
+    top = _TopK(k)
+    score_floor = float(bundle.thresholds.get("score_floor", 0.0))
+    half_life = float(bundle.thresholds.get("freshness_half_life_hours", 48))
+    updated_states: List[FeedState] = []
+    # Feed of each lead currently in the top K.
+    origins: Dict[str, str] = {}
+    # Per feed, the best entries that lost the ranking, bounded by MAX_PENDING_ENTRIES.
+    deferred: Dict[str, _TopK] = {}
+
+    def keep(rank: float, lead: Lead) -> None:
+        evicted = top.push(rank, lead)
+        if evicted is not None and evicted.url_key in origins:
+            defer(origins.pop(evicted.url_key), evicted)
+
+    def defer(feed_url: str, lead: Lead) -> None:
+        backlog = deferred.setdefault(feed_url, _TopK(MAX_PENDING_ENTRIES))
+        if backlog.accepts(lead.url_key, lead.score):
+            backlog.push(lead.score, lead)
+
+    candidates = _iter_candidates(feeds, feed_results, states, stats, updated_states, policy, now)
+    for feed_config in resting:
+        updated_states.append(states[feed_config["url"]])
+        candidates = chain(candidates, _iter_pending(feed_config, states[feed_config["url"]]))
+    for feed_config, lead in candidates:
+        lead.score = float(feed_config.get("score", 1.0)) * _freshness(lead.published_at, now, half_life)
+        if lead.score < score_floor:
+            continue
+        if not top.accepts(lead.url_key, lead.score):
+            if lead.url_key not in top:
+                defer(feed_config["url"], lead)
+            continue
+        origins.setdefault(lead.url_key, feed_config["url"])
+        keep(lead.score, lead)
+    for lead in _iter_watch_leads(watches, watch_results, states, stats, updated_states, policy, now):
+        if lead.score >= score_floor and top.accepts(lead.url_key, lead.score):
+            keep(lead.score, lead)
+    offered = {feed["url"] for feed, result in zip(feeds, feed_results) if result.error is None}
+    offered.update(feed["url"] for feed in resting)
+    waiting = 0
+    for state in updated_states:
+        if state.url in offered:
+            backlog = deferred.get(state.url)
+            records = [_pending_record(lead) for lead in backlog.leads() if lead.url_key not in top] if backlog else []
+            state.pending = records or None
+            waiting += len(records)
+    if waiting:
+        console.log(f"{waiting} unseen entries lost the ranking; they compete again next run without a refetch")
+    _save_feed_states(updated_states)
+    console.log(f"Discovery: {stats.summary()}")
+
+    leads = top.leads()
+    for lead in leads:
+        console.log(f"Discovered lead from {lead.source} (rank {lead.score:.2f}): {lead.title}")
     return leads
 
 
-__all__ = ["discover_leads"]
+__all__ = ["DiscoveryStats", "discover_leads", "record_watch_leads"]
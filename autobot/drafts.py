@@ -0,0 +1,166 @@
+"""Local draft store: hash-sharded files, atomic writes and a JSONL manifest per batch."""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import secrets
+import tarfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from rich.console import Console
+
+from .assetstore import link_or_copy
+from .fsutil import atomic_write
+
+console = Console()
+
+MANIFEST_DIR = "manifests"
+ARCHIVE_DIR = "archives"
+ARCHIVE_SUFFIX = ".tar.gz"
+
+
+def shard_for(slug: str) -> str:
+    """Two hex characters of the slug's hash: 256 subdirectories of similar size."""
+    return hashlib.sha1(slug.encode("utf-8")).hexdigest()[:2]
+
+
+def _place(source: Path, target: Path) -> None:
+    """Hardlink (or copy) ``source`` under a temporary name, then rename it to ``target``."""
+    if target.exists():
+        try:
+            if os.path.samefile(source, target):
+                return
+        except OSError:
+            pass
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    link_or_copy(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class DraftBatch:
+    """Drafts saved by one publish batch, indexed by ``manifests/<batch>.jsonl``.
+
+    A manifest line is appended only after the draft's files are in place,
+    so every entry points at complete files. In archive mode the drafts are
+    collected in memory and written as ``archives/<batch>.tar.gz`` when the
+    batch closes; their manifest lines follow the archive's rename.
+    """
+
+    def __init__(self, store: "DraftStore", batch_id: str) -> None:
+        self.store = store
+        self.id = batch_id
+        self._lock = threading.Lock()
+        self._members: List[Tuple[str, bytes | Path]] = []
+        self._pending: List[Dict[str, Any]] = []
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.store.root / MANIFEST_DIR / f"{self.id}.jsonl"
+
+    @property
+    def archive_path(self) -> Path:
+        return self.store.root / ARCHIVE_DIR / f"{self.id}{ARCHIVE_SUFFIX}"
+
+    def locate(self, slug: str, name: str) -> str:
+        """Where file ``name`` of draft ``slug`` ends up: a path, or ``<archive>#<member>`` in archive mode."""
+        member = f"{shard_for(slug)}/{name}"
+        if self.store.archive:
+            return f"{self.archive_path}#{member}"
+        return str(self.store.root / member)
+
+    def save(
+        self, slug: str, blobs: Dict[str, bytes], files: Dict[str, Path], record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Store generated ``blobs`` and linked ``files`` (both keyed by file name) for one draft.
+
+        Returns the manifest entry: ``record`` plus the location of every file.
+        """
+        entry = {
+            **record,
+            "slug": slug,
+            "batch": self.id,
+            "files": [self.locate(slug, name) for name in [*blobs, *files]],
+            "saved_at": datetime.utcnow().isoformat(),
+        }
+        shard = shard_for(slug)
+        with self._lock:
+            if self.store.archive:
+                self._members.extend((f"{shard}/{name}", data) for name, data in blobs.items())
+                self._members.extend((f"{shard}/{name}", path) for name, path in files.items())
+                self._pending.append(entry)
+                return entry
+            directory = self.store.root / shard
+            directory.mkdir(parents=True, exist_ok=True)
+            for name, path in files.items():
+                _place(path, directory / name)
+            # The HTML and JSON land last, so a visible draft always has its images.
+            for name, data in blobs.items():
+                atomic_write(directory / name, data)
+            self._append([entry])
+        return entry
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._members:
+                return
+            self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.archive_path.with_name(f".{self.archive_path.name}.{os.getpid()}.tmp")
+            with tarfile.open(tmp_path, "w:gz", compresslevel=6) as archive:
+                for name, content in self._members:
+                    if isinstance(content, Path):
+                        archive.add(content, arcname=name)
+                        continue
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    info.mtime = int(datetime.utcnow().timestamp())
+                    archive.addfile(info, io.BytesIO(content))
+            os.replace(tmp_path, self.archive_path)
+            self._append(self._pending)
+            console.log(f"[yellow]{len(self._pending)} 篇草稿已打包：{self.archive_path}[/yellow]")
+            self._members.clear()
+            self._pending.clear()
+
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with self.manifest_path.open("a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+    def __enter__(self) -> "DraftBatch":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class DraftStore:
+    """Drafts under ``<root>/<aa>/<slug>.*`` (or packed per batch), listed through JSONL manifests."""
+
+    def __init__(self, root: Path, archive: bool = False) -> None:
+        self.root = root
+        self.archive = archive
+
+    def batch(self) -> DraftBatch:
+        return DraftBatch(self, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{secrets.token_hex(3)}")
+
+    def manifests(self) -> List[Path]:
+        return sorted((self.root / MANIFEST_DIR).glob("*.jsonl"))
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Every draft in manifest order, without walking the shard directories."""
+        for path in self.manifests():
+            with path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; its draft is re-saved on the next run.
+                        continue
+
+
+__all__ = ["DraftBatch", "DraftStore", "shard_for"]
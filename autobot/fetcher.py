@@ -0,0 +1,148 @@
+"""Concurrent HTTP fetching for discovery sources."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+import httpx
+from rich.console import Console
+from yarl import URL
+
+from . import __version__
+
+console = Console()
+
+USER_AGENT = f"LongboCloudAutobot/{__version__} (+https://longbo.cloud)"
+
+
+@dataclass(slots=True)
+class FetchLimits:
+    concurrency: int = 16
+    per_host: int = 2
+    timeout: float = 15.0
+    budget: float = 120.0
+
+    @classmethod
+    def from_config(cls, data: Dict[str, Any] | None) -> "FetchLimits":
+        data = data or {}
+        defaults = cls()
+        return cls(
+            concurrency=max(1, int(data.get("concurrency", defaults.concurrency))),
+            per_host=max(1, int(data.get("per_host", defaults.per_host))),
+            timeout=float(data.get("timeout", defaults.timeout)),
+            budget=float(data.get("budget", defaults.budget)),
+        )
+
+
+@dataclass(slots=True)
+class FetchRequest:
+    url: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class FetchResult:
+    url: str
+    status: int = 0
+    content: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300
+
+
+def _host_of(url: str) -> str:
+    try:
+        return (URL(url).host or "").lower()
+    except ValueError:
+        return ""
+
+
+async def _fetch_one(
+    client: httpx.AsyncClient,
+    request: FetchRequest,
+    global_gate: asyncio.Semaphore,
+    host_gate: asyncio.Semaphore,
+    limits: FetchLimits,
+) -> FetchResult:
+    async with host_gate, global_gate:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                client.get(request.url, headers=request.headers),
+                timeout=limits.timeout,
+            )
+        except asyncio.TimeoutError:
+            return FetchResult(url=request.url, elapsed=time.perf_counter() - started, error="timeout")
+        except httpx.HTTPError as exc:
+            return FetchResult(url=request.url, elapsed=time.perf_counter() - started, error=str(exc) or type(exc).__name__)
+        result = FetchResult(
+            url=request.url,
+            status=response.status_code,
+            content=response.content,
+            headers=dict(response.headers),
+            elapsed=time.perf_counter() - started,
+        )
+        if response.status_code >= 400:
+            result.error = f"HTTP {response.status_code}"
+        return result
+
+
+async def fetch_all(requests: Sequence[FetchRequest], limits: FetchLimits | None = None) -> List[FetchResult]:
+    """Fetch every request concurrently, returning results in request order.
+
+    A global semaphore caps open requests and a per-host semaphore keeps us
+    polite towards any single origin. Requests still pending when the overall
+    budget runs out are cancelled and reported with ``error="budget exceeded"``.
+    """
+    limits = limits or FetchLimits()
+    if not requests:
+        return []
+    global_gate = asyncio.Semaphore(limits.concurrency)
+    host_gates: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(limits.per_host))
+    client_limits = httpx.Limits(
+        max_connections=limits.concurrency,
+        max_keepalive_connections=limits.concurrency,
+    )
+    async with httpx.AsyncClient(
+        timeout=limits.timeout,
+        limits=client_limits,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    ) as client:
+        tasks = [
+            asyncio.create_task(
+                _fetch_one(client, request, global_gate, host_gates[_host_of(request.url)], limits)
+            )
+            for request in requests
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=limits.budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            console.log(f"[yellow]Fetch budget of {limits.budget:.0f}s exhausted; {len(pending)} requests cancelled[/yellow]")
+
+    results: List[FetchResult] = []
+    for request, task in zip(requests, tasks):
+        if task in done and not task.cancelled() and task.exception() is None:
+            results.append(task.result())
+        elif task in done and not task.cancelled():
+            results.append(FetchResult(url=request.url, error=repr(task.exception())))
+        else:
+            results.append(FetchResult(url=request.url, error="budget exceeded"))
+    return results
+
+
+def fetch_many(requests: Sequence[FetchRequest], limits: FetchLimits | None = None) -> List[FetchResult]:
+    """Synchronous entry point used by the scheduler-driven pipeline."""
+    return asyncio.run(fetch_all(requests, limits))
+
+
+__all__ = ["FetchLimits", "FetchRequest", "FetchResult", "fetch_all", "fetch_many"]
@@ -0,0 +1,16 @@
+"""Filesystem helpers shared by the on-disk stores."""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temporary sibling and rename it over ``path``, so readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+__all__ = ["atomic_write"]
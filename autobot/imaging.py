@@ -1,18 +1,50 @@
 """Image generation utilities using Pillow to create compliant assets."""
 from __future__ import annotations
 
-from datetime import datetime
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
 
 from PIL import Image, ImageDraw, ImageFont
+from rich.console import Console
 
-from .config import PROJECT_ROOT, load_settings
+from .assetstore import AssetStore, register_blobs, relative_path, render_key
+from .config import PROJECT_ROOT, Settings, load_settings
 from .db import ImageAsset, Lead
-from .planner import ContentPlan
+from .charts import render_chart
+from .planner import ContentPlan, Infographic
 
+console = Console()
 
 WIDTH = 1200
 HEIGHT = 630
+MARGIN = 40
+COVER_MAX_BYTES = 300 * 1024
+INFOGRAPHIC_SIZE = (1200, 675)
+INFOGRAPHIC_MAX_BYTES = 200 * 1024
+INFOGRAPHIC_FONT_SIZE = 28
+# Lossless WebP "quality" is compression effort; low effort is fast and still small for charts.
+LOSSLESS_EFFORT = 10
+HERO_FONT_SIZE = 56
+HERO_LINE_HEIGHT = 72
+HERO_MAX_LINES = 4
+STRAPLINE = "Longbo Cloud — Fly, Card, Point"
+
+# First font that exists wins; CJK-capable faces are listed first.
+FONT_CANDIDATES = [
+    PROJECT_ROOT / "autobot" / "fonts" / "NotoSansSC-Bold.otf",
+    Path("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"),
+    Path("/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc"),
+    Path("/System/Library/Fonts/PingFang.ttc"),
+    Path("C:/Windows/Fonts/msyhbd.ttc"),
+    Path("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+]
 
 
 COLORS = [
@@ -24,54 +56,390 @@ COLORS = [
 ]
 
 
-def _draw_background(draw: ImageDraw.ImageDraw) -> None:
+@lru_cache(maxsize=1)
+def _background() -> Image.Image:
+    """Five-stripe canvas drawn once; covers paint on a copy."""
+    image = Image.new("RGB", (WIDTH, HEIGHT))
+    draw = ImageDraw.Draw(image)
     for idx, color in enumerate(COLORS):
         draw.rectangle([
             (idx * WIDTH / len(COLORS), 0),
             ((idx + 1) * WIDTH / len(COLORS), HEIGHT),
         ], fill=color, outline=None)
+    return image
+
+
+@lru_cache(maxsize=8)
+def _font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    for path in FONT_CANDIDATES:
+        if path.exists():
+            return ImageFont.truetype(str(path), size)
+    return ImageFont.load_default(size)
+
+
+# Latin words (with trailing spaces) stay whole; every other character may break.
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][\w'’%$.,:&/-]*\s*|\s+|.")
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont | ImageFont.ImageFont, max_width: float, max_lines: int) -> List[str]:
+    """Greedy line breaking on measured glyph widths; overflow ends in an ellipsis."""
+    lines: List[str] = []
+    current = ""
+    for token in _TOKEN_RE.findall(text):
+        candidate = current + token
+        if current and font.getlength(candidate.rstrip()) > max_width:
+            lines.append(current.rstrip())
+            current = token.lstrip()
+        else:
+            current = candidate
+        # A single word wider than the line is broken by character.
+        while font.getlength(current.rstrip()) > max_width and len(current) > 1:
+            cut = len(current) - 1
+            while cut > 1 and font.getlength(current[:cut]) > max_width:
+                cut -= 1
+            lines.append(current[:cut])
+            current = current[cut:]
+    if current.strip():
+        lines.append(current.rstrip())
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        last = lines[-1]
+        while last and font.getlength(last + "…") > max_width:
+            last = last[:-1]
+        lines[-1] = last + "…"
+    return lines
 
 
 def _draw_text(draw: ImageDraw.ImageDraw, hero: str) -> None:
-    font = ImageFont.load_default()
-    strapline = "Longbo Cloud — Fly, Card, Point"
-    draw.text((40, 40), strapline, fill=(255, 255, 255), font=font)
-    wrapped = []
-    buffer = ""
-    for char in hero:
-        buffer += char
-        if len(buffer) >= 12:
-            wrapped.append(buffer)
-            buffer = ""
-    if buffer:
-        wrapped.append(buffer)
-    for idx, line in enumerate(wrapped[:4]):
-        draw.text((40, 120 + idx * 60), line, fill=(255, 255, 255), font=font)
+    draw.text((MARGIN, MARGIN), STRAPLINE, fill=(255, 255, 255), font=_font(24))
+    font = _font(HERO_FONT_SIZE)
+    for idx, line in enumerate(wrap_text(hero, font, WIDTH - 2 * MARGIN, HERO_MAX_LINES)):
+        draw.text((MARGIN, 120 + idx * HERO_LINE_HEIGHT), line, fill=(255, 255, 255), font=font)
 
 
-def generate_cover_package(lead: Lead, plan: ContentPlan) -> ImageAsset:
-    settings = load_settings()
-    assets_dir = settings.assets_dir
-    assets_dir.mkdir(parents=True, exist_ok=True)
-    image = Image.new("RGB", (WIDTH, HEIGHT))
-    draw = ImageDraw.Draw(image)
-    _draw_background(draw)
-    _draw_text(draw, plan.hero_message[:48])
+@dataclass(slots=True)
+class EncodedImage:
+    data: bytes
+    quality: int
+    method: int
+    passes: int
 
-    filename = f"cover-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.webp"
-    path = assets_dir / filename
-    image.save(path, format="WEBP", quality=85, method=6)
 
-    alt_text = f"抽象旅行主题封面图，标题：{plan.hero_message[:30]}"
-    asset = ImageAsset(
-        lead_id=lead.id or 0,
+def _encode(image: Image.Image, quality: int, method: int, lossless: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=method, lossless=lossless)
+    return buffer.getvalue()
+
+
+def encode_webp(
+    image: Image.Image,
+    max_bytes: int,
+    quality: int = 85,
+    min_quality: int = 40,
+    method: int = 4,
+    max_passes: int = 5,
+    lossless: bool = False,
+) -> EncodedImage:
+    """Highest quality at or under ``max_bytes``, found in as few encodes as possible.
+
+    With ``lossless`` (flat-colour charts) a fast lossless pass is tried
+    first; it keeps text crisp and is usually both smaller and quicker than
+    lossy. The lossy search starts at ``quality``, which usually fits; when it
+    overshoots, the next guess scales quality by the overshoot and a bisection
+    over ``min_quality``..``quality`` narrows it down within ``max_passes``
+    encodes. If no pass fits, a final ``method=6`` pass at ``min_quality``
+    trades time for bytes.
+    """
+    passes = 0
+    if lossless:
+        data = _encode(image, LOSSLESS_EFFORT, 1, lossless=True)
+        passes += 1
+        if len(data) <= max_bytes:
+            return EncodedImage(data, 100, 1, passes)
+    data = _encode(image, quality, method)
+    passes += 1
+    if len(data) <= max_bytes:
+        return EncodedImage(data, quality, method, passes)
+    low, high = min_quality, quality - 1
+    best: EncodedImage | None = None
+    guess = max(low, min(high, int(quality * max_bytes / len(data))))
+    while low <= high and passes < max_passes:
+        data = _encode(image, guess, method)
+        passes += 1
+        if len(data) <= max_bytes:
+            best = EncodedImage(data, guess, method, passes)
+            low = guess + 1
+        else:
+            high = guess - 1
+        guess = (low + high) // 2
+    if best is not None:
+        best.passes = passes
+        return best
+    data = _encode(image, min_quality, 6)
+    return EncodedImage(data, min_quality, 6, passes + 1)
+
+
+def _font_name(size: int) -> str:
+    return str(getattr(_font(size), "path", "default"))
+
+
+@dataclass(slots=True, frozen=True)
+class RenderSpec:
+    """Everything a worker process needs to draw one image; cheap to pickle."""
+
+    kind: str
+    key: str
+    path: str
+    title: str
+    width: int
+    height: int
+    max_bytes: int
+    rows: Tuple[Tuple[str, float], ...] = ()
+    unit: str = ""
+    chart: str = ""
+    lossless: bool = False
+
+
+@dataclass(slots=True)
+class RenderResult:
+    kind: str
+    key: str
+    path: str
+    width: int
+    height: int
+    size: int = 0
+    render_ms: float = 0.0
+    encode_ms: float = 0.0
+    quality: int = 0
+    passes: int = 0
+    reused: bool = False
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def cover_spec(hero: str, engine: str, store: AssetStore) -> RenderSpec:
+    key = render_key(
+        "cover",
+        {
+            "hero": hero,
+            "palette": COLORS,
+            "size": [WIDTH, HEIGHT],
+            "engine": engine,
+            "font": _font_name(HERO_FONT_SIZE),
+            "max_bytes": COVER_MAX_BYTES,
+        },
+    )
+    return RenderSpec(
         kind="cover",
-        path=str(path.relative_to(PROJECT_ROOT)),
-        alt_text=alt_text,
+        key=key,
+        path=str(store.path_for(key, "cover")),
+        title=hero,
         width=WIDTH,
         height=HEIGHT,
+        max_bytes=COVER_MAX_BYTES,
+    )
+
+
+def infographic_spec(infographic: Infographic, engine: str, store: AssetStore) -> RenderSpec:
+    width, height = INFOGRAPHIC_SIZE
+    rows = tuple((label, float(value)) for label, value in infographic.rows)
+    key = render_key(
+        "infographic",
+        {
+            "title": infographic.title,
+            "chart": infographic.chart,
+            "renderer": "numpy",
+            "rows": rows,
+            "unit": infographic.unit,
+            "size": [width, height],
+            "engine": engine,
+            "font": _font_name(INFOGRAPHIC_FONT_SIZE),
+            "max_bytes": INFOGRAPHIC_MAX_BYTES,
+        },
+    )
+    return RenderSpec(
+        kind="infographic",
+        key=key,
+        path=str(store.path_for(key, "infographic")),
+        title=infographic.title,
+        width=width,
+        height=height,
+        max_bytes=INFOGRAPHIC_MAX_BYTES,
+        rows=rows,
+        unit=infographic.unit,
+        chart=infographic.chart,
+        lossless=True,
+    )
+
+
+def _draw_cover(spec: RenderSpec) -> Image.Image:
+    image = _background().copy()
+    _draw_text(ImageDraw.Draw(image), spec.title)
+    return image
+
+
+def _draw_infographic(spec: RenderSpec) -> Image.Image:
+    labels = [label for label, _ in spec.rows]
+    values = [value for _, value in spec.rows]
+    return render_chart(
+        spec.title,
+        spec.chart,
+        labels,
+        values,
+        spec.unit,
+        (spec.width, spec.height),
+        COLORS,
+        _font,
+        INFOGRAPHIC_FONT_SIZE,
     )
-    return asset
 
 
-__all__ = ["generate_cover_package"]
+_DRAWERS = {"cover": _draw_cover, "infographic": _draw_infographic}
+
+
+def render_asset(spec: RenderSpec) -> RenderResult:
+    """Draw, encode and store one image. Runs in worker processes, so it only touches files."""
+    result = RenderResult(kind=spec.kind, key=spec.key, path=spec.path, width=spec.width, height=spec.height)
+    path = Path(spec.path)
+    if path.exists():
+        result.reused = True
+        result.size = path.stat().st_size
+        return result
+    try:
+        started = time.perf_counter()
+        image = _DRAWERS[spec.kind](spec)
+        rendered = time.perf_counter()
+        encoded = encode_webp(image, spec.max_bytes, lossless=spec.lossless)
+        result.render_ms = (rendered - started) * 1000
+        result.encode_ms = (time.perf_counter() - rendered) * 1000
+        AssetStore.put(path, encoded.data)
+    except Exception as exc:  # pragma: no cover - reported to the parent process
+        result.error = repr(exc)
+        return result
+    result.size = len(encoded.data)
+    result.quality = encoded.quality
+    result.passes = encoded.passes
+    return result
+
+
+def _log_result(result: RenderResult) -> None:
+    name = Path(result.path).name[:24]
+    if result.error:
+        console.log(f"[red]Rendering {result.kind} failed: {result.error}[/red]")
+    elif result.reused:
+        console.log(f"Reusing stored {result.kind} {name}…")
+    else:
+        console.log(
+            f"{result.kind.capitalize()} rendered in {result.render_ms:.1f} ms, encoded in {result.encode_ms:.1f} ms "
+            f"({result.size / 1024:.0f} KB, q={result.quality}, {result.passes} passes)"
+        )
+        budget = COVER_MAX_BYTES if result.kind == "cover" else INFOGRAPHIC_MAX_BYTES
+        if result.size > budget:
+            console.log(f"[yellow]{result.kind.capitalize()} exceeds {budget // 1024} KB budget: {name}[/yellow]")
+
+
+def render_batch(specs: Sequence[RenderSpec], workers: int = 0, log: bool = True) -> List[RenderResult]:
+    """Render every spec whose file is missing, in a process pool sized to the cores.
+
+    Specs sharing a key are drawn once. Results come back in spec order.
+    """
+    unique = {spec.key: spec for spec in specs}
+    results: Dict[str, RenderResult] = {}
+    todo: List[RenderSpec] = []
+    for spec in unique.values():
+        if Path(spec.path).exists():
+            results[spec.key] = render_asset(spec)
+        else:
+            todo.append(spec)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    started = time.perf_counter()
+    if workers == 1:
+        rendered = [render_asset(spec) for spec in todo]
+    else:
+        chunksize = max(1, len(todo) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(render_asset, todo, chunksize=chunksize))
+    results.update((result.key, result) for result in rendered)
+    if log:
+        for result in results.values():
+            _log_result(result)
+        if todo:
+            console.log(
+                f"Rendered {len(todo)} images on {workers} workers in {time.perf_counter() - started:.2f}s "
+                f"({len(results) - len(todo)} reused)"
+            )
+    return [results[spec.key] for spec in specs]
+
+
+def _image_asset(lead: Lead, result: RenderResult, alt_text: str) -> ImageAsset:
+    return ImageAsset(
+        lead_id=lead.id or 0,
+        kind=result.kind,
+        path=relative_path(Path(result.path)),
+        blob_hash=result.key,
+        alt_text=alt_text,
+        width=result.width,
+        height=result.height,
+    )
+
+
+def generate_image_packages(
+    items: Sequence[Tuple[Lead, ContentPlan]], settings: Settings | None = None
+) -> List[Tuple[ImageAsset, ImageAsset | None]]:
+    """Cover and inline infographic for each ``(lead, plan)``, rendered as one parallel stage.
+
+    A failed cover raises; a failed infographic is logged and left out.
+    """
+    settings = settings or load_settings()
+    store = AssetStore(settings.assets_dir)
+    specs: List[RenderSpec] = []
+    for _, plan in items:
+        specs.append(cover_spec(plan.hero_message[:48], settings.image_engine, store))
+        if plan.infographic is not None:
+            specs.append(infographic_spec(plan.infographic, settings.image_engine, store))
+    results = render_batch(specs, settings.image_workers)
+    register_blobs(
+        (result.key, result.kind, Path(result.path), result.width, result.height) for result in results if result.ok
+    )
+    remaining = iter(results)
+    packages: List[Tuple[ImageAsset, ImageAsset | None]] = []
+    for lead, plan in items:
+        cover = next(remaining)
+        if not cover.ok:
+            raise RuntimeError(f"Cover rendering failed for {lead.url}: {cover.error}")
+        cover_asset = _image_asset(lead, cover, f"抽象旅行主题封面图，标题：{plan.hero_message[:30]}")
+        chart_asset = None
+        if plan.infographic is not None:
+            chart = next(remaining)
+            if chart.ok:
+                chart_asset = _image_asset(lead, chart, f"信息图：{plan.infographic.title}")
+        packages.append((cover_asset, chart_asset))
+    return packages
+
+
+def generate_cover_package(lead: Lead, plan: ContentPlan) -> ImageAsset:
+    """Cover for ``plan``; identical render inputs reuse the stored file without drawing."""
+    settings = load_settings()
+    result = render_batch([cover_spec(plan.hero_message[:48], settings.image_engine, AssetStore(settings.assets_dir))], 1)[0]
+    if not result.ok:
+        raise RuntimeError(f"Cover rendering failed for {lead.url}: {result.error}")
+    register_blobs([(result.key, result.kind, Path(result.path), result.width, result.height)])
+    return _image_asset(lead, result, f"抽象旅行主题封面图，标题：{plan.hero_message[:30]}")
+
+
+__all__ = [
+    "RenderSpec",
+    "RenderResult",
+    "cover_spec",
+    "infographic_spec",
+    "render_asset",
+    "render_batch",
+    "generate_image_packages",
+    "generate_cover_package",
+    "encode_webp",
+    "wrap_text",
+    "EncodedImage",
+]
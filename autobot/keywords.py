@@ -0,0 +1,182 @@
+"""Compiled dictionary matching for categories, tags, content type and deadlines."""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import yaml
+
+from .config import CONFIG_DIR
+from .research import DATE_RE, parse_fact_date
+
+KEYWORDS_PATH = CONFIG_DIR / "keywords.yml"
+DEFAULT_CATEGORY = "Travel"
+# How far around a deadline phrase a date may sit to count as its deadline.
+DEADLINE_WINDOW = (12, 40)
+TAG_KINDS = ("brand", "program", "region")
+
+
+@dataclass(slots=True)
+class KeywordHit:
+    kind: str
+    label: str
+    start: int
+    end: int
+
+
+@dataclass(slots=True)
+class Classification:
+    category: str = DEFAULT_CATEGORY
+    tags: List[str] = field(default_factory=list)
+    content_type: str = "deep"
+    deadline_candidates: List[datetime] = field(default_factory=list)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lower-cased terms.
+
+    Matching costs one transition per input character no matter how many
+    terms are loaded. Terms made of ASCII word characters only match on word
+    boundaries so "air" does not fire inside "chair".
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str, str]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str, str, bool]]] = [[]]
+        for term, kind, label in terms:
+            term = term.strip().lower()
+            if term:
+                self._insert(term, kind, label)
+        self._link()
+
+    def _insert(self, term: str, kind: str, label: str) -> None:
+        node = 0
+        for char in term:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(term), kind, label, term.isascii()))
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[KeywordHit]:
+        lowered = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for idx, char in enumerate(lowered):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, kind, label, ascii_term in out[node]:
+                start = idx - length + 1
+                if ascii_term and (_is_word(lowered, start - 1) or _is_word(lowered, idx + 1)):
+                    continue
+                yield KeywordHit(kind=kind, label=label, start=start, end=idx + 1)
+
+
+def _is_word(text: str, idx: int) -> bool:
+    return 0 <= idx < len(text) and text[idx].isascii() and text[idx].isalnum()
+
+
+def _longest_per_group(hits: List[KeywordHit]) -> List[KeywordHit]:
+    """Leftmost-longest resolution, so region "united states" beats brand "united".
+
+    Brands, programs and regions compete as one tag group; categories, flash
+    and deadline phrases are resolved separately.
+    """
+    kept: List[KeywordHit] = []
+    last_end: Dict[str, int] = {}
+    for hit in sorted(hits, key=lambda item: (item.start, item.start - item.end)):
+        group = "tag" if hit.kind in TAG_KINDS else hit.kind
+        if hit.start >= last_end.get(group, 0):
+            kept.append(hit)
+            last_end[group] = hit.end
+    return kept
+
+
+class KeywordClassifier:
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self.category_order: List[str] = list((config.get("categories") or {}).keys())
+        terms: List[Tuple[str, str, str]] = []
+        for category, words in (config.get("categories") or {}).items():
+            terms.extend((word, "category", category) for word in words)
+        for kind, section in (("brand", "brands"), ("program", "programs"), ("region", "regions")):
+            for label, spellings in (config.get(section) or {}).items():
+                terms.extend((spelling, kind, label) for spelling in [label, *spellings])
+        terms.extend((word, "flash", word) for word in config.get("flash") or [])
+        terms.extend((word, "deadline", word) for word in config.get("deadline") or [])
+        self.matcher = KeywordMatcher(terms)
+
+    def classify(self, text: str, reference: datetime | None = None) -> Classification:
+        hits = _longest_per_group(list(self.matcher.iter_matches(text)))
+        result = Classification()
+        categories = {hit.label for hit in hits if hit.kind == "category"}
+        result.category = next((name for name in self.category_order if name in categories), DEFAULT_CATEGORY)
+        tags: Dict[str, None] = {}
+        for hit in hits:
+            if hit.kind in TAG_KINDS:
+                tags.setdefault(hit.label)
+        result.tags = list(tags)
+        if any(hit.kind == "flash" for hit in hits):
+            result.content_type = "flash"
+        reference_year = (reference or datetime.utcnow()).year
+        candidates: Dict[datetime, None] = {}
+        for hit in hits:
+            if hit.kind != "deadline":
+                continue
+            window_start = max(hit.start - DEADLINE_WINDOW[0], 0)
+            window = text[window_start : hit.end + DEADLINE_WINDOW[1]]
+            for match in DATE_RE.finditer(window):
+                parsed = parse_fact_date(match.group(), reference_year)
+                if parsed is not None:
+                    candidates.setdefault(parsed)
+        result.deadline_candidates = sorted(candidates)
+        return result
+
+
+def _load_config(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as handle:
+        return yaml.safe_load(handle) or {}
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> KeywordClassifier:
+    """Dictionary compiled once per process from ``config/keywords.yml``."""
+    return KeywordClassifier(_load_config(KEYWORDS_PATH))
+
+
+def classify_text(text: str, reference: datetime | None = None) -> Classification:
+    return get_classifier().classify(text, reference)
+
+
+__all__ = [
+    "KeywordHit",
+    "Classification",
+    "KeywordMatcher",
+    "KeywordClassifier",
+    "get_classifier",
+    "classify_text",
+]
@@ -0,0 +1,243 @@
+"""Internal link suggestions from a BM25 inverted index over published articles."""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from rich.console import Console
+from sqlalchemy import delete, insert
+from sqlmodel import select
+
+from .db import Article, LinkDocument, LinkPosting, Publish, session_scope
+from .dedup import text_features
+
+console = Console()
+
+K1 = 1.2
+B = 0.75
+# Title terms count as much as a few body mentions.
+TITLE_WEIGHT = 3
+# The query is the new article's most distinctive terms, not its whole body.
+QUERY_TERMS = 40
+MIN_LINKS = 3
+MAX_LINKS = 6
+# Below this share of the best score a match is noise unless needed for MIN_LINKS.
+RELATIVE_CUTOFF = 0.25
+
+
+@dataclass(slots=True)
+class LinkSuggestion:
+    article_id: int
+    title: str
+    url: str
+    score: float
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"title": self.title, "url": self.url}
+
+
+def term_counts(title: str, body: str) -> Counter:
+    counts = Counter(text_features(body))
+    for term in text_features(title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def published_url(publish_result: Dict[str, object] | None) -> str | None:
+    """The article's WordPress link; local drafts and failed publishes have none to link to."""
+    if publish_result and publish_result.get("platform") == "wordpress" and publish_result.get("url"):
+        return str(publish_result["url"])
+    return None
+
+
+class LinkIndex:
+    """Term postings of every stored article, held in memory for BM25 scoring.
+
+    Only articles with a WordPress URL are indexed. The
+    ``LinkDocument``/``LinkPosting`` tables are the durable copy; they are
+    read once per process, and published articles missing from them are
+    back-filled on that first load, while entries without a WordPress
+    publish are dropped. :meth:`add` keeps both copies current, so
+    a suggestion is a few dictionary lookups rather than a search request.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._documents: Dict[int, Tuple[str, str, int]] = {}
+        # Terms of each document, so re-indexing touches only its own posting lists.
+        self._terms: Dict[int, Set[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._documents)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        published = (
+            select(Publish.article_id).where(Publish.platform == "wordpress").where(Publish.url.is_not(None))
+        )
+        with session_scope() as session:
+            stale = select(LinkDocument.article_id).where(LinkDocument.article_id.not_in(published))
+            session.exec(delete(LinkPosting).where(LinkPosting.article_id.in_(stale)))
+            session.exec(delete(LinkDocument).where(LinkDocument.article_id.not_in(published)))
+            session.commit()
+            for document in session.exec(select(LinkDocument)):
+                self._documents[document.article_id] = (document.title, document.url, document.length)
+                self._total_length += document.length
+            for term, article_id, tf in session.exec(
+                select(LinkPosting.term, LinkPosting.article_id, LinkPosting.tf)
+            ):
+                self._postings.setdefault(term, {})[article_id] = tf
+                self._terms.setdefault(article_id, set()).add(term)
+            # Ordered by publish id, so an article's latest URL wins.
+            missing: Dict[int, Tuple[Article, str]] = {
+                article.id: (article, url)
+                for article, url in session.exec(
+                    select(Article, Publish.url)
+                    .join(Publish, Publish.article_id == Article.id)
+                    .where(Publish.platform == "wordpress")
+                    .where(Publish.url.is_not(None))
+                    .where(Article.id.not_in(select(LinkDocument.article_id)))
+                    .order_by(Publish.id)
+                )
+            }
+        self._loaded = True
+        if missing:
+            for article_id, (article, url) in missing.items():
+                self._store(article_id, article.title, url, article.html)
+            console.log(f"Indexed {len(missing)} published articles for internal links")
+
+    def add(self, article_id: int, title: str, url: str, body: str) -> None:
+        """Index (or re-index) one article under ``url``."""
+        with self._lock:
+            self._ensure_loaded()
+            self._store(article_id, title, url, body)
+
+    def _store(self, article_id: int, title: str, url: str, body: str) -> None:
+        counts = term_counts(title, body)
+        length = sum(counts.values())
+        with session_scope() as session:
+            session.exec(delete(LinkPosting).where(LinkPosting.article_id == article_id))
+            session.exec(delete(LinkDocument).where(LinkDocument.article_id == article_id))
+            session.add(LinkDocument(article_id=article_id, url=url, title=title, length=length))
+            if counts:
+                session.exec(
+                    insert(LinkPosting),
+                    params=[{"term": term, "article_id": article_id, "tf": tf} for term, tf in counts.items()],
+                )
+            session.commit()
+        self._remember(article_id, title, url, counts)
+
+    def _remember(self, article_id: int, title: str, url: str, counts: Counter) -> None:
+        length = sum(counts.values())
+        previous = self._documents.pop(article_id, None)
+        if previous is not None:
+            self._total_length -= previous[2]
+        for term in self._terms.pop(article_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(article_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._documents[article_id] = (title, url, length)
+        self._total_length += length
+        self._terms[article_id] = set(counts)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[article_id] = tf
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        total = len(self._documents)
+        return math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    def suggest(
+        self,
+        title: str,
+        body: str,
+        exclude: Iterable[int] = (),
+        exclude_urls: Iterable[str] = (),
+        limit: int = MAX_LINKS,
+        minimum: int = MIN_LINKS,
+    ) -> List[LinkSuggestion]:
+        """Best-matching stored articles for a draft, most relevant first.
+
+        Returns up to ``limit`` articles scoring at least ``RELATIVE_CUTOFF``
+        of the best match, topped up to ``minimum`` when enough matches exist.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self._documents:
+                return []
+            query = term_counts(title, body)
+            weighted = {term: self._idf(term) * tf for term, tf in query.items() if term in self._postings}
+            terms = heapq.nlargest(QUERY_TERMS, weighted, key=weighted.__getitem__)
+            skip_ids = set(exclude)
+            average = self._total_length / len(self._documents) or 1.0
+            documents = self._documents
+            norms: Dict[int, float] = {}
+            scores: Dict[int, float] = {}
+            for term in terms:
+                idf = self._idf(term) * (K1 + 1)
+                for article_id, tf in self._postings[term].items():
+                    norm = norms.get(article_id)
+                    if norm is None:
+                        norm = norms[article_id] = K1 * (1 - B + B * documents[article_id][2] / average)
+                    scores[article_id] = scores.get(article_id, 0.0) + idf * tf / (tf + norm)
+            ranked: List[LinkSuggestion] = []
+            seen_urls = set(exclude_urls)
+            for article_id in sorted(scores, key=scores.__getitem__, reverse=True):
+                doc_title, url, _ = self._documents[article_id]
+                if article_id in skip_ids or url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                ranked.append(LinkSuggestion(article_id, doc_title, url, round(scores[article_id], 3)))
+                if len(ranked) >= limit:
+                    break
+        if not ranked:
+            return []
+        cutoff = ranked[0].score * RELATIVE_CUTOFF
+        return [item for idx, item in enumerate(ranked) if idx < minimum or item.score >= cutoff]
+
+
+_index: LinkIndex | None = None
+
+
+def get_link_index() -> LinkIndex:
+    global _index
+    if _index is None:
+        _index = LinkIndex()
+    return _index
+
+
+def index_article(article: Article, publish_result: Dict[str, object] | None) -> None:
+    """Index ``article`` once it has a WordPress URL; anything else is not linkable yet."""
+    url = published_url(publish_result)
+    if article.id and url:
+        get_link_index().add(article.id, article.title, url, article.html)
+
+
+def suggest_links(article: Article, exclude_urls: Iterable[str] = ()) -> List[Dict[str, str]]:
+    suggestions = get_link_index().suggest(
+        article.title, article.html, exclude=[article.id] if article.id else (), exclude_urls=exclude_urls
+    )
+    return [item.as_dict() for item in suggestions]
+
+
+__all__ = [
+    "LinkSuggestion",
+    "LinkIndex",
+    "term_counts",
+    "published_url",
+    "get_link_index",
+    "index_article",
+    "suggest_links",
+]
@@ -0,0 +1,340 @@
+"""Pluggable LLM backends for the writer and rewriter, with a persistent response cache."""
+from __future__ import annotations
+
+import abc
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Sequence
+
+import httpx
+from rich.console import Console
+from sqlalchemy import insert
+from sqlmodel import select
+
+from .config import Settings
+from .db import LLMResponse, session_scope
+from .fetcher import USER_AGENT
+from .templating import get_registry
+
+console = Console()
+
+TokenCallback = Callable[[int, str], None]
+
+
+@dataclass(slots=True)
+class LLMRequest:
+    """One completion: a registry prompt template as system message plus the user content.
+
+    The cache key covers everything the model sees or is sampled with: the
+    model, the template source, the rendered prompt and the sampling
+    parameters, so any change to the plan or facts misses the cache.
+    """
+
+    template: str
+    prompt: str
+    max_tokens: int = 2048
+    temperature: float = 0.7
+
+    @property
+    def system(self) -> str:
+        return get_registry().source(self.template)
+
+    def cache_key(self, model: str) -> str:
+        template_hash = hashlib.sha256(self.system.encode("utf-8")).hexdigest()
+        return content_hash(
+            model, self.template, template_hash, self.prompt, str(self.max_tokens), repr(self.temperature)
+        )
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMBackend(abc.ABC):
+    """Produces a completion as a stream of text chunks."""
+
+    model: str = ""
+
+    @abc.abstractmethod
+    def stream(self, client: httpx.AsyncClient, request: LLMRequest) -> AsyncIterator[str]:
+        """Yield the completion's text chunks as they arrive."""
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Streaming ``/chat/completions`` client for OpenAI and compatible local servers."""
+
+    def __init__(self, base_url: str, model: str, api_key: str | None = None) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+
+    async def stream(self, client: httpx.AsyncClient, request: LLMRequest) -> AsyncIterator[str]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+            "messages": [
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": request.prompt},
+            ],
+        }
+        async with client.stream("POST", f"{self.base_url}/chat/completions", json=payload, headers=headers) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}: {response.text[:200]}", request=response.request, response=response
+                )
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                chunk = (choices[0].get("delta") or {}).get("content")
+                if chunk:
+                    yield chunk
+
+
+class ResponseCache:
+    """Completed responses in the ``LLMResponse`` table, read and written in bulk."""
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        with session_scope() as session:
+            rows = session.exec(select(LLMResponse).where(LLMResponse.cache_key.in_(keys))).all()
+        return {row.cache_key: row.text for row in rows}
+
+    def put_many(self, model: str, entries: Dict[str, tuple[str, str]]) -> None:
+        """Store ``{cache_key: (template, text)}``; keys already present are left alone."""
+        if not entries:
+            return
+        existing = self.get_many(entries)
+        rows = [
+            {"cache_key": key, "model": model, "template": template, "text": text}
+            for key, (template, text) in entries.items()
+            if key not in existing
+        ]
+        if rows:
+            with session_scope() as session:
+                session.exec(insert(LLMResponse), params=rows)
+                session.commit()
+
+
+class LLMGenerator:
+    """Runs batches of requests against a backend.
+
+    A batch does one cache lookup, collapses identical requests, streams the
+    misses concurrently over one HTTP client (at most ``concurrency`` at a
+    time) and stores every completed response in one insert. Failed or
+    timed-out requests come back as ``None`` so callers can fall back.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        concurrency: int = 4,
+        timeout: float = 120.0,
+        cache: ResponseCache | None = None,
+        on_token: TokenCallback | None = None,
+    ) -> None:
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache = cache
+        self.on_token = on_token
+
+    def generate_many(self, requests: Sequence[LLMRequest]) -> List[str | None]:
+        if not requests:
+            return []
+        model = self.backend.model
+        keys = [request.cache_key(model) for request in requests]
+        answers: Dict[str, str | None] = dict(self.cache.get_many(keys)) if self.cache else {}
+        hits = sum(1 for key in keys if key in answers)
+        pending: Dict[str, LLMRequest] = {}
+        for key, request in zip(keys, requests):
+            if key not in answers:
+                pending.setdefault(key, request)
+        if pending:
+            started = time.perf_counter()
+            completed = asyncio.run(self._complete_all(list(pending.values())))
+            fresh = dict(zip(pending, completed))
+            answers.update(fresh)
+            if self.cache:
+                self.cache.put_many(
+                    model, {key: (pending[key].template, text) for key, text in fresh.items() if text}
+                )
+            console.log(
+                f"LLM {model}: {len(pending)} completions in {time.perf_counter() - started:.1f}s, {hits} cache hits"
+            )
+        return [answers.get(key) for key in keys]
+
+    def generate(self, request: LLMRequest) -> str | None:
+        return self.generate_many([request])[0]
+
+    async def _complete_all(self, requests: List[LLMRequest]) -> List[str | None]:
+        gate = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits, headers={"User-Agent": USER_AGENT}) as client:
+            return await asyncio.gather(
+                *(self._complete(client, gate, index, request) for index, request in enumerate(requests))
+            )
+
+    async def _complete(
+        self, client: httpx.AsyncClient, gate: asyncio.Semaphore, index: int, request: LLMRequest
+    ) -> str | None:
+        async with gate:
+            chunks: List[str] = []
+
+            async def consume() -> None:
+                async for chunk in self.backend.stream(client, request):
+                    chunks.append(chunk)
+                    if self.on_token:
+                        self.on_token(index, chunk)
+
+            try:
+                await asyncio.wait_for(consume(), timeout=self.timeout)
+            # Malformed stream chunks (a list, a string, missing keys) fail only this request.
+            except (asyncio.TimeoutError, httpx.HTTPError, ValueError, LookupError, TypeError, AttributeError) as exc:
+                console.log(f"[yellow]LLM request failed ({request.template}): {exc or type(exc).__name__}[/yellow]")
+                return None
+            return "".join(chunks) or None
+
+
+_FACT_LINE_RE = re.compile(r"^\[(F\d+)\]\s*(.+)$", re.MULTILINE)
+
+
+def stub_reply(system: str, prompt: str) -> str:
+    """Deterministic article-shaped answer built from the ``[Fi]`` lines of the prompt.
+
+    Prompts without fact lines (rewriter passes) are echoed back unchanged.
+    """
+    facts = _FACT_LINE_RE.findall(prompt)
+    if not facts:
+        return prompt
+    title = next((line[3:].strip() for line in prompt.splitlines() if line.startswith("标题：")), "本次更新")
+    lines = ["## 速览要点", *(f"- {text} [{fact_id}]" for fact_id, text in facts)]
+    lines += ["## 玩法解析", f"{title}的关键在于核对资格、时间与兑换路径。"]
+    lines += [f"根据官方说明 [{fact_id}]，{text}" for fact_id, text in facts[:3]]
+    lines += ["## 总结提醒", "请以官方条款为准，并在截止前完成注册。"]
+    return "\n".join(lines)
+
+
+class StubLLMServer:
+    """Local OpenAI-compatible server for offline runs and benchmarks.
+
+    Answers ``/chat/completions`` with :func:`stub_reply`, streamed in
+    ``chunk_size`` character pieces with ``delay`` seconds between them to
+    mimic token latency.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, chunk_size: int = 16) -> None:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: object) -> None:
+                return
+
+            def do_POST(self) -> None:
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                messages = {message.get("role"): message.get("content", "") for message in body.get("messages", [])}
+                reply = stub_reply(messages.get("system", ""), messages.get("user", ""))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for start in range(0, len(reply), server.chunk_size):
+                    if server.delay:
+                        time.sleep(server.delay)
+                    event = {"choices": [{"delta": {"content": reply[start : start + server.chunk_size]}}]}
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+
+_stub_server: StubLLMServer | None = None
+
+
+def create_backend(settings: Settings) -> LLMBackend | None:
+    """Backend selected by ``LLM_BACKEND``: ``rule`` (none), ``openai`` or ``stub``."""
+    global _stub_server
+    name = settings.llm_backend.lower()
+    if name == "openai":
+        if not settings.openai_api_key and "api.openai.com" in settings.llm_base_url:
+            console.log("[yellow]LLM_BACKEND=openai without OPENAI_API_KEY; using rule-based writer[/yellow]")
+            return None
+        return OpenAICompatibleBackend(settings.llm_base_url, settings.llm_model, settings.openai_api_key)
+    if name == "stub":
+        if _stub_server is None:
+            _stub_server = StubLLMServer().start()
+        return OpenAICompatibleBackend(_stub_server.base_url, "stub")
+    return None
+
+
+def create_generator(settings: Settings, on_token: TokenCallback | None = None) -> LLMGenerator | None:
+    backend = create_backend(settings)
+    if backend is None:
+        return None
+    return LLMGenerator(
+        backend,
+        concurrency=settings.llm_concurrency,
+        timeout=settings.llm_timeout,
+        cache=ResponseCache(),
+        on_token=on_token,
+    )
+
+
+__all__ = [
+    "LLMRequest",
+    "LLMBackend",
+    "OpenAICompatibleBackend",
+    "ResponseCache",
+    "LLMGenerator",
+    "StubLLMServer",
+    "content_hash",
+    "create_backend",
+    "create_generator",
+    "stub_reply",
+]
@@ -2,23 +2,36 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
 
 from rich.console import Console
 
+from .assetstore import acquire_blob
 from .config import ConfigBundle, load_bundle
+from sqlalchemy import func, update
 from sqlmodel import select
 
-from .db import Article, ImageAsset, Lead, Publish, session_scope
-from .dedup import filter_new_leads
-from .discovery import discover_leads
-from .imaging import generate_cover_package
-from .planner import build_plan
-from .publisher import Publisher
-from .research import gather_evidence
+from .db import Article, ImageAsset, Lead, Publish, session_scope, unit_of_work
+from .dedup import (
+    filter_near_duplicates,
+    filter_new_leads,
+    index_lead_fingerprint,
+    normalize_url,
+    remember_leads,
+)
+from .discovery import discover_leads, record_watch_leads
+from .imaging import generate_image_packages
+from .linking import index_article
+from .llm import create_generator
+from .outbox import OutboxPolicy, PublishOutbox, publish_task
+from .pagecache import fetch_source_text
+from .planner import ContentPlan, build_plan
+from .publisher import Publisher, PublishItem
+from .research import EvidencePack, gather_evidence, load_evidence_pack, persist_evidence
 from .rules import apply_rules
-from .seo import build_seo_package
-from .writer import compose_article
+from .seo import build_seo_package, refresh_seo_package
+from .writer import compose_article, embed_image, rewriter_request, writer_request
 
 logger = logging.getLogger(__name__)
 console = Console()
@@ -30,70 +43,275 @@ class AutobotOrchestrator:
     def __init__(self, bundle: ConfigBundle | None = None) -> None:
         self.bundle = bundle or load_bundle()
         self.publisher = Publisher(self.bundle.settings)
+        self.outbox = PublishOutbox(self.publisher, OutboxPolicy.from_config(self.bundle.schedule.get("outbox")))
+        self.llm = create_generator(self.bundle.settings)
+        self._lock = threading.Lock()
+        self._simhash_threshold = float(self.bundle.thresholds.get("simhash_threshold", 0.85))
+        self._simhash_bands = self.bundle.thresholds.get("simhash_bands")
+
+    def close(self) -> None:
+        """Release pooled connections; safe to call more than once."""
+        self.publisher.close()
 
     def run_once(self) -> List[Dict[str, Any]]:
-        console.log("[bold green]Starting Longbo Cloud autopublisher batch[/bold green]")
+        with self._lock:
+            console.log("[bold green]Starting Longbo Cloud autopublisher batch[/bold green]")
+            leads = discover_leads(self.bundle)
+            return self._process_leads(filter_new_leads(leads))
+
+    def drain_outbox(self) -> List[Dict[str, Any]]:
+        """Retry queued WordPress publishes that are due; skipped while a batch is running."""
+        if not self._lock.acquire(blocking=False):
+            console.log("Batch already running; skipping outbox drain.")
+            return []
+        try:
+            return self.outbox.drain()
+        finally:
+            self._lock.release()
+
+    def refresh_posts(self, article_ids: Iterable[int] | None = None) -> List[Dict[str, Any]]:
+        """Push stored article changes (expired deals, edits, title swaps) to their WordPress posts.
+
+        Rules are re-applied to each stored article, then every post is
+        updated in place from the diff against its last published state:
+        one small request per changed post, none for unchanged ones.
+        """
+        with self._lock:
+            items = []
+            edited = []
+            for article, lead, images, publish in self._published_posts(article_ids):
+                evidence_pack = self._load_or_gather_evidence(lead)
+                before = (article.title, article.html)
+                apply_rules(article, build_plan(lead, evidence_pack), evidence_pack)
+                if (article.title, article.html) != before:
+                    edited.append({"id": article.id, "title": article.title, "html": article.html})
+                cover, inline_images = images[0], images[1:]
+                items.append(
+                    PublishItem(
+                        article,
+                        cover,
+                        refresh_seo_package(article, cover, lead),
+                        lead,
+                        inline_images,
+                        remote_id=publish.remote_id,
+                        state=(publish.meta or {}).get("state"),
+                    )
+                )
+            if not items:
+                console.log("No published WordPress posts to refresh.")
+                return []
+            if edited:
+                with session_scope() as session:
+                    session.exec(update(Article), params=edited)
+                    session.commit()
+            results = []
+            for item, outcome in zip(items, self.publisher.publish_many(items, fallback=False)):
+                if isinstance(outcome, BaseException):
+                    console.log(f"[red]Updating post {item.remote_id} failed: {outcome}[/red]")
+                    results.append({"status": "failed", "url": None, "platform": "wordpress", "remote_id": item.remote_id})
+                    continue
+                results.append(outcome)
+                if outcome["status"] == "updated":
+                    self._record_update(item, outcome)
+            updated = sum(1 for result in results if result["status"] == "updated")
+            console.log(f"Refreshed {len(items)} posts: {updated} updated, {len(items) - updated} unchanged or failed")
+            return results
+
+    def _published_posts(
+        self, article_ids: Iterable[int] | None
+    ) -> List[Tuple[Article, Lead, List[ImageAsset], Publish]]:
+        """Each article's latest WordPress publish with the rows needed to rebuild the post; cover first."""
+        latest = (
+            select(func.max(Publish.id))
+            .where(Publish.platform == "wordpress", Publish.remote_id.is_not(None))
+            .group_by(Publish.article_id)
+        )
+        query = select(Publish).where(Publish.id.in_(latest))
+        if article_ids is not None:
+            query = query.where(Publish.article_id.in_(list(article_ids)))
+        with session_scope() as session:
+            publishes = session.exec(query.order_by(Publish.article_id)).all()
+            articles = {
+                row.id: row
+                for row in session.exec(select(Article).where(Article.id.in_([row.article_id for row in publishes])))
+            }
+            lead_ids = [article.lead_id for article in articles.values()]
+            leads = {row.id: row for row in session.exec(select(Lead).where(Lead.id.in_(lead_ids)))}
+            # The newest image of each kind belongs to the lead's current article.
+            images: Dict[int, Dict[str, ImageAsset]] = {}
+            for image in session.exec(select(ImageAsset).where(ImageAsset.lead_id.in_(lead_ids)).order_by(ImageAsset.id)):
+                images.setdefault(image.lead_id, {})[image.kind] = image
+            session.expunge_all()
+        posts = []
+        for publish in publishes:
+            article = articles.get(publish.article_id)
+            lead = leads.get(article.lead_id) if article else None
+            kinds = dict(images.get(lead.id, {})) if lead else {}
+            cover = kinds.pop("cover", None)
+            if article is None or lead is None or cover is None:
+                continue
+            posts.append((article, lead, [cover, *kinds.values()], publish))
+        return posts
+
+    def _record_update(self, item: PublishItem, outcome: Dict[str, Any]) -> None:
+        with session_scope() as session:
+            session.add(
+                Publish(
+                    article_id=item.article.id or 0,
+                    platform="wordpress",
+                    remote_id=outcome.get("remote_id"),
+                    url=outcome.get("url"),
+                    status=outcome["status"],
+                    meta=outcome.get("meta"),
+                )
+            )
+            session.commit()
+        index_article(item.article, outcome)
+
+    def poll_due_feeds(self) -> List[Dict[str, Any]]:
+        """Poll only feeds whose adaptive cadence is due; run the pipeline if anything is new."""
+        if not self._lock.acquire(blocking=False):
+            console.log("Batch already running; skipping adaptive poll.")
+            return []
+        try:
+            leads = discover_leads(self.bundle, due_only=True)
+            new_leads = filter_new_leads(leads)
+            if not new_leads:
+                return []
+            console.log(f"[bold green]Adaptive poll found {len(new_leads)} new leads[/bold green]")
+            return self._process_leads(new_leads)
+        finally:
+            self._lock.release()
+
+    def _process_leads(self, new_leads: List[Lead]) -> List[Dict[str, Any]]:
         results: List[Dict[str, Any]] = []
-        leads = discover_leads(self.bundle)
-        new_leads = filter_new_leads(leads)
+        new_leads, flagged = filter_near_duplicates(new_leads, self._simhash_threshold, self._simhash_bands)
+        # Near-duplicates are kept too, so their URLs are not rediscovered every run.
+        new_leads = self._ensure_leads([*new_leads, *flagged])[: len(new_leads)]
         if not new_leads:
             console.log("No new leads discovered; exiting batch.")
             return results
 
+        prepared = []
         for lead in new_leads:
             console.log(f"Processing lead: {lead.title}")
-            lead = self._ensure_lead(lead)
-            evidence_pack = gather_evidence(lead)
-            plan = build_plan(lead, evidence_pack)
-            article = compose_article(lead, plan, evidence_pack)
-            article = apply_rules(article, plan, evidence_pack)
-            cover = generate_cover_package(lead, plan)
+            evidence_pack = self._load_or_gather_evidence(lead)
+            prepared.append((lead, evidence_pack, build_plan(lead, evidence_pack)))
+        drafts = self._write_drafts(prepared)
+        articles = [
+            apply_rules(compose_article(lead, plan, evidence_pack, draft), plan, evidence_pack)
+            for (lead, evidence_pack, plan), draft in zip(prepared, drafts)
+        ]
+        images = generate_image_packages([(lead, plan) for lead, _, plan in prepared], self.bundle.settings)
+
+        items = []
+        for (lead, evidence_pack, plan), article, (cover, infographic) in zip(prepared, articles, images):
+            inline_images = [infographic] if infographic is not None else []
+            for asset in inline_images:
+                embed_image(article, asset)
             seo_package = build_seo_package(article, evidence_pack, cover, lead)
-            publish_result = self.publisher.publish(article, cover, seo_package, lead)
-            results.append(publish_result)
-            self._persist_run(lead, article, cover, publish_result)
+            items.append(PublishItem(article, cover, seo_package, lead, inline_images))
+
+        if self.outbox.enabled:
+            # Stored first, so a WordPress outage leaves queued tasks instead of lost posts.
+            task_ids = [
+                self._persist_run(item.lead, item.article, [item.cover, *item.inline_images], None, item.seo_package)
+                for item in items
+            ]
+            results.extend(self.outbox.drain(task_ids))
+        else:
+            for item, publish_result in zip(items, self.publisher.publish_many(items)):
+                results.append(publish_result)
+                self._persist_run(item.lead, item.article, [item.cover, *item.inline_images], publish_result)
         console.log("[bold green]Batch complete[/bold green]")
         return results
 
-    def _ensure_lead(self, lead: Lead) -> Lead:
-        with session_scope() as session:
-            existing = session.exec(select(Lead).where(Lead.url == lead.url)).first()
-            if existing:
-                return existing
-            session.add(lead)
-            session.commit()
-            session.refresh(lead)
-            return lead
+    def _write_drafts(self, prepared: List[Tuple[Lead, EvidencePack, ContentPlan]]) -> List[str | None]:
+        """LLM bodies for the whole batch at once; ``None`` falls back to the rule-based writer."""
+        if self.llm is None:
+            return [None] * len(prepared)
+        drafts = self.llm.generate_many([writer_request(lead, plan, pack) for lead, pack, plan in prepared])
+        if self.bundle.settings.llm_rewrite:
+            targets = [idx for idx, draft in enumerate(drafts) if draft]
+            rewritten = self.llm.generate_many([rewriter_request(drafts[idx]) for idx in targets])
+            for idx, text in zip(targets, rewritten):
+                drafts[idx] = text or drafts[idx]
+        return drafts
+
+    def _load_or_gather_evidence(self, lead: Lead) -> EvidencePack:
+        """Stored evidence makes retries and refreshes free of network and parsing."""
+        evidence_pack = load_evidence_pack(lead.id) if lead.id else None
+        if evidence_pack is not None:
+            console.log(f"Loaded {len(evidence_pack.items)} stored evidence items for lead")
+            return evidence_pack
+        page_text = fetch_source_text(lead.url, self.bundle.settings)
+        evidence_pack = gather_evidence(lead, page_text)
+        persist_evidence(evidence_pack)
+        return evidence_pack
+
+    def _ensure_leads(self, leads: List[Lead]) -> List[Lead]:
+        """Stored rows for ``leads``, reusing existing ones; new leads are inserted in one transaction."""
+        if not leads:
+            return []
+        for lead in leads:
+            lead.url_key = lead.url_key or normalize_url(lead.url)
+        keys = list(dict.fromkeys(lead.url_key for lead in leads))
+        fresh = []
+        with unit_of_work() as session:
+            stored = {row.url_key: row for row in session.exec(select(Lead).where(Lead.url_key.in_(keys)))}
+            for lead in leads:
+                if lead.url_key not in stored:
+                    stored[lead.url_key] = lead
+                    fresh.append(lead)
+            session.add_all(fresh)
+        remember_leads(fresh)
+        record_watch_leads(fresh)
+        return [stored[lead.url_key] for lead in leads]
 
     def _persist_run(
         self,
         lead: Lead,
         article: Article,
-        cover: ImageAsset,
-        publish_result: Dict[str, Any],
-    ) -> None:
-        with session_scope() as session:
+        images: List[ImageAsset],
+        publish_result: Dict[str, Any] | None,
+        seo_package: Dict[str, Any] | None = None,
+    ) -> int | None:
+        """Store the run in one transaction; without a ``publish_result`` the publish is queued.
+
+        Returns the queued task's id, if any. Flushes hand out the ids the
+        later rows need; the link index, which rebuilds itself from the
+        articles, is updated after the commit.
+        """
+        task = None
+        with unit_of_work() as session:
             if not lead.id:
                 session.add(lead)
-                session.commit()
-                session.refresh(lead)
+                session.flush()
             article.lead_id = lead.id or 0
-            cover.lead_id = lead.id or 0
+            for image in images:
+                image.lead_id = lead.id or 0
             session.add(article)
-            session.add(cover)
-            session.commit()
-            session.refresh(article)
-            session.refresh(cover)
-            publish = Publish(
-                article_id=article.id or 0,
-                platform=publish_result.get("platform", "wordpress"),
-                remote_id=publish_result.get("remote_id"),
-                url=publish_result.get("url"),
-                status=publish_result.get("status", "draft"),
-                meta=publish_result.get("meta"),
-            )
-            session.add(publish)
-            session.commit()
+            session.add_all(images)
+            session.flush()
+            for image in images:
+                acquire_blob(session, image.blob_hash)
+            if publish_result is None:
+                task = publish_task(lead, article, images, seo_package or {})
+                session.add(task)
+            else:
+                session.add(
+                    Publish(
+                        article_id=article.id or 0,
+                        platform=publish_result.get("platform", "wordpress"),
+                        remote_id=publish_result.get("remote_id"),
+                        url=publish_result.get("url"),
+                        status=publish_result.get("status", "draft"),
+                        meta=publish_result.get("meta"),
+                    )
+                )
+            index_lead_fingerprint(lead, article.id, self._simhash_threshold, self._simhash_bands, session)
+        index_article(article, publish_result)
+        return task.id if task is not None else None
 
 
 __all__ = ["AutobotOrchestrator"]
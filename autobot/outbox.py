@@ -0,0 +1,299 @@
+"""Durable publish outbox: every WordPress publish is a ``Task`` that survives outages."""
+from __future__ import annotations
+
+import itertools
+import secrets
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Sequence
+
+import backoff
+from rich.console import Console
+from sqlalchemy import and_, case, func, or_, update
+from sqlmodel import select
+
+from .db import Article, ImageAsset, Lead, Publish, Task, session_scope
+from .linking import index_article
+from .publisher import Publisher, PublishItem
+
+console = Console()
+
+KIND = "publish"
+# pending -> uploading -> posted -> done; failures go to cooldown until due again.
+# A posted task keeps the remote outcome in its payload, so a drain that dies
+# before recording it resumes with the follow-up instead of publishing again.
+PENDING = "pending"
+UPLOADING = "uploading"
+POSTED = "posted"
+DONE = "done"
+COOLDOWN = "cooldown"
+FAILED = "failed"
+
+
+@dataclass(slots=True)
+class OutboxPolicy:
+    drain_minutes: float = 5.0
+    batch_size: int = 20
+    max_attempts: int = 12
+    base_delay_seconds: float = 60.0
+    max_delay_minutes: float = 60.0
+    # A task claimed longer ago than this belongs to a drainer that died.
+    stale_minutes: float = 15.0
+
+    @classmethod
+    def from_config(cls, data: Dict[str, Any] | None) -> "OutboxPolicy":
+        data = data or {}
+        defaults = cls()
+        return cls(
+            drain_minutes=float(data.get("drain_minutes", defaults.drain_minutes)),
+            batch_size=max(1, int(data.get("batch_size", defaults.batch_size))),
+            max_attempts=max(1, int(data.get("max_attempts", defaults.max_attempts))),
+            base_delay_seconds=float(data.get("base_delay_seconds", defaults.base_delay_seconds)),
+            max_delay_minutes=float(data.get("max_delay_minutes", defaults.max_delay_minutes)),
+            stale_minutes=float(data.get("stale_minutes", defaults.stale_minutes)),
+        )
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential delay for the ``attempts``-th failure, half of it jittered."""
+        waits = backoff.expo(factor=self.base_delay_seconds, max_value=self.max_delay_minutes * 60)
+        next(waits)  # backoff's wait generators are primed with ``None``
+        ceiling = next(itertools.islice(waits, max(attempts - 1, 0), None))
+        return ceiling / 2 + backoff.full_jitter(ceiling / 2)
+
+
+def publish_task(lead: Lead, article: Article, images: Sequence[ImageAsset], seo_package: Dict[str, Any]) -> Task:
+    """Outbox entry for stored rows; the first image is the cover, the rest are inline."""
+    return Task(
+        kind=KIND,
+        status=PENDING,
+        next_attempt_at=datetime.utcnow(),
+        payload={
+            "lead_id": lead.id,
+            "article_id": article.id,
+            "image_ids": [image.id for image in images],
+            "seo_package": seo_package,
+        },
+    )
+
+
+def queued_result(task: Task) -> Dict[str, Any]:
+    return {
+        "status": "queued",
+        "url": None,
+        "platform": "wordpress",
+        "meta": {"task_id": task.id, "error": task.last_error, "next_attempt_at": str(task.next_attempt_at)},
+    }
+
+
+class PublishOutbox:
+    """Drains publish tasks in batches through :meth:`Publisher.publish_many`.
+
+    Tasks are claimed with one UPDATE that stamps a fresh claim token and
+    counts the attempt, so two drainers never send the same post. Any attempt after the first looks the
+    slug up on the site, so a post created just before a crash or timeout is
+    adopted rather than duplicated.
+    Writing and imaging are never re-run: the article, its images and the
+    SEO package are read back from the database.
+    """
+
+    def __init__(self, publisher: Publisher, policy: OutboxPolicy | None = None) -> None:
+        self.publisher = publisher
+        self.policy = policy or OutboxPolicy()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.publisher.settings.wp_user and self.publisher.settings.wp_app_pass)
+
+    def counts(self) -> Dict[str, int]:
+        with session_scope() as session:
+            rows = session.exec(select(Task.status, func.count(Task.id)).where(Task.kind == KIND).group_by(Task.status))
+            return dict(rows.all())
+
+    def drain(self, task_ids: Iterable[int] | None = None) -> List[Dict[str, Any]]:
+        """Publish due tasks (or exactly ``task_ids``); returns one result per task handled.
+
+        After a clean batch, cooling-down tasks are pulled in early: the site
+        is evidently reachable again, so there is no reason to wait out
+        their backoff.
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            ids = list(task_ids) if task_ids is not None else None
+            results: List[Dict[str, Any]] = []
+            early = False
+            while True:
+                tasks = self._claim(ids, early)
+                if not tasks:
+                    break
+                batch = self._publish(tasks)
+                results.extend(batch)
+                if ids is not None or any(result["status"] != "published" for result in batch):
+                    break
+                early = True
+            return results
+
+    def _claim(self, task_ids: List[int] | None, early: bool) -> List[Task]:
+        now = datetime.utcnow()
+        stale = now - timedelta(minutes=self.policy.stale_minutes)
+        claimable = or_(
+            Task.status.in_((PENDING, COOLDOWN)),
+            and_(Task.status.in_((UPLOADING, POSTED)), Task.updated_at < stale),
+        )
+        query = select(Task.id).where(Task.kind == KIND, claimable)
+        if task_ids is not None:
+            query = query.where(Task.id.in_(task_ids))
+        elif not early:
+            query = query.where(Task.next_attempt_at <= now)
+        query = query.order_by(Task.next_attempt_at).limit(self.policy.batch_size)
+        token = secrets.token_hex(8)
+        with session_scope() as session:
+            candidates = list(session.exec(query))
+            if not candidates:
+                return []
+            session.exec(
+                update(Task)
+                .where(Task.id.in_(candidates), claimable)
+                .values(
+                    status=case((Task.status == POSTED, POSTED), else_=UPLOADING),
+                    claim_token=token,
+                    updated_at=now,
+                    attempts=Task.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            tasks = session.exec(select(Task).where(Task.claim_token == token)).all()
+            for task in tasks:
+                session.expunge(task)
+        return tasks
+
+    def _items(self, tasks: Sequence[Task]) -> List[PublishItem | None]:
+        payloads = [task.payload or {} for task in tasks]
+        article_ids = [payload.get("article_id") for payload in payloads]
+        lead_ids = [payload.get("lead_id") for payload in payloads]
+        image_ids = [image_id for payload in payloads for image_id in payload.get("image_ids", [])]
+        with session_scope() as session:
+            articles = {row.id: row for row in session.exec(select(Article).where(Article.id.in_(article_ids)))}
+            leads = {row.id: row for row in session.exec(select(Lead).where(Lead.id.in_(lead_ids)))}
+            images = {row.id: row for row in session.exec(select(ImageAsset).where(ImageAsset.id.in_(image_ids)))}
+            session.expunge_all()
+        items: List[PublishItem | None] = []
+        for task, payload in zip(tasks, payloads):
+            article = articles.get(payload.get("article_id"))
+            lead = leads.get(payload.get("lead_id"))
+            assets = [images[image_id] for image_id in payload.get("image_ids", []) if image_id in images]
+            if article is None or lead is None or not assets:
+                items.append(None)
+                continue
+            seo_package = payload.get("seo_package") or {}
+            items.append(PublishItem(article, assets[0], seo_package, lead, assets[1:], check_existing=task.attempts > 1))
+        return items
+
+    def _publish(self, tasks: List[Task]) -> List[Dict[str, Any]]:
+        items = self._items(tasks)
+        ready = [
+            (task, item) for task, item in zip(tasks, items) if item is not None and task.status != POSTED
+        ]
+        outcomes = self.publisher.publish_many([item for _, item in ready], fallback=False) if ready else []
+        by_task = {task.id: outcome for (task, _), outcome in zip(ready, outcomes)}
+        results = []
+        for task, item in zip(tasks, items):
+            if item is None:
+                task.last_error = "article, lead or images missing from the database"
+                console.log(f"[red]Outbox task {task.id} failed: {task.last_error}[/red]")
+                self._finish(task, FAILED, task.last_error)
+                results.append(queued_result(task) | {"status": "failed"})
+                continue
+            if task.status == POSTED:
+                # Published by an earlier drain that stopped before recording it.
+                outcome = (task.payload or {}).get("outcome") or {}
+                self._record(task, item, outcome)
+                results.append(outcome)
+                continue
+            outcome = by_task[task.id]
+            if isinstance(outcome, BaseException):
+                results.append(self._retry(task, outcome))
+                continue
+            self._record(task, item, outcome)
+            results.append(outcome)
+        published = sum(1 for result in results if result["status"] == "published")
+        failed = sum(1 for result in results if result["status"] == "failed")
+        console.log(
+            f"Outbox: {published}/{len(tasks)} posts published, {len(results) - published - failed} waiting to retry, "
+            f"{failed} failed"
+        )
+        return results
+
+    def _record(self, task: Task, item: PublishItem, outcome: Dict[str, Any]) -> None:
+        """posted -> done: keep the outcome, write the Publish row and link index, then close the task."""
+        if task.status != POSTED:
+            task.payload = {**(task.payload or {}), "outcome": outcome}
+            task.status = POSTED
+            with session_scope() as session:
+                session.exec(
+                    update(Task)
+                    .where(Task.id == task.id)
+                    .values(status=POSTED, payload=task.payload, updated_at=datetime.utcnow(), last_error=None)
+                )
+                session.commit()
+        with session_scope() as session:
+            recorded = session.exec(
+                select(Publish.id).where(
+                    Publish.article_id == (item.article.id or 0),
+                    Publish.platform == outcome.get("platform", "wordpress"),
+                    Publish.remote_id == outcome.get("remote_id"),
+                )
+            ).first()
+            if recorded is None:
+                session.add(
+                    Publish(
+                        article_id=item.article.id or 0,
+                        platform=outcome.get("platform", "wordpress"),
+                        remote_id=outcome.get("remote_id"),
+                        url=outcome.get("url"),
+                        status=outcome.get("status", "published"),
+                        meta=outcome.get("meta"),
+                    )
+                )
+                session.commit()
+        index_article(item.article, outcome)
+        self._finish(task, DONE, None)
+
+    def _retry(self, task: Task, error: BaseException) -> Dict[str, Any]:
+        task.last_error = str(error) or type(error).__name__
+        if task.attempts >= self.policy.max_attempts:
+            console.log(f"[red]Outbox task {task.id} gave up after {task.attempts} attempts: {task.last_error}[/red]")
+            self._finish(task, FAILED, task.last_error)
+            return queued_result(task) | {"status": "failed"}
+        task.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.policy.retry_delay(task.attempts))
+        with session_scope() as session:
+            session.exec(
+                update(Task)
+                .where(Task.id == task.id)
+                .values(
+                    status=COOLDOWN,
+                    last_error=task.last_error,
+                    next_attempt_at=task.next_attempt_at,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            session.commit()
+        console.log(
+            f"[yellow]Outbox task {task.id} retry {task.attempts} at {task.next_attempt_at:%H:%M:%S}: "
+            f"{task.last_error}[/yellow]"
+        )
+        return queued_result(task)
+
+    @staticmethod
+    def _finish(task: Task, status: str, error: str | None) -> None:
+        with session_scope() as session:
+            session.exec(
+                update(Task).where(Task.id == task.id).values(status=status, last_error=error, updated_at=datetime.utcnow())
+            )
+            session.commit()
+
+
+__all__ = ["OutboxPolicy", "PublishOutbox", "publish_task", "queued_result"]
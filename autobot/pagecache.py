@@ -0,0 +1,184 @@
+"""Source page fetching with main-content extraction and an on-disk LRU cache."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Set
+
+from rich.console import Console
+from selectolax.parser import HTMLParser
+
+from .config import Settings, load_settings
+from .dedup import normalize_url
+from .fetcher import FetchLimits, FetchRequest, fetch_many
+from .fsutil import atomic_write
+
+console = Console()
+
+NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg"]
+CONTENT_ROOTS = ["article", "main", "[role=main]", ".entry-content", ".post-content"]
+TEXT_BLOCKS = "h1, h2, h3, h4, p, li, td, blockquote"
+
+
+def extract_main_text(html: bytes | str) -> str:
+    """Readable text of the page's main content, one block per line."""
+    tree = HTMLParser(html)
+    tree.strip_tags(NOISE_TAGS)
+    root = None
+    for selector in CONTENT_ROOTS:
+        root = tree.css_first(selector)
+        if root is not None:
+            break
+    root = root or tree.body
+    if root is None:
+        return ""
+    lines = []
+    for node in root.css(TEXT_BLOCKS):
+        text = " ".join(node.text(separator=" ", strip=True).split())
+        if text:
+            lines.append(text)
+    if not lines:
+        lines = [" ".join(root.text(separator=" ", strip=True).split())]
+    return "\n".join(lines)
+
+
+@dataclass(slots=True)
+class CachedPage:
+    url_key: str
+    etag: str | None
+    text: str
+
+
+class PageCache:
+    """Content-addressed cache of extracted page text.
+
+    Objects live under ``objects/<aa>/<sha256>.txt`` where the digest covers
+    the normalized URL and the response ETag; ``urls/<sha256>.json`` maps a
+    URL to its current object. Reads bump the object's mtime, and writes evict
+    least-recently-used objects once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._objects = root / "objects"
+        self._urls = root / "urls"
+        self._lock = threading.Lock()
+        self._total: int | None = None
+
+    @staticmethod
+    def _digest(value: str) -> str:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    def _object_path(self, key: str) -> Path:
+        return self._objects / key[:2] / f"{key}.txt"
+
+    def _url_path(self, url_key: str) -> Path:
+        return self._urls / f"{self._digest(url_key)}.json"
+
+    def get(self, url_key: str) -> CachedPage | None:
+        url_path = self._url_path(url_key)
+        try:
+            entry = json.loads(url_path.read_text(encoding="utf-8"))
+            object_path = self._object_path(entry["key"])
+            text = object_path.read_text(encoding="utf-8")
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(object_path)
+        return CachedPage(url_key=url_key, etag=entry.get("etag"), text=text)
+
+    def put(self, url_key: str, etag: str | None, text: str) -> CachedPage:
+        key = self._digest(f"{url_key}\0{etag or ''}")
+        object_path = self._object_path(key)
+        data = text.encode("utf-8")
+        with self._lock:
+            if not object_path.exists():
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write(object_path, data)
+                self._total = self._measure() if self._total is None else self._total + len(data)
+            self._urls.mkdir(parents=True, exist_ok=True)
+            atomic_write(self._url_path(url_key), json.dumps({"key": key, "etag": etag}).encode("utf-8"))
+            if self._total is not None and self._total > self.max_bytes:
+                self._evict()
+        return CachedPage(url_key=url_key, etag=etag, text=text)
+
+    def _iter_objects(self) -> Iterator[os.DirEntry]:
+        if not self._objects.exists():
+            return
+        for shard in os.scandir(self._objects):
+            if shard.is_dir():
+                yield from (entry for entry in os.scandir(shard.path) if entry.is_file())
+
+    def _measure(self) -> int:
+        return sum(entry.stat().st_size for entry in self._iter_objects())
+
+    def _evict(self) -> None:
+        """Drop least-recently-used objects until the cache is at 90% of its budget, then their URL pointers."""
+        entries = sorted(self._iter_objects(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted: Set[str] = set()
+        for entry in entries:
+            if total <= target:
+                break
+            total -= entry.stat().st_size
+            os.unlink(entry.path)
+            evicted.add(entry.name.removesuffix(".txt"))
+        self._total = total
+        self._drop_pointers(evicted)
+
+    def _drop_pointers(self, keys: Set[str]) -> None:
+        """Delete ``urls/`` entries pointing at ``keys``; unreadable pointers go too."""
+        if not keys or not self._urls.exists():
+            return
+        for entry in os.scandir(self._urls):
+            try:
+                stale = json.loads(Path(entry.path).read_text(encoding="utf-8")).get("key") in keys
+            except (OSError, ValueError, AttributeError):
+                stale = True
+            if stale:
+                Path(entry.path).unlink(missing_ok=True)
+
+
+_caches: Dict[Path, PageCache] = {}
+
+
+def get_page_cache(settings: Settings | None = None) -> PageCache:
+    settings = settings or load_settings()
+    root = settings.cache_dir / "pages"
+    if root not in _caches:
+        _caches[root] = PageCache(root, settings.page_cache_mb * 1024 * 1024)
+    return _caches[root]
+
+
+def fetch_source_text(url: str, settings: Settings | None = None, refresh: bool = False) -> str | None:
+    """Main text of the page at ``url``, served from cache without any network when possible.
+
+    ``refresh`` revalidates a cached page with ``If-None-Match``; a 304 keeps
+    the cached text and costs no parsing.
+    """
+    cache = get_page_cache(settings)
+    url_key = normalize_url(url)
+    cached = cache.get(url_key)
+    if cached is not None and not refresh:
+        return cached.text or None
+    headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else {}
+    result = fetch_many([FetchRequest(url=url, headers=headers)], FetchLimits(concurrency=1, per_host=1))[0]
+    if result.status == 304 and cached is not None:
+        return cached.text or None
+    if not result.ok:
+        console.log(f"[yellow]Source fetch failed for {url}: {result.error}[/yellow]")
+        return (cached.text or None) if cached is not None else None
+    content_type = result.headers.get("content-type", "")
+    # Non-HTML sources (PDFs, images) are cached as empty text so retries skip them too.
+    text = extract_main_text(result.content) if "html" in content_type else ""
+    cache.put(url_key, result.headers.get("etag"), text)
+    console.log(f"Fetched source page ({len(text)} chars): {url}")
+    return text or None
+
+
+__all__ = ["extract_main_text", "CachedPage", "PageCache", "get_page_cache", "fetch_source_text"]
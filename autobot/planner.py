@@ -1,13 +1,15 @@
 """Content planning logic creating outlines and SEO briefs."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 
 from rich.console import Console
 
 from .db import Lead
+from .keywords import classify_text
 from .research import EvidencePack
 
 console = Console()
@@ -19,6 +21,16 @@ class Section:
     purpose: str
 
 
+@dataclass(slots=True)
+class Infographic:
+    """Inline chart for the "值不值得" section: labelled values in one unit."""
+
+    title: str
+    chart: str
+    rows: List[Tuple[str, float]] = field(default_factory=list)
+    unit: str = ""
+
+
 @dataclass(slots=True)
 class ContentPlan:
     lead: Lead
@@ -27,6 +39,7 @@ class ContentPlan:
     internal_keywords: List[str]
     hero_message: str
     deal_deadline: datetime | None = None
+    infographic: Infographic | None = None
 
 
 DEFAULT_SECTIONS = [
@@ -40,17 +53,42 @@ DEFAULT_SECTIONS = [
 
 KEYWORDS = ["航司里程", "信用卡积分", "酒店会籍", "里程票", "旅行攻略", "长程商务舱"]
 
+MAX_INFOGRAPHIC_ROWS = 6
+# Matches the article's worked example: award cost at 30%-45% of the cash fare.
+COST_VS_CASH_ROWS = [("现金票价", 100.0), ("积分兑换（保守）", 45.0), ("积分兑换（理想）", 30.0)]
+_NUMBER_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s?(k|万)?", re.IGNORECASE)
+
+
+def _points_value(raw: str) -> float | None:
+    match = _NUMBER_RE.search(raw)
+    if match is None:
+        return None
+    value = float(match[1].replace(",", ""))
+    multiplier = {"k": 1000, "万": 10000}.get((match[2] or "").lower(), 1)
+    return value * multiplier
+
+
+def _plan_infographic(evidence_pack: EvidencePack) -> Infographic:
+    """Points amounts quoted in the evidence, or the cost-vs-cash comparison when there are too few."""
+    rows: List[Tuple[str, float]] = []
+    for item in evidence_pack.items:
+        for raw in item.facts.get("points", []):
+            value = _points_value(raw)
+            if value:
+                rows.append((f"{item.fact_id} · {raw}", value))
+    if len(rows) >= 2:
+        return Infographic(title="积分数额对比", chart="bar", rows=rows[:MAX_INFOGRAPHIC_ROWS], unit="积分")
+    return Infographic(title="奖励票成本 vs 现金票价", chart="table", rows=list(COST_VS_CASH_ROWS), unit="%")
+
 
 def build_plan(lead: Lead, evidence_pack: EvidencePack) -> ContentPlan:
-    summary_text = (lead.summary or "").lower()
-    content_type = "flash" if "limited" in summary_text or "结束" in summary_text else "deep"
+    text = "\n".join([lead.title, lead.summary or "", *(item.text for item in evidence_pack.items)])
+    classification = classify_text(text, reference=lead.published_at)
+    content_type = classification.content_type
     internal_keywords = KEYWORDS[:5]
     hero_message = lead.title
-    deal_deadline = None
-    for item in evidence_pack.items:
-        if "截止" in item.text or "截至" in item.text:
-            deal_deadline = datetime.utcnow()
-            break
+    # A window such as "Nov 1 until Nov 30" yields both dates; the last one is the deadline.
+    deal_deadline = max(classification.deadline_candidates) if classification.deadline_candidates else None
     sections = [Section(heading=title, purpose=purpose) for title, purpose in DEFAULT_SECTIONS]
     console.log(f"Generated content plan with {len(sections)} sections")
     return ContentPlan(
@@ -60,7 +98,8 @@ def build_plan(lead: Lead, evidence_pack: EvidencePack) -> ContentPlan:
         internal_keywords=internal_keywords,
         hero_message=hero_message,
         deal_deadline=deal_deadline,
+        infographic=_plan_infographic(evidence_pack),
     )
 
 
-__all__ = ["Section", "ContentPlan", "build_plan"]
+__all__ = ["Section", "Infographic", "ContentPlan", "build_plan"]
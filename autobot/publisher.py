@@ -1,21 +1,30 @@
 """WordPress publisher with local fallback for drafts."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import importlib.util
 import json
-import shutil
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Sequence
 
 import httpx
 from rich.console import Console
 
+from .assetstore import record_remote_media, remote_media
 from .config import PROJECT_ROOT, Settings
 from .db import Article, ImageAsset, Lead
-from .taxonomy import TaxonomyManager
+from .drafts import DraftBatch, DraftStore
+from .fetcher import USER_AGENT
+from .taxonomy import TaxonomyManager, TaxonomyMap
+from .writer import INLINE_IMAGE_SRC
 
 console = Console()
 
+UPLOAD_CHUNK = 64 * 1024
+
 
 @dataclass(slots=True)
 class PublishResult:
@@ -26,10 +35,127 @@ class PublishResult:
     meta: Dict[str, Any] | None = None
 
 
+@dataclass(slots=True)
+class PublishItem:
+    article: Article
+    cover: ImageAsset
+    seo_package: Dict[str, Any]
+    lead: Lead
+    inline_images: List[ImageAsset] = field(default_factory=list)
+    # Replays look the slug up first so a post created before a crash is not duplicated.
+    check_existing: bool = False
+    # With a remote id the existing post is updated, diffed against its last published ``state``.
+    remote_id: str | None = None
+    state: Dict[str, Any] | None = None
+
+
+def field_hashes(fields: Dict[str, Any]) -> Dict[str, str]:
+    """Short digest per post field: the snapshot kept locally to diff later updates against."""
+    return {
+        name: hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+        for name, value in fields.items()
+    }
+
+
+def _asset_key(asset: ImageAsset) -> str:
+    """Content hash of a stored image; bare files fall back to their path."""
+    return asset.blob_hash or asset.path
+
+
+async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as handle:
+        while chunk := handle.read(UPLOAD_CHUNK):
+            yield chunk
+
+
 class Publisher:
+    """Publishes to WordPress, or saves local drafts when that is not possible.
+
+    Taxonomy sync runs over one pooled, keep-alive client created on first
+    use. Batches publish over one long-lived async client with the same
+    limits, driven by an event loop on a background thread, so its
+    connections survive from one batch (or outbox drain) to the next.
+    Call :meth:`close` (or use the publisher as a context manager) on shutdown.
+    """
+
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
         self.taxonomy = TaxonomyManager(settings)
+        self.drafts = DraftStore(settings.output_dir, archive=settings.draft_archive)
+        self._client: httpx.Client | None = None
+        self._client_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        self._async_client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None or self._client.is_closed:
+                self._client = self._create_client()
+            return self._client
+
+    def _client_options(self) -> Dict[str, Any]:
+        http2 = self.settings.wp_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            console.log("[yellow]WP_HTTP2=true but the h2 package is missing; using HTTP/1.1[/yellow]")
+            http2 = False
+        limits = httpx.Limits(
+            max_connections=self.settings.wp_max_connections,
+            max_keepalive_connections=self.settings.wp_max_connections,
+            keepalive_expiry=self.settings.wp_keepalive_seconds,
+        )
+        return {
+            "base_url": self.settings.wp_base_url,
+            "timeout": self.settings.wp_timeout,
+            "limits": limits,
+            "http2": http2,
+            "headers": {"User-Agent": USER_AGENT},
+        }
+
+    def _create_client(self) -> httpx.Client:
+        return httpx.Client(**self._client_options())
+
+    def _run(self, coroutine: Awaitable[Any]) -> Any:
+        """Run ``coroutine`` on the publisher's event loop thread, started on first use."""
+        with self._client_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="publisher-loop", daemon=True
+                )
+                self._loop_thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """The shared async client; only called on the publisher's event loop."""
+        if self._async_client is None or self._async_client.is_closed:
+            auth = (self.settings.wp_user or "", self.settings.wp_app_pass or "")
+            self._async_client = httpx.AsyncClient(auth=auth, **self._client_options())
+        return self._async_client
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            loop, thread, client = self._loop, self._loop_thread, self._async_client
+            self._loop = self._loop_thread = self._async_client = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join()
+        loop.close()
+
+    def __enter__(self) -> "Publisher":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
     def publish(
         self,
@@ -37,81 +163,240 @@ class Publisher:
         cover: ImageAsset,
         seo_package: Dict[str, Any],
         lead: Lead,
+        inline_images: List[ImageAsset] | None = None,
     ) -> Dict[str, Any]:
-        if self.settings.wp_user and self.settings.wp_app_pass:
+        return self.publish_many([PublishItem(article, cover, seo_package, lead, inline_images or [])])[0]
+
+    def publish_many(
+        self, items: Sequence[PublishItem], concurrency: int | None = None, fallback: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Publish a batch, falling back to a local draft for every article WordPress did not take.
+
+        With ``fallback=False`` a failed article's exception is returned in
+        its place instead, for callers that retry later.
+        """
+        outcomes: List[Dict[str, Any] | BaseException | None] = [None] * len(items)
+        if items and self.settings.wp_user and self.settings.wp_app_pass:
             try:
-                return self._publish_wordpress(article, cover, seo_package, lead)
+                outcomes = self._run(self._publish_wordpress(items, concurrency or self.settings.wp_concurrency))
             except Exception as exc:  # pragma: no cover - network failure fallback
-                console.log(f"[red]WordPress publish failed: {exc}; falling back to local draft[/red]")
-        return self._save_local_draft(article, cover, seo_package, lead)
+                outcomes = [exc] * len(items)
+        if not fallback:
+            return outcomes
+        results = []
+        with self.drafts.batch() as batch:
+            for item, outcome in zip(items, outcomes):
+                if isinstance(outcome, BaseException):
+                    console.log(f"[red]WordPress publish failed: {outcome}; falling back to local draft[/red]")
+                    outcome = None
+                results.append(
+                    outcome
+                    or self._save_local_draft(
+                        batch, item.article, item.cover, item.seo_package, item.lead, item.inline_images
+                    )
+                )
+        return results
 
-    def _publish_wordpress(
-        self,
-        article: Article,
-        cover: ImageAsset,
-        seo_package: Dict[str, Any],
-        lead: Lead,
-    ) -> Dict[str, Any]:
-        client = httpx.Client(base_url=self.settings.wp_base_url, timeout=30)
-        auth = (self.settings.wp_user, self.settings.wp_app_pass)
-        taxonomy_ids = self.taxonomy.resolve(client, auth)
-        category_name = seo_package.get("category", "Travel")
-        category_id = taxonomy_ids.categories.get(category_name)
-        tag_ids = [taxonomy_ids.tags.get(tag) for tag in seo_package.get("tags", []) if taxonomy_ids.tags.get(tag)]
-
-        cover_path = PROJECT_ROOT / cover.path
-        media_headers = {"Content-Type": "image/webp", "Content-Disposition": f"attachment; filename={Path(cover.path).name}"}
-        media_resp = client.post(
-            "/wp-json/wp/v2/media",
-            content=cover_path.read_bytes(),
-            headers=media_headers,
-            auth=auth,
-        )
+    @staticmethod
+    def _resolve_inline_images(html: str, sources: Dict[str | None, str]) -> str:
+        for blob_hash, src in sources.items():
+            html = html.replace(f'src="{INLINE_IMAGE_SRC}{blob_hash}"', f'src="{src}"')
+        return html
+
+    async def _publish_wordpress(
+        self, items: Sequence[PublishItem], concurrency: int
+    ) -> List[Dict[str, Any] | BaseException]:
+        """Overlap taxonomy sync, media uploads and post creation for the whole batch.
+
+        Taxonomy resolution (including creating missing tags) runs on the
+        pooled sync client in a worker thread while the covers upload; each
+        post is created as soon as its own media ids are known. ``concurrency``
+        caps in-flight requests, and an image shared by several articles is
+        uploaded once.
+        """
+        auth = (self.settings.wp_user or "", self.settings.wp_app_pass or "")
+        gate = asyncio.Semaphore(max(1, concurrency))
+        tag_names = [tag for item in items for tag in item.seo_package.get("tags", [])]
+        client = self._get_async_client()
+        taxonomy = asyncio.create_task(asyncio.to_thread(self._resolve_taxonomy, auth, tag_names))
+        uploads: Dict[str, asyncio.Task] = {}
+
+        def upload(asset: ImageAsset) -> asyncio.Task:
+            key = _asset_key(asset)
+            if key not in uploads:
+                uploads[key] = asyncio.create_task(self._upload_media(client, gate, asset))
+            return uploads[key]
+
+        posts = [
+            (self._update_post if item.remote_id else self._create_post)(client, gate, item, upload, taxonomy)
+            for item in items
+        ]
+        results = await asyncio.gather(*posts, return_exceptions=True)
+        # Surface failures of uploads no post waited on, and never leave tasks pending.
+        await asyncio.gather(taxonomy, *uploads.values(), return_exceptions=True)
+        return results
+
+    def _resolve_taxonomy(self, auth: tuple[str, str], tag_names: List[str]) -> TaxonomyMap:
+        taxonomy_map = self.taxonomy.resolve(self.client, auth)
+        self.taxonomy.ensure_tags(self.client, auth, tag_names)
+        return taxonomy_map
+
+    async def _upload_media(
+        self, client: httpx.AsyncClient, gate: asyncio.Semaphore, asset: ImageAsset
+    ) -> tuple[int | None, str | None]:
+        """Media id and URL for ``asset``, streamed from disk only when its hash is not on the site yet.
+
+        The blob lookups are database calls, so they run in worker threads
+        rather than stalling the uploads sharing this event loop.
+        """
+        uploaded = await asyncio.to_thread(remote_media, asset.blob_hash, self.settings.wp_base_url)
+        if uploaded is not None:
+            console.log(f"图片已存在于媒体库（ID {uploaded.remote_media_id}），跳过上传")
+            return uploaded.remote_media_id, uploaded.remote_url
+        path = PROJECT_ROOT / asset.path
+        media_headers = {
+            "Content-Type": "image/webp",
+            "Content-Disposition": f"attachment; filename={path.name}",
+            "Content-Length": str(path.stat().st_size),
+        }
+        async with gate:
+            media_resp = await client.post("/wp-json/wp/v2/media", content=_read_chunks(path), headers=media_headers)
         media_resp.raise_for_status()
         media_data = media_resp.json()
-        featured_id = media_data.get("id")
+        media_id, media_url = media_data.get("id"), media_data.get("source_url")
+        await asyncio.to_thread(record_remote_media, asset.blob_hash, self.settings.wp_base_url, media_id, media_url)
+        return media_id, media_url
+
+    async def _create_post(
+        self,
+        client: httpx.AsyncClient,
+        gate: asyncio.Semaphore,
+        item: PublishItem,
+        upload: Callable[[ImageAsset], Awaitable[tuple[int | None, str | None]]],
+        taxonomy: Awaitable[TaxonomyMap],
+    ) -> Dict[str, Any]:
+        seo_package = item.seo_package
+        if item.check_existing:
+            existing = await self._find_post(client, gate, seo_package["slug"])
+            if existing is not None:
+                console.log(f"文章已存在（ID {existing.get('id')}），跳过重复发布：{existing.get('link', '')}")
+                return self._post_result(existing, existing.get("featured_media"))
+        cover_upload = upload(item.cover)
+        inline_uploads = [upload(image) for image in item.inline_images]
+        featured_id, _ = await cover_upload
+        fields = await self._post_fields(item, inline_uploads, taxonomy)
+        payload = {**fields, "status": "publish", "featured_media": featured_id}
+        async with gate:
+            post_resp = await client.post("/wp-json/wp/v2/posts", json=payload)
+        post_resp.raise_for_status()
+        data = post_resp.json()
+        console.log(f"[green]已发布文章：{data.get('link', '')}[/green]")
+        return self._post_result(data, featured_id, self._state(item, fields, featured_id))
+
+    async def _update_post(
+        self,
+        client: httpx.AsyncClient,
+        gate: asyncio.Semaphore,
+        item: PublishItem,
+        upload: Callable[[ImageAsset], Awaitable[tuple[int | None, str | None]]],
+        taxonomy: Awaitable[TaxonomyMap],
+    ) -> Dict[str, Any]:
+        """Send only the fields that differ from ``item.state``; the cover is re-uploaded only if its hash changed."""
+        state = item.state or {}
+        cover_upload = upload(item.cover) if _asset_key(item.cover) != state.get("cover") else None
+        inline_uploads = [upload(image) for image in item.inline_images]
+        fields = await self._post_fields(item, inline_uploads, taxonomy)
+        previous = state.get("fields") or {}
+        changes = {name: fields[name] for name, digest in field_hashes(fields).items() if previous.get(name) != digest}
+        featured_id = state.get("featured_media")
+        if cover_upload is not None:
+            featured_id, _ = await cover_upload
+            changes["featured_media"] = featured_id
+        if not changes:
+            return self._post_result({"id": item.remote_id}, featured_id, state, status="unchanged")
+        async with gate:
+            post_resp = await client.post(
+                f"/wp-json/wp/v2/posts/{item.remote_id}", params={"_fields": "id,link"}, json=changes
+            )
+        post_resp.raise_for_status()
+        data = post_resp.json()
+        console.log(f"[green]已更新文章（{', '.join(changes)}）：{data.get('link', '')}[/green]")
+        return self._post_result(data, featured_id, self._state(item, fields, featured_id), status="updated")
+
+    async def _post_fields(
+        self,
+        item: PublishItem,
+        inline_uploads: List[Awaitable[tuple[int | None, str | None]]],
+        taxonomy: Awaitable[TaxonomyMap],
+    ) -> Dict[str, Any]:
+        """Post fields derived from the article, compared field by field on updates."""
+        seo_package = item.seo_package
+        inline_sources = {}
+        for image, pending in zip(item.inline_images, inline_uploads):
+            inline_sources[image.blob_hash] = (await pending)[1] or ""
+        taxonomy_ids = await taxonomy
+        category_id = taxonomy_ids.lookup("categories", seo_package.get("category", "Travel"))
+        tag_ids = [taxonomy_ids.lookup("tags", tag) for tag in seo_package.get("tags", [])]
 
-        html = article.html + f'<script type="application/ld+json">{seo_package["json_ld"]}</script>'
-        payload = {
+        html = self._resolve_inline_images(item.article.html, inline_sources)
+        html += f'<script type="application/ld+json">{seo_package["json_ld"]}</script>'
+        return {
             "title": seo_package["title"],
             "slug": seo_package["slug"],
-            "status": "publish",
             "content": html,
-            "excerpt": article.excerpt,
-            "featured_media": featured_id,
+            "excerpt": item.article.excerpt,
             "categories": [category_id] if category_id else [],
-            "tags": tag_ids,
+            "tags": list(dict.fromkeys(filter(None, tag_ids))),
             "meta": {"_longbo_internal_links": json.dumps(seo_package.get("internal_links", []))},
         }
-        post_resp = client.post("/wp-json/wp/v2/posts", json=payload, auth=auth)
-        post_resp.raise_for_status()
-        data = post_resp.json()
-        url = data.get("link", "")
-        console.log(f"[green]已发布文章：{url}[/green]")
+
+    @staticmethod
+    def _state(item: PublishItem, fields: Dict[str, Any], featured_id: int | None) -> Dict[str, Any]:
+        return {"fields": field_hashes(fields), "cover": _asset_key(item.cover), "featured_media": featured_id}
+
+    @staticmethod
+    async def _find_post(client: httpx.AsyncClient, gate: asyncio.Semaphore, slug: str) -> Dict[str, Any] | None:
+        params = {"slug": slug, "status": "any", "_fields": "id,link,featured_media"}
+        async with gate:
+            response = await client.get("/wp-json/wp/v2/posts", params=params)
+        response.raise_for_status()
+        posts = response.json()
+        return posts[0] if posts else None
+
+    @staticmethod
+    def _post_result(
+        data: Dict[str, Any],
+        featured_id: int | None,
+        state: Dict[str, Any] | None = None,
+        status: str = "published",
+    ) -> Dict[str, Any]:
+        meta: Dict[str, Any] = {"featured_media": featured_id}
+        if state is not None:
+            meta["state"] = state
         return {
-            "status": "published",
-            "url": url,
+            "status": status,
+            "url": data.get("link", ""),
             "platform": "wordpress",
             "remote_id": str(data.get("id")),
-            "meta": {"featured_media": featured_id},
+            "meta": meta,
         }
 
     def _save_local_draft(
         self,
+        batch: DraftBatch,
         article: Article,
         cover: ImageAsset,
         seo_package: Dict[str, Any],
         lead: Lead,
+        inline_images: List[ImageAsset],
     ) -> Dict[str, Any]:
-        html = article.html + f'<script type="application/ld+json">{seo_package["json_ld"]}</script>'
-        output_dir = self.settings.output_dir
-        output_dir.mkdir(parents=True, exist_ok=True)
         slug = seo_package["slug"]
-        html_path = output_dir / f"{slug}.html"
-        json_path = output_dir / f"{slug}.json"
-        image_output = output_dir / Path(cover.path).name
-        shutil.copyfile(PROJECT_ROOT / cover.path, image_output)
-        html_path.write_text(html, encoding="utf-8")
+        cover_source = PROJECT_ROOT / cover.path
+        inline_sources = [PROJECT_ROOT / image.path for image in inline_images]
+        html = self._resolve_inline_images(
+            article.html, {image.blob_hash: path.name for image, path in zip(inline_images, inline_sources)}
+        )
+        html += f'<script type="application/ld+json">{seo_package["json_ld"]}</script>'
         json_payload = {
             "title": seo_package["title"],
             "slug": slug,
@@ -120,18 +405,28 @@ class Publisher:
             "category": seo_package["category"],
             "tags": seo_package["tags"],
             "internal_links": seo_package.get("internal_links", []),
-            "cover_image": str(image_output),
+            "cover_image": batch.locate(slug, cover_source.name),
             "cover_alt": seo_package.get("cover_alt"),
+            "inline_images": [batch.locate(slug, path.name) for path in inline_sources],
             "source_url": lead.url,
         }
-        json_path.write_text(json.dumps(json_payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        entry = batch.save(
+            slug,
+            blobs={
+                f"{slug}.html": html.encode("utf-8"),
+                f"{slug}.json": json.dumps(json_payload, ensure_ascii=False, indent=2).encode("utf-8"),
+            },
+            files={path.name: path for path in [cover_source, *inline_sources]},
+            record={"title": json_payload["title"], "source_url": lead.url},
+        )
+        html_path = entry["files"][0]
         console.log(f"[yellow]草稿已生成：{html_path}[/yellow]")
         return {
             "status": "draft",
-            "url": str(html_path),
+            "url": html_path,
             "platform": "local",
             "meta": json_payload,
         }
 
 
-__all__ = ["Publisher"]
+__all__ = ["Publisher", "PublishItem", "field_hashes"]
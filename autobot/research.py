@@ -1,12 +1,17 @@
 """Evidence gathering and fact extraction from discovered leads."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List
 
 from rich.console import Console
+from sqlalchemy import delete, insert
+from sqlmodel import select
 
-from .db import Lead
+from .db import Evidence, Lead, session_scope
 
 console = Console()
 
@@ -16,6 +21,7 @@ class EvidenceItem:
     fact_id: str
     text: str
     source_url: str
+    facts: Dict[str, List[str]] = field(default_factory=dict)
 
 
 @dataclass(slots=True)
@@ -27,34 +33,173 @@ class EvidencePack:
         return "".join(f"[{item.fact_id}]" for item in self.items)
 
 
-SPLIT_CHARS = "。！？!?.\n"
+MAX_SUMMARY_ITEMS = 5
+MAX_EVIDENCE_ITEMS = 8
+
+_TAG_RE = re.compile(r"<[^>]+>")
+# Full stops only end a sentence before whitespace and not after an initialism,
+# so "2.5x" and "U.S. cardholders" stay whole.
+_BOUNDARY_RE = re.compile(r"[。！？!?]+|(?<![A-Z]\.[A-Z])\.(?=\s|$)|\n")
+
+_MONTHS = r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?"
+DATE_PATTERN = rf"\d{{4}}[-/年.]\d{{1,2}}[-/月.]\d{{1,2}}日?|\d{{1,2}}月\d{{1,2}}日|{_MONTHS} \d{{1,2}}(?:st|nd|rd|th)?(?:, ?\d{{4}})?"
+DATE_RE = re.compile(DATE_PATTERN, re.IGNORECASE)
+_MONTH_NUMBERS = {name: idx for idx, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+_YMD_RE = re.compile(r"(\d{4})[-/年.](\d{1,2})[-/月.](\d{1,2})")
+_MD_ZH_RE = re.compile(r"(\d{1,2})月(\d{1,2})日")
+_MD_EN_RE = re.compile(r"([A-Za-z]{3})[a-z]*\.? (\d{1,2})(?:st|nd|rd|th)?(?:, ?(\d{4}))?")
+_REGIONS = (
+    r"\b(?:Canada|Canadian|USA|U\.S\.|United States|Mexico|Europe|UK|Asia|Japan|China|Hong Kong|Australia)(?!\w)"
+    r"|加拿大|美国|墨西哥|欧洲|英国|亚洲|日本|中国|香港|台湾|澳洲|澳大利亚"
+)
+# The leading guard lets the scanner skip positions no branch can start at.
+_FACT_RE = re.compile(
+    r"(?=[\d$¥￥百满消加美墨欧英亚日中香台澳]|\b[A-Za-z])(?:"
+    + "|".join(
+        [
+            rf"(?P<date>{DATE_PATTERN})",
+            r"(?P<percent>\d+(?:\.\d+)?\s?%|百分之[零一二三四五六七八九十百]+)",
+            r"(?P<threshold>(?:spend|消费|满)\s?(?:C?\$|US\$|CAD\s?|USD\s?|¥|￥)?\d[\d,]*(?:\.\d+)?\s?(?:元|加元|美元)?"
+            r"|(?:C?\$|US\$)\d[\d,]*(?:\.\d{2})?)",
+            r"(?P<points>\d[\d,]*(?:\.\d+)?\s?(?:k\s?)?(?:万\s?)?(?:points|pts|miles|avios|积分|里程|点))",
+            rf"(?P<region>{_REGIONS})",
+        ]
+    )
+    + ")",
+    re.IGNORECASE,
+)
+
+
+def parse_fact_date(text: str, default_year: int | None = None) -> datetime | None:
+    """Turn a date matched by ``DATE_RE`` into a datetime; yearless dates use ``default_year``."""
+    default_year = default_year or datetime.utcnow().year
+    try:
+        if match := _YMD_RE.search(text):
+            return datetime(int(match[1]), int(match[2]), int(match[3]))
+        if match := _MD_ZH_RE.search(text):
+            return datetime(default_year, int(match[1]), int(match[2]))
+        if (match := _MD_EN_RE.search(text)) and match[1].lower() in _MONTH_NUMBERS:
+            year = int(match[3]) if match[3] else default_year
+            return datetime(year, _MONTH_NUMBERS[match[1].lower()], int(match[2]))
+    except ValueError:
+        return None
+    return None
+
+
+def _clean(text: str) -> str:
+    return _TAG_RE.sub(" ", text)
+
+
+def _iter_sentence_spans(text: str) -> Iterator[tuple[int, int]]:
+    """Yield ``(start, end)`` of each sentence in a single regex pass."""
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        end = match.end()
+        yield start, end
+        start = end
+    if start < len(text):
+        yield start, len(text)
 
 
 def _split_sentences(text: str) -> List[str]:
     if not text:
         return []
-    sentences: List[str] = []
-    buffer = ""
-    for char in text:
-        buffer += char
-        if char in SPLIT_CHARS:
-            sentences.append(buffer.strip())
-            buffer = ""
-    if buffer.strip():
-        sentences.append(buffer.strip())
+    sentences = (text[start:end].strip() for start, end in _iter_sentence_spans(text))
     return [s for s in sentences if len(s) > 2]
 
 
-def gather_evidence(lead: Lead) -> EvidencePack:
-    sentences = _split_sentences(lead.summary or "")
-    if not sentences:
-        sentences = [lead.title]
-    items: List[EvidenceItem] = []
-    for idx, sentence in enumerate(sentences[:5], start=1):
-        fact_id = f"F{idx}"
-        items.append(EvidenceItem(fact_id=fact_id, text=sentence.strip(), source_url=lead.url))
+def iter_evidence(text: str, source_url: str, start_index: int = 1) -> Iterator[EvidenceItem]:
+    """Lazily yield one ``EvidenceItem`` per sentence with its structured facts.
+
+    Sentence boundaries and fact matches are both produced in document order,
+    so facts are assigned to sentences by walking the two streams together:
+    each character of the document is scanned once by each regex.
+    """
+    if not text:
+        return
+    text = _clean(text)
+    facts = _FACT_RE.finditer(text)
+    pending = next(facts, None)
+    index = start_index
+    for start, end in _iter_sentence_spans(text):
+        found: Dict[str, List[str]] = {}
+        while pending is not None and pending.start() < end:
+            if pending.start() >= start:
+                found.setdefault(pending.lastgroup, []).append(pending.group().strip())
+            pending = next(facts, None)
+        sentence = text[start:end].strip()
+        if len(sentence) <= 2:
+            continue
+        yield EvidenceItem(fact_id=f"F{index}", text=" ".join(sentence.split()), source_url=source_url, facts=found)
+        index += 1
+
+
+def gather_evidence(lead: Lead, page_text: str | None = None) -> EvidencePack:
+    """Evidence from the feed summary, topped up with fact-bearing sentences of the source page."""
+    items = list(islice(iter_evidence(lead.summary or "", lead.url), MAX_SUMMARY_ITEMS))
+    if page_text:
+        seen = {item.text for item in items}
+        for item in iter_evidence(page_text, lead.url):
+            if len(items) >= MAX_EVIDENCE_ITEMS:
+                break
+            if item.facts and item.text not in seen:
+                item.fact_id = f"F{len(items) + 1}"
+                seen.add(item.text)
+                items.append(item)
+    if not items:
+        items = [EvidenceItem(fact_id="F1", text=lead.title.strip(), source_url=lead.url)]
     console.log(f"Collected {len(items)} evidence items for lead")
     return EvidencePack(lead=lead, items=items)
 
 
-__all__ = ["EvidenceItem", "EvidencePack", "gather_evidence"]
+def persist_evidence(evidence_pack: EvidencePack) -> None:
+    """Replace the lead's stored evidence with ``evidence_pack`` in one bulk insert."""
+    lead_id = evidence_pack.lead.id
+    if lead_id is None:
+        raise ValueError("Evidence can only be stored for a persisted lead")
+    rows = [
+        {
+            "lead_id": lead_id,
+            "fact_id": item.fact_id,
+            "text": item.text,
+            "source_url": item.source_url,
+            "facts": item.facts or None,
+        }
+        for item in evidence_pack.items
+    ]
+    with session_scope() as session:
+        session.exec(delete(Evidence).where(Evidence.lead_id == lead_id))
+        if rows:
+            session.exec(insert(Evidence), params=rows)
+        session.commit()
+
+
+def load_evidence_pack(lead_id: int) -> EvidencePack | None:
+    """Rebuild a lead's ``EvidencePack`` from the database alone, or ``None`` if none is stored."""
+    with session_scope() as session:
+        lead = session.get(Lead, lead_id)
+        if lead is None:
+            return None
+        rows = session.exec(select(Evidence).where(Evidence.lead_id == lead_id).order_by(Evidence.id)).all()
+        session.expunge(lead)
+    if not rows:
+        return None
+    items = [
+        EvidenceItem(fact_id=row.fact_id, text=row.text, source_url=row.source_url, facts=row.facts or {})
+        for row in rows
+    ]
+    return EvidencePack(lead=lead, items=items)
+
+
+__all__ = [
+    "EvidenceItem",
+    "EvidencePack",
+    "DATE_RE",
+    "parse_fact_date",
+    "iter_evidence",
+    "gather_evidence",
+    "persist_evidence",
+    "load_evidence_pack",
+]
@@ -9,30 +9,20 @@ from slugify import slugify
 
 from .db import Article, Lead
 from .imaging import ImageAsset
+from .keywords import Classification, classify_text
+from .linking import suggest_links
 from .research import EvidencePack
 
 DEFAULT_CATEGORIES = ["Travel", "Airline", "Points"]
 DEFAULT_TAGS = ["里程", "积分", "旅行攻略"]
 
 
-def _select_category(lead: Lead) -> str:
-    title = lead.title.lower()
-    if any(keyword in title for keyword in ["card", "信用卡", "visa", "mastercard"]):
-        return "Card"
-    if any(keyword in title for keyword in ["hotel", "酒店"]):
-        return "Hotel"
-    if any(keyword in title for keyword in ["航", "air", "里程"]):
-        return "Airline"
-    return "Travel"
+def _classify(lead: Lead) -> Classification:
+    return classify_text(f"{lead.title}\n{lead.summary or ''}", reference=lead.published_at)
 
 
-def _collect_tags(lead: Lead) -> List[str]:
-    tags = set(DEFAULT_TAGS)
-    for word in lead.title.replace("—", " ").replace("：", " ").split():
-        cleaned = word.strip().strip("，。、()（）")
-        if len(cleaned) >= 2:
-            tags.add(cleaned)
-    return sorted(tags)
+def _collect_tags(classification: Classification) -> List[str]:
+    return sorted(set(DEFAULT_TAGS) | set(classification.tags))
 
 
 def build_json_ld(article: Article, evidence_pack: EvidencePack, cover: ImageAsset, lead: Lead) -> str:
@@ -78,15 +68,21 @@ def build_json_ld(article: Article, evidence_pack: EvidencePack, cover: ImageAss
     return orjson.dumps(data).decode("utf-8")
 
 
+def _meta_description(article: Article) -> str:
+    meta = article.meta if isinstance(article.meta, dict) else {}
+    meta_descriptions = meta.get("meta_descriptions", [])
+    return (meta_descriptions[0] if meta_descriptions else article.excerpt)[:155]
+
+
 def build_seo_package(article: Article, evidence_pack: EvidencePack, cover: ImageAsset, lead: Lead) -> Dict[str, Any]:
     meta = article.meta if isinstance(article.meta, dict) else {}
     title_options = meta.get("title_options", [article.title])
-    meta_descriptions = meta.get("meta_descriptions", [])
     chosen_title = title_options[0][:60]
-    meta_description = (meta_descriptions[0] if meta_descriptions else article.excerpt)[:155]
+    meta_description = _meta_description(article)
     slug = slugify(article.title)[:90]
-    category = _select_category(lead)
-    tags = _collect_tags(lead)
+    classification = _classify(lead)
+    category = classification.category
+    tags = _collect_tags(classification)
     json_ld = build_json_ld(article, evidence_pack, cover, lead)
 
     article.title = chosen_title
@@ -100,10 +96,29 @@ def build_seo_package(article: Article, evidence_pack: EvidencePack, cover: Imag
         "json_ld": json_ld,
         "category": category,
         "tags": tags,
-        "internal_links": meta.get("internal_links", []),
+        "internal_links": suggest_links(article),
         "cover_alt": cover.alt_text,
     }
     return seo_package
 
 
-__all__ = ["build_seo_package"]
+def refresh_seo_package(article: Article, cover: ImageAsset, lead: Lead) -> Dict[str, Any]:
+    """Package for updating a published post from its stored article.
+
+    Title, slug and structured data are taken as stored, so an unchanged
+    article produces an identical post and the update diff stays empty.
+    """
+    classification = _classify(lead)
+    return {
+        "title": article.title,
+        "slug": article.slug,
+        "meta_description": _meta_description(article),
+        "json_ld": article.json_ld or "{}",
+        "category": classification.category,
+        "tags": _collect_tags(classification),
+        "internal_links": suggest_links(article),
+        "cover_alt": cover.alt_text,
+    }
+
+
+__all__ = ["build_seo_package", "refresh_seo_package"]
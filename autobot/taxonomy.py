@@ -1,16 +1,29 @@
 """Taxonomy synchronization with WordPress."""
 from __future__ import annotations
 
+import html
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterable, List
 
 import httpx
+from rich.console import Console
 
-from .config import PROJECT_ROOT, Settings
+from .config import Settings
+from .fsutil import atomic_write
 
-CACHE_PATH = PROJECT_ROOT / "taxonomy_map.json"
+console = Console()
+
+CACHE_FILE = "taxonomy_map.json"
+TAXONOMIES = ("categories", "tags")
+PER_PAGE = 100
+PAGE_CONCURRENCY = 8
+# WordPress rejects batch requests with more than 25 sub-requests.
+BATCH_SIZE = 25
 DEFAULT_CATEGORIES = {
     "Airline": 0,
     "Card": 0,
@@ -30,42 +43,247 @@ DEFAULT_TAGS = {
 }
 
 
+class TaxonomySyncError(RuntimeError):
+    """A term listing could not be read completely, or terms could not be created."""
+
+
+def term_key(name: str) -> str:
+    """Lookup key for a term name; the REST API returns names HTML-escaped."""
+    return html.unescape(name).strip().casefold()
+
+
+def _folded(terms: Dict[str, int]) -> Dict[str, int]:
+    return {term_key(name): term_id for name, term_id in terms.items()}
+
+
 @dataclass(slots=True)
 class TaxonomyMap:
-    categories: Dict[str, int] = field(default_factory=lambda: DEFAULT_CATEGORIES.copy())
-    tags: Dict[str, int] = field(default_factory=lambda: DEFAULT_TAGS.copy())
+    categories: Dict[str, int] = field(default_factory=lambda: _folded(DEFAULT_CATEGORIES))
+    tags: Dict[str, int] = field(default_factory=lambda: _folded(DEFAULT_TAGS))
+    # Highest term id seen per taxonomy; incremental syncs stop below it.
+    high_water: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(TAXONOMIES, 0))
+    synced_at: float = 0.0
+    full_synced_at: float = 0.0
 
-    def to_dict(self) -> Dict[str, Dict[str, int]]:
-        return {"categories": self.categories, "tags": self.tags}
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "categories": self.categories,
+            "tags": self.tags,
+            "high_water": self.high_water,
+            "synced_at": self.synced_at,
+            "full_synced_at": self.full_synced_at,
+        }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Dict[str, int]]) -> "TaxonomyMap":
+    def from_dict(cls, data: Dict[str, Any]) -> "TaxonomyMap":
         instance = cls()
-        instance.categories.update(data.get("categories", {}))
-        instance.tags.update(data.get("tags", {}))
+        instance.categories.update(_folded(data.get("categories", {})))
+        instance.tags.update(_folded(data.get("tags", {})))
+        instance.high_water.update(data.get("high_water", {}))
+        instance.synced_at = float(data.get("synced_at", 0.0))
+        instance.full_synced_at = float(data.get("full_synced_at", 0.0))
         return instance
 
+    def lookup(self, taxonomy: str, name: str) -> int | None:
+        return getattr(self, taxonomy).get(term_key(name)) or None
+
+    def add(self, taxonomy: str, terms: Iterable[Dict[str, Any]]) -> None:
+        mapping = getattr(self, taxonomy)
+        for term in terms:
+            if term.get("id") and term.get("name"):
+                mapping[term_key(term["name"])] = int(term["id"])
+                self.high_water[taxonomy] = max(self.high_water.get(taxonomy, 0), int(term["id"]))
+
+
+_maps: Dict[Path, TaxonomyMap] = {}
+
 
 class TaxonomyManager:
-    def __init__(self, settings: Settings) -> None:
+    """Category and tag ids for the site, kept in memory and refreshed on a TTL.
+
+    The map is read from ``taxonomy_map.json`` once per process. Every
+    ``TAXONOMY_TTL_MINUTES`` an incremental sync pages through terms newest
+    first until it reaches the highest id already known; term endpoints have
+    no ``modified_after`` filter, so renames and deletions are picked up by a
+    full sync every ``TAXONOMY_FULL_SYNC_HOURS``, which reads all pages
+    concurrently using ``X-WP-TotalPages``. Tags missing on the site are
+    created through the batch endpoint.
+    """
+
+    def __init__(self, settings: Settings, path: Path | None = None) -> None:
         self.settings = settings
+        self.path = path or settings.cache_dir / CACHE_FILE
+        self._lock = threading.Lock()
+
+    @property
+    def map(self) -> TaxonomyMap:
+        if self.path not in _maps:
+            _maps[self.path] = self._load()
+        return _maps[self.path]
+
+    def _load(self) -> TaxonomyMap:
+        if not self.path.exists():
+            return TaxonomyMap()
+        try:
+            return TaxonomyMap.from_dict(json.loads(self.path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as exc:
+            console.log(f"[yellow]Ignoring unreadable taxonomy cache {self.path}: {exc}[/yellow]")
+            return TaxonomyMap()
+
+    def _save(self) -> None:
+        data = json.dumps(self.map.to_dict(), ensure_ascii=False, indent=2).encode("utf-8")
+        atomic_write(self.path, data)
+
+    def resolve(
+        self, client: httpx.Client | None = None, auth: tuple[str, str] | None = None, full: bool = False
+    ) -> TaxonomyMap:
+        """The in-memory map, synced first when a client is given and the TTL has lapsed."""
+        with self._lock:
+            taxonomy_map = self.map
+            if client is None or auth is None:
+                return taxonomy_map
+            now = time.time()
+            if full or now - taxonomy_map.full_synced_at >= self.settings.taxonomy_full_sync_hours * 3600:
+                self._sync(client, auth, full=True)
+            elif now - taxonomy_map.synced_at >= self.settings.taxonomy_ttl_minutes * 60:
+                self._sync(client, auth, full=False)
+            return taxonomy_map
+
+    def ensure_tags(self, client: httpx.Client, auth: tuple[str, str], names: Iterable[str]) -> List[int]:
+        """Ids for ``names``, creating the tags the site does not have yet."""
+        taxonomy_map = self.resolve(client, auth)
+        names = list(dict.fromkeys(name for name in names if name.strip()))
+        with self._lock:
+            missing = [name for name in names if not taxonomy_map.lookup("tags", name)]
+            for start in range(0, len(missing), BATCH_SIZE):
+                try:
+                    self._create_terms(client, auth, "tags", missing[start : start + BATCH_SIZE])
+                except TaxonomySyncError as exc:
+                    # Posts still go out with the tags that do exist.
+                    console.log(f"[yellow]{exc}[/yellow]")
+            if missing:
+                self._save()
+        ids = (taxonomy_map.lookup("tags", name) for name in names)
+        return list(dict.fromkeys(term_id for term_id in ids if term_id))
+
+    def sync_all(self, client: httpx.Client, auth: tuple[str, str]) -> TaxonomyMap:
+        """Full sync that raises :class:`TaxonomySyncError` instead of keeping the cached ids."""
+        with self._lock:
+            self._sync(client, auth, full=True, strict=True)
+            return self.map
+
+    def _sync(self, client: httpx.Client, auth: tuple[str, str], full: bool, strict: bool = False) -> None:
+        taxonomy_map = self.map
+        started = time.perf_counter()
+        try:
+            if full:
+                fresh = {taxonomy: self._fetch_all(client, auth, taxonomy) for taxonomy in TAXONOMIES}
+                for taxonomy, terms in fresh.items():
+                    getattr(taxonomy_map, taxonomy).clear()
+                    taxonomy_map.high_water[taxonomy] = 0
+                    taxonomy_map.add(taxonomy, terms)
+                taxonomy_map.full_synced_at = time.time()
+            else:
+                for taxonomy in TAXONOMIES:
+                    taxonomy_map.add(taxonomy, self._fetch_new(client, auth, taxonomy))
+        except TaxonomySyncError as exc:
+            if strict:
+                raise
+            console.log(f"[yellow]Taxonomy sync failed; keeping cached ids: {exc}[/yellow]")
+            return
+        except (httpx.HTTPError, ValueError) as exc:
+            if strict:
+                raise TaxonomySyncError(f"Taxonomy sync failed: {exc}") from exc
+            console.log(f"[yellow]Taxonomy sync failed; keeping cached ids: {exc}[/yellow]")
+            return
+        taxonomy_map.synced_at = time.time()
+        self._save()
+        console.log(
+            f"Taxonomy {'full' if full else 'incremental'} sync: {len(taxonomy_map.categories)} categories, "
+            f"{len(taxonomy_map.tags)} tags in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _fetch_all(self, client: httpx.Client, auth: tuple[str, str], taxonomy: str) -> List[Dict[str, Any]]:
+        """Every term: page 1 tells how many pages exist, the rest are fetched concurrently on ``client``.
+
+        A page short of ``PER_PAGE`` before the last, or fewer terms than
+        ``X-WP-Total``, raises :class:`TaxonomySyncError` rather than
+        replacing the map with a partial listing.
+        """
+        endpoint = f"/wp-json/wp/v2/{taxonomy}"
+        params = {"per_page": PER_PAGE, "orderby": "id", "order": "asc", "_fields": "id,name"}
+        first = client.get(endpoint, params={**params, "page": 1}, auth=auth)
+        first.raise_for_status()
+        terms = list(first.json())
+        pages = int(first.headers.get("X-WP-TotalPages") or 1)
+        expected = int(first.headers.get("X-WP-Total") or 0)
+        if pages <= 1:
+            return self._complete(taxonomy, terms, expected)
+
+        def fetch_page(page: int) -> List[Dict[str, Any]]:
+            response = client.get(endpoint, params={**params, "page": page}, auth=auth)
+            response.raise_for_status()
+            return response.json()
+
+        # httpx.Client is thread-safe, so the pages share its connection pool.
+        with ThreadPoolExecutor(max_workers=min(PAGE_CONCURRENCY, pages - 1)) as pool:
+            listing = [terms, *pool.map(fetch_page, range(2, pages + 1))]
+        for page, page_terms in enumerate(listing[:-1], start=1):
+            if len(page_terms) < PER_PAGE:
+                raise TaxonomySyncError(f"{taxonomy} page {page}/{pages} returned {len(page_terms)} of {PER_PAGE} terms")
+        return self._complete(taxonomy, [term for page_terms in listing for term in page_terms], expected)
+
+    @staticmethod
+    def _complete(taxonomy: str, terms: List[Dict[str, Any]], expected: int) -> List[Dict[str, Any]]:
+        if len(terms) < expected:
+            raise TaxonomySyncError(f"{taxonomy}: fetched {len(terms)} of {expected} terms")
+        return terms
+
+    def _fetch_new(self, client: httpx.Client, auth: tuple[str, str], taxonomy: str) -> List[Dict[str, Any]]:
+        """Terms created since the last sync, newest first until a known id shows up."""
+        known = self.map.high_water.get(taxonomy, 0)
+        params = {"per_page": PER_PAGE, "orderby": "id", "order": "desc", "_fields": "id,name"}
+        fresh: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            response = client.get(f"/wp-json/wp/v2/{taxonomy}", params={**params, "page": page}, auth=auth)
+            response.raise_for_status()
+            terms = response.json()
+            fresh.extend(term for term in terms if int(term.get("id", 0)) > known)
+            pages = int(response.headers.get("X-WP-TotalPages") or 1)
+            if not terms or int(terms[-1].get("id", 0)) <= known or page >= pages:
+                return fresh
+            page += 1
+
+    def _create_terms(self, client: httpx.Client, auth: tuple[str, str], taxonomy: str, names: List[str]) -> None:
+        payload = {
+            "requests": [{"method": "POST", "path": f"/wp/v2/{taxonomy}", "body": {"name": name}} for name in names]
+        }
+        try:
+            response = client.post("/wp-json/batch/v1", json=payload, auth=auth)
+            if response.status_code == 404:
+                # Sites older than WordPress 5.6 have no batch endpoint.
+                bodies = [self._create_one(client, auth, taxonomy, name) for name in names]
+            else:
+                response.raise_for_status()
+                bodies = [item.get("body") or {} for item in response.json().get("responses", [])]
+        except (httpx.HTTPError, ValueError) as exc:
+            raise TaxonomySyncError(f"Creating {len(names)} {taxonomy} failed: {exc}") from exc
+        created = 0
+        for name, body in zip(names, bodies):
+            # An existing term comes back as a ``term_exists`` error carrying its id.
+            term_id = body.get("id") or (body.get("data") or {}).get("term_id")
+            if term_id:
+                self.map.add(taxonomy, [{"id": term_id, "name": name}])
+                created += 1
+            else:
+                console.log(f"[yellow]Could not create {taxonomy[:-1]} {name!r}: {body.get('message', body)}[/yellow]")
+        console.log(f"Resolved {created}/{len(names)} missing {taxonomy} on the site")
+
+    @staticmethod
+    def _create_one(client: httpx.Client, auth: tuple[str, str], taxonomy: str, name: str) -> Dict[str, Any]:
+        response = client.post(f"/wp-json/wp/v2/{taxonomy}", json={"name": name}, auth=auth)
+        return response.json()
+
 
-    def resolve(self, client: httpx.Client | None = None, auth: tuple[str, str] | None = None) -> TaxonomyMap:
-        if CACHE_PATH.exists():
-            return TaxonomyMap.from_dict(json.loads(CACHE_PATH.read_text(encoding="utf-8")))
-        taxonomy_map = TaxonomyMap()
-        if client and auth:
-            try:
-                categories = client.get("/wp-json/wp/v2/categories?per_page=100", auth=auth).json()
-                for cat in categories:
-                    taxonomy_map.categories[cat.get("name", "")] = cat.get("id", 0)
-                tags = client.get("/wp-json/wp/v2/tags?per_page=100", auth=auth).json()
-                for tag in tags:
-                    taxonomy_map.tags[tag.get("name", "")] = tag.get("id", 0)
-            except Exception:
-                pass
-        CACHE_PATH.write_text(json.dumps(taxonomy_map.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
-        return taxonomy_map
-
-
-__all__ = ["TaxonomyManager", "TaxonomyMap"]
+__all__ = ["TaxonomyManager", "TaxonomyMap", "TaxonomySyncError", "term_key"]
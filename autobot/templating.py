@@ -0,0 +1,150 @@
+"""Template registry compiled once per process, plus a budgeted HTML builder."""
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from .config import PROJECT_ROOT
+
+TEMPLATE_ROOTS = [PROJECT_ROOT / "autobot" / "templates", PROJECT_ROOT / "autobot" / "prompts"]
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+@dataclass(slots=True, frozen=True)
+class Template:
+    """Template compiled once into a ``str.format`` pattern.
+
+    Placeholders look like ``{{ name }}``. Values are HTML-escaped for
+    ``.html`` templates unless passed in ``raw``; a template without
+    placeholders renders to its cached source.
+    """
+
+    name: str
+    source: str
+    pattern: str
+    fields: Tuple[str, ...]
+    escape: bool
+
+    @classmethod
+    def compile(cls, name: str, source: str) -> "Template":
+        parts: List[str] = []
+        fields: Dict[str, None] = {}
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            parts.append(_escape_braces(source[position : match.start()]))
+            parts.append("{" + match.group(1) + "}")
+            fields.setdefault(match.group(1))
+            position = match.end()
+        parts.append(_escape_braces(source[position:]))
+        return cls(
+            name=name,
+            source=source,
+            pattern="".join(parts),
+            fields=tuple(fields),
+            escape=name.endswith(".html"),
+        )
+
+    @property
+    def is_static(self) -> bool:
+        return not self.fields
+
+    def render(self, raw: Iterable[str] = (), **values: object) -> str:
+        if not self.fields:
+            return self.source
+        if self.escape:
+            values = {
+                key: value if key in raw else html.escape(str(value)) for key, value in values.items()
+            }
+        return self.pattern.format_map(values)
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class TemplateRegistry:
+    """All templates under the template roots, keyed by path relative to their root."""
+
+    def __init__(self, roots: Iterable[Path]) -> None:
+        self._templates: Dict[str, Template] = {}
+        for root in roots:
+            if not root.exists():
+                continue
+            for path in sorted(root.rglob("*")):
+                if path.is_file() and path.suffix in {".html", ".txt"}:
+                    name = path.relative_to(root).as_posix()
+                    self._templates[name] = Template.compile(name, path.read_text(encoding="utf-8"))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def get(self, name: str) -> Template:
+        return self._templates[name]
+
+    def source(self, name: str, default: str = "") -> str:
+        template = self._templates.get(name)
+        return template.source if template else default
+
+    def render(self, name: str, raw: Iterable[str] = (), **values: object) -> str:
+        return self._templates[name].render(raw, **values)
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> TemplateRegistry:
+    return TemplateRegistry(TEMPLATE_ROOTS)
+
+
+class BudgetedHtmlBuilder:
+    """Accumulates complete HTML elements without exceeding a character budget.
+
+    Elements are appended whole or not at all, so the output never ends in a
+    half-open tag. ``head`` elements (opening wrapper, title) and the tail
+    that ``reserve`` sets room for (reference list, closing tags) are always
+    emitted; the caller keeps them within the budget. Once an element does
+    not fit, the builder is closed and later appends are ignored, so sections
+    never resume after a gap.
+    """
+
+    def __init__(self, budget: int, reserve: int = 0, head: Iterable[str] = ()) -> None:
+        self.budget = budget - reserve
+        self._parts: List[str] = list(head)
+        self._length = sum(map(len, self._parts))
+        self.closed = False
+
+    def __len__(self) -> int:
+        return self._length
+
+    def fits(self, *fragments: str) -> bool:
+        return not self.closed and self._length + sum(map(len, fragments)) <= self.budget
+
+    def append(self, fragment: str) -> bool:
+        if not self.fits(fragment):
+            self.closed = True
+            return False
+        self._parts.append(fragment)
+        self._length += len(fragment)
+        return True
+
+    def section(self, heading: str, body: Iterable[str]) -> bool:
+        """Append a heading followed by its body elements; the heading needs its first element."""
+        body = iter(body)
+        first = next(body, None)
+        if first is None or not self.fits(heading, first):
+            self.closed = True
+            return False
+        self.append(heading)
+        self.append(first)
+        for fragment in body:
+            if not self.append(fragment):
+                break
+        return True
+
+    def build(self, *tail: str) -> str:
+        return "".join(self._parts) + "".join(tail)
+
+
+__all__ = ["Template", "TemplateRegistry", "get_registry", "BudgetedHtmlBuilder"]
@@ -1,44 +1,57 @@
 """Rule-based writer that assembles long-form Chinese articles."""
 from __future__ import annotations
 
+import html
+from functools import lru_cache
 from typing import Dict, List
 
 from slugify import slugify
 
-from .db import Article, Lead
-from .planner import ContentPlan
+from .db import Article, ImageAsset, Lead
+from .llm import LLMRequest
+from .planner import ContentPlan, Section
 from .research import EvidencePack
+from .templating import BudgetedHtmlBuilder, get_registry
+
+
+BODY_BUDGET = 2600
+# LLM drafts are asked for 1500-2500 Chinese characters, plus markup.
+DRAFT_BUDGET = 8000
+MIN_BODY_LENGTH = 1500
+MAX_FILLER_PARAGRAPHS = 5
+# The reference list may take at most this share of the budget left after the title.
+SOURCES_SHARE = 0.4
+
+
+def _render(name: str, raw: tuple[str, ...] = (), **values: object) -> str:
+    return get_registry().render(f"article/{name}", raw, **values)
+
+
+@lru_cache(maxsize=None)
+def _fragment(name: str) -> str:
+    """Source of a placeholder-free fragment, looked up once per process."""
+    return get_registry().source(f"article/{name}")
+
+
+@lru_cache(maxsize=1)
+def _variations() -> str:
+    return "".join(line.strip() for line in _fragment("expand_variations.txt").splitlines())
 
 
 def _build_intro(lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack) -> str:
-    intro = (
-        f"<p>在最新的旅行圈动态中，{lead.source} 发布了与 “{lead.title}” 相关的更新。"
-        f"这条信息为常旅客带来新的积分玩法与航线安排，[{evidence_pack.items[0].fact_id}]"
-        "我们整理官方来源，帮助读者快速理解政策的关键时间、资格要求与里程价值。"
-    )
-    return intro
+    return _render("intro.html", source=lead.source, title=lead.title, fact_id=evidence_pack.items[0].fact_id)
 
 
 def _build_takeaways(evidence_pack: EvidencePack) -> str:
     bullets = "".join(
-        f"<li>{item.text} [{item.fact_id}]</li>" for item in evidence_pack.items
+        f"<li>{html.escape(item.text)} [{item.fact_id}]</li>" for item in evidence_pack.items
     )
     return f"<ul>{bullets}</ul>"
 
 
+@lru_cache(maxsize=256)
 def _expand_paragraph(topic: str, fact_id: str) -> str:
-    base = (
-        f"{topic}。为了让读者真正理解，我们从旅行规划、成本收益以及风险控制三方面展开说明，"
-        f"不仅引用了官方渠道的说明 [{fact_id}]，还以真实场景举例说明如何在不同区域、不同舱位和不同信用卡平台之间灵活切换。"
-        "这一部分会反复强调时间节点、预约步骤与常见坑，帮助新手也能顺利完成兑换。"
-    )
-    # Duplicate content to ensure length but vary wording slightly
-    variations = [
-        "我们建议提前准备个人常旅客账号，并核对当前促销的适用区域与停飞安排，避免白跑一趟。",
-        "利用多种积分转点路径，可以在保持成本优势的同时，兼顾灵活退改策略。",
-        "结合里程估值与现金价格，我们提供对比表格，协助评估是否值得立即行动。",
-    ]
-    return "<p>" + base + "".join(variations) + "</p>"
+    return _render("expand_paragraph.html", raw=("variations",), topic=topic, fact_id=fact_id, variations=_variations())
 
 
 def _build_faq(lead: Lead, evidence_pack: EvidencePack) -> List[Dict[str, str]]:
@@ -59,68 +72,152 @@ def _build_faq(lead: Lead, evidence_pack: EvidencePack) -> List[Dict[str, str]]:
     return faqs
 
 
-def compose_article(lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack) -> Article:
-    intro = _build_intro(lead, plan, evidence_pack)
-    takeaways = _build_takeaways(evidence_pack)
-
-    sections_html: List[str] = ["<article>"]
-    sections_html.append(f"<h1>{lead.title}</h1>")
-    sections_html.append(intro)
-    for section in plan.sections:
-        sections_html.append(f"<h2>{section.heading}</h2>")
-        if section.heading == "速览要点":
-            sections_html.append(takeaways)
-            sections_html.append(
-                "<p>以上要点覆盖了优惠等级、有效期限、适用航线与申请步骤等关键信息。读者可据此决定是否立即行动。" \
-                "我们会在政策变动时及时更新正文。" )
-        elif section.heading == "玩法解析":
-            sections_html.append(_expand_paragraph("报名与资格验证流程", evidence_pack.items[0].fact_id))
-            sections_html.append(_expand_paragraph("里程积累与兑换策略", evidence_pack.items[-1].fact_id))
-        elif section.heading == "值不值得":
-            sections_html.append(
-                "<p>我们假设读者希望兑换一张跨洋航线商务舱奖票，通过积分转点与伙伴兑换比价，"
-                "可将成本控制在现金票价的30%-45%之间。我们进一步拆解税费、附加费与兑换限制，让你在计算收益时更加清晰。" \
-                f"若参考官方公告 [{evidence_pack.items[0].fact_id}] 的条款，提前注册并在指定时间内出票可以避免附加罚金。" )
-            sections_html.append(
-                "<p>为了满足字数要求，我们提供延伸分析：从不同地区出发时，燃油附加费、机场建设费和境外交易税率各不相同。" \
-                "通过对比近12个月历史兑换案例，可以发现淡季放票更多，而旺季需结合伙伴计划等待候补。" \
-                "我们建议准备至少两套备选行程，以免错过心仪舱位。" )
-        elif section.heading == "实用FAQ":
-            sections_html.append(
-                "<p>下列问答整理了会员最关注的资格、账号同步、积分到账时间等问题，帮助你快速定位解决方案。</p>"
+def _section_body(section: Section, lead: Lead, evidence_pack: EvidencePack, faq_data: List[Dict[str, str]]) -> List[str]:
+    first_fact = evidence_pack.items[0].fact_id
+    if section.heading == "速览要点":
+        return [_build_takeaways(evidence_pack), _fragment("takeaways_note.html")]
+    if section.heading == "玩法解析":
+        return [
+            _expand_paragraph("报名与资格验证流程", first_fact),
+            _expand_paragraph("里程积累与兑换策略", evidence_pack.items[-1].fact_id),
+        ]
+    if section.heading == "值不值得":
+        return [_render("value_example.html", fact_id=first_fact), _fragment("value_extended.html")]
+    if section.heading == "实用FAQ":
+        # Question and answer are one element so the budget never separates them.
+        return [_fragment("faq_intro.html")] + [
+            f"<h3>{html.escape(faq['question'])}</h3><p>{html.escape(faq['answer'])}</p>" for faq in faq_data
+        ]
+    return [_fragment("summary.html")]
+
+
+def _build_sources(evidence_pack: EvidencePack, budget: int) -> str:
+    """Reference list of at most ``budget`` characters.
+
+    Entry texts are shortened evenly first, so every cited fact keeps its
+    anchor; trailing entries are dropped only when even bare links do not fit.
+    """
+    items = evidence_pack.items
+
+    def render(count: int, limit: int | None) -> str:
+        entries = "".join(
+            _render(
+                "source_item.html",
+                fact_id=item.fact_id,
+                source_url=item.source_url,
+                text=item.text if limit is None or len(item.text) <= limit else item.text[: max(limit - 1, 0)] + "…",
             )
-            for faq in _build_faq(lead, evidence_pack):
-                sections_html.append(f"<h3>{faq['question']}</h3>")
-                sections_html.append(f"<p>{faq['answer']}</p>")
-        else:
-            sections_html.append(
-                "<p>总结部分提醒大家关注政策更新、保留原始通信记录，并在适用时咨询发行方客服确认资格。" \
-                "我们会定期回访政策执行情况，必要时发布补充说明。" )
-    sections_html.append(
-        "<section class=\"info-sources\"><h2>信息框引用</h2><ol>"
-        + "".join(
-            f"<li id=\"ref-{item.fact_id}\"><a href=\"{item.source_url}\" target=\"_blank\">{item.text}</a></li>"
-            for item in evidence_pack.items
+            for item in items[:count]
         )
-        + "</ol></section>"
-    )
-    sections_html.append("</article>")
+        return f"<section class=\"info-sources\"><h2>信息框引用</h2><ol>{entries}</ol></section>"
 
-    body_html = "".join(sections_html)
+    sources = render(len(items), None)
+    if len(sources) <= budget:
+        return sources
+    count = len(items)
+    while count and len(render(count, 0)) > budget:
+        count -= 1
+    limit = max(len(item.text) for item in items[:count]) if count else 0
+    while limit and len(sources := render(count, limit)) > budget:
+        limit -= max(1, (len(sources) - budget) // count)
+    return render(count, max(limit, 0))
 
-    # Ensure body length
-    plain_length = len(body_html)
-    if plain_length < 1500:
-        filler = (
-            "<p>为了让文章信息量达到深度阅读标准，我们继续补充常旅客圈的实战经验。"
-            "包括如何在旺季避开高峰、如何与客服沟通保留舱位、如何用多币种信用卡支付附加费等。"
-            "这些内容虽然不直接改变优惠条款，但能让读者在准备行程时少走弯路。" * 5
-        )
-        body_html += filler
-    elif plain_length > 2600:
-        body_html = body_html[:2600]
 
+def writer_request(lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack) -> LLMRequest:
+    """Prompt for ``prompts/writer_zh.txt``: the lead, the planned outline and numbered facts."""
+    lines = [
+        f"标题：{lead.title}",
+        f"来源：{lead.source}",
+        f"类型：{plan.content_type}",
+        "结构：" + "、".join(section.heading for section in plan.sections),
+        "事实：",
+        *(f"[{item.fact_id}] {item.text}" for item in evidence_pack.items),
+        "请用“## 小标题”分节，要点用“- ”开头，每段单独一行。",
+    ]
+    return LLMRequest(template="writer_zh.txt", prompt="\n".join(lines))
+
+
+def rewriter_request(draft: str) -> LLMRequest:
+    """Prompt for ``prompts/rewriter_variants.txt``; the draft itself is the user content."""
+    return LLMRequest(template="rewriter_variants.txt", prompt=draft, temperature=0.9)
+
+
+def _draft_elements(draft: str) -> List[tuple[str | None, List[str]]]:
+    """Split an LLM draft into ``(heading, elements)`` sections of escaped HTML."""
+    sections: List[tuple[str | None, List[str]]] = [(None, [])]
+    bullets: List[str] = []
+
+    def flush_bullets() -> None:
+        if bullets:
+            sections[-1][1].append("<ul>" + "".join(bullets) + "</ul>")
+            bullets.clear()
+
+    for line in draft.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            flush_bullets()
+            sections.append((f"<h2>{html.escape(line.lstrip('#').strip())}</h2>", []))
+        elif line.startswith(("- ", "* ", "• ")):
+            bullets.append(f"<li>{html.escape(line[2:].strip())}</li>")
+        else:
+            flush_bullets()
+            sections[-1][1].append(f"<p>{html.escape(line)}</p>")
+    flush_bullets()
+    return [section for section in sections if section[1]]
+
+
+# Publishers swap this prefix for the image's real URL or draft-relative path.
+INLINE_IMAGE_SRC = "longbo-asset:"
+
+
+def embed_image(article: Article, asset: ImageAsset) -> None:
+    """Place an inline image under the "值不值得" heading, or before the references when absent."""
+    figure = (
+        f'<figure class="longbo-infographic"><img src="{INLINE_IMAGE_SRC}{asset.blob_hash}" '
+        f'alt="{html.escape(asset.alt_text)}" width="{asset.width}" height="{asset.height}" loading="lazy"></figure>'
+    )
+    anchor = "<h2>值不值得</h2>"
+    position = article.html.find(anchor)
+    if position >= 0:
+        position += len(anchor)
+    else:
+        position = article.html.find('<section class="info-sources">')
+        if position < 0:
+            position = len(article.html)
+    article.html = article.html[:position] + figure + article.html[position:]
+
+
+def compose_article(
+    lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack, draft: str | None = None
+) -> Article:
+    """Assemble the article; ``draft`` is an LLM body replacing the rule-based sections."""
     faq_data = _build_faq(lead, evidence_pack)
+    budget = DRAFT_BUDGET if draft else BODY_BUDGET
+    head = ("<article>", f"<h1>{html.escape(lead.title)}</h1>")
+    room = budget - sum(map(len, head)) - len("</article>")
+    tail = (_build_sources(evidence_pack, int(room * SOURCES_SHARE)), "</article>")
+    builder = BudgetedHtmlBuilder(budget, reserve=sum(map(len, tail)), head=head)
+    if draft:
+        for heading, elements in _draft_elements(draft):
+            if heading is None:
+                added = all(builder.append(element) for element in elements)
+            else:
+                added = builder.section(heading, elements)
+            if not added:
+                break
+    else:
+        builder.append(_build_intro(lead, plan, evidence_pack))
+        for section in plan.sections:
+            if not builder.section(f"<h2>{section.heading}</h2>", _section_body(section, lead, evidence_pack, faq_data)):
+                break
+    filler = _fragment("filler.html")
+    for _ in range(MAX_FILLER_PARAGRAPHS):
+        if len(builder) + sum(map(len, tail)) >= MIN_BODY_LENGTH or not builder.append(filler):
+            break
+    body_html = builder.build(*tail)
+
     title_options = [
         lead.title,
         f"{lead.title}：积分玩家必读全攻略",
@@ -144,7 +241,7 @@ def compose_article(lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack)
         "title_options": title_options,
         "meta_descriptions": meta_descriptions,
         "faq": faq_data,
-        "internal_links": plan.internal_keywords,
+        "internal_keywords": plan.internal_keywords,
     }
 
     article = Article(
@@ -158,4 +255,10 @@ def compose_article(lead: Lead, plan: ContentPlan, evidence_pack: EvidencePack)
     return article
 
 
-__all__ = ["compose_article"]
+__all__ = [
+    "INLINE_IMAGE_SRC",
+    "compose_article",
+    "embed_image",
+    "writer_request",
+    "rewriter_request",
+]